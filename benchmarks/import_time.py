@@ -0,0 +1,129 @@
+# python3
+# coding=<UTF-8>
+
+"""
+Cold start of the library: wall time of ``import lingcorpora`` and of the
+first ``Corpus(...)`` of a corpus, each measured in fresh interpreters,
+with the number of modules loaded and whether the HTML parsing dependencies
+(bs4, lxml) were imported. Compares the medians with the stored baselines.
+
+    python benchmarks/import_time.py [--save] [--repeat N] [--tolerance T]
+                                     [corpus ...]
+
+Baselines (``benchmarks/baselines/import_time.json``) depend on the machine:
+save them with ``--save`` where regressions are checked. The script exits
+with status 1 if a median grows by more than `tolerance` (0.5 by default).
+For the modules behind the numbers run ``python -X importtime -c 'import lingcorpora'``.
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+BASELINES = os.path.join(ROOT, 'benchmarks', 'baselines', 'import_time.json')
+
+# prints wall time of `statement`, number of modules, bs4/lxml loaded
+PROBE = '''
+import sys, time, json
+start = time.perf_counter()
+%s
+elapsed = time.perf_counter() - start
+print(json.dumps([elapsed, len(sys.modules), 'bs4' in sys.modules, 'lxml' in sys.modules]))
+'''
+
+CASES = {
+    'import': 'import lingcorpora',
+    'corpus[%s]': 'import lingcorpora; lingcorpora.Corpus(%r)'
+}
+
+
+def probe(statement):
+    """
+    return: (float, int, bool, bool): `PROBE` results of `statement`
+            in a new interpreter
+    """
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    output = subprocess.check_output(
+        [sys.executable, '-c', PROBE % statement], env=env, cwd=ROOT
+    )
+
+    return json.loads(output.decode('utf-8'))
+
+
+def measure(statement, repeat):
+    """
+    return: dict: median milliseconds of `repeat` fresh runs of `statement`,
+            modules loaded, whether bs4 and lxml were imported
+    """
+
+    # the first run compiles bytecode, it is not counted
+    probe(statement)
+    runs = [probe(statement) for _ in range(repeat)]
+
+    return {
+        'ms': round(statistics.median(r[0] for r in runs) * 1000, 1),
+        'modules': runs[-1][1],
+        'bs4': runs[-1][2],
+        'lxml': runs[-1][3]
+    }
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='cold start benchmark')
+    argparser.add_argument('corpora', nargs='*', help='corpora to create (bam, rus by default)')
+    argparser.add_argument('--save', action='store_true', help='store the results as baselines')
+    argparser.add_argument('--repeat', type=int, default=10)
+    argparser.add_argument('--tolerance', type=float, default=0.5)
+    args = argparser.parse_args()
+
+    statements = {'import': CASES['import']}
+
+    for lang in args.corpora or ['bam', 'rus']:
+        statements['corpus[%s]' % lang] = CASES['corpus[%s]'] % lang
+
+    if os.path.isfile(BASELINES):
+        with open(BASELINES, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    else:
+        baselines = {}
+
+    results = {}
+    failed = False
+
+    print('%-20s %10s %8s %6s %6s' % ('case', 'ms', 'modules', 'bs4', 'lxml'))
+
+    for name, statement in statements.items():
+        stats = results[name] = measure(statement, args.repeat)
+        regression = ''
+
+        if not args.save and name in baselines and \
+                stats['ms'] > baselines[name]['ms'] * (1 + args.tolerance):
+            regression = '%.1f ms > %.1f ms' % (stats['ms'], baselines[name]['ms'])
+            failed = True
+
+        print('%-20s %10.1f %8d %6s %6s  %s' % (
+            name, stats['ms'], stats['modules'], stats['bs4'], stats['lxml'], regression
+        ))
+
+    if args.save:
+        baselines.update(results)
+        os.makedirs(os.path.dirname(BASELINES), exist_ok=True)
+
+        with open(BASELINES, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+
+        print('baselines saved to %s' % BASELINES)
+
+    elif failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# python3
+# coding=<UTF-8>
+
+"""
+``kwic`` of many hits: the former per-target implementation,
+`Target.kwic` and `Result.kwic_table`; then several context widths
+on the same hits, where `Target.kwic` reuses its token index.
+
+    python benchmarks/kwic.py [n_targets] [hits_per_text]
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from lingcorpora.target import Target
+from lingcorpora.result import Result
+
+
+def former_kwic(target, left, right):
+    """
+    word level `Target.kwic` before token spans and precompiled patterns
+    """
+
+    tokens = target.text.split()
+    idx = len(target.text[:target.idxs[0]].split())
+
+    if idx >= len(tokens):
+        return (' '.join(tokens), '', '')
+
+    l = ' '.join(tokens[max(0, idx-left):idx])
+    c = tokens[idx]
+    r = ' '.join(tokens[idx+1:idx+right+1])
+
+    if re.search(r'[\W]', c) is not None:
+        l_punct = re.search(r'^([\W]*)', c).group(1)
+        r_punct = re.search(r'([\W]*)$', c).group(1)
+        c = re.sub(r'^[\W]*', '', c)
+        c = re.sub(r'[\W]*$', '', c)
+        l += l_punct
+        r = r_punct + ' ' + r
+        r = r.strip()
+
+    return (l, c, r)
+
+
+def build(n, per_text):
+    result = Result('rus', {'query': 'одеяло', 'n_left': None, 'n_right': None})
+    words = 'Я , например , для внучки настегала своими руками «лоскутное» одеяло , зная'.split()
+
+    for i in range(n // per_text):
+        text = ' '.join(words * 4) + ' %s.' % i
+
+        for j in range(per_text):
+            l = text.index('одеяло', j * len(text) // per_text)
+            result.add(Target(text, (l, l + 6), 'doc %s' % i, []))
+
+    return result
+
+
+def timed(name, f):
+    start = time.perf_counter()
+    f()
+    print('%-22s %6.2f s' % (name, time.perf_counter() - start))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    per_text = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    result = build(n, per_text)
+
+    widths = (5, 10, 25)
+
+    print('%s targets, %s hits per text' % (result.n, per_text))
+    timed('former Target.kwic', lambda: [former_kwic(t, 10, 10) for t in result])
+    timed('Target.kwic', lambda: [t.kwic(10, 10) for t in result])
+    timed('Result.kwic_table', lambda: result.kwic_table(10, 10))
+
+    result = build(n, per_text)
+
+    print('widths %s' % (widths,))
+    timed('former Target.kwic', lambda: [former_kwic(t, w, w) for w in widths for t in result])
+    timed('Target.kwic', lambda: [t.kwic(w, w) for w in widths for t in result])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+# python3
+# coding=<UTF-8>
+
+"""
+Offline benchmark of `PageParser.extract()` of every corpus: result pages
+of ``tests/fixtures`` are served by a transport which answers every
+request with the page of the corpus, so only the parsing stage is measured.
+The pages are hand-written in the markup of the corpora, shorter and more
+regular than real ones: figures are relative, not throughput of live pages.
+Reports pages/s, targets/s and peak Python memory (``tracemalloc``, memory
+of lxml trees is not counted) for each corpus and HTML parsing backend,
+and compares them with the stored baselines.
+
+    python benchmarks/parsers.py [--save] [--n-results N] [--repeat N]
+                                 [--tolerance T] [corpus ...]
+
+Baselines (``benchmarks/baselines/parsers.json``) depend on the machine:
+save them with ``--save`` where regressions are checked. The script exits
+with status 1 if targets/s fall or peak memory grows by more than `tolerance`
+(0.5 by default: timings of a shared machine vary by a third from run to run).
+"""
+
+import gc
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from lingcorpora.functions import functions
+from lingcorpora.transport import make_response
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures')
+BASELINES = os.path.join(ROOT, 'benchmarks', 'baselines', 'parsers.json')
+
+ARKHANGELSKIY = ('ady', 'alb', 'arm', 'bua', 'grk', 'kal', 'kaz', 'mon', 'tat', 'udm', 'yid')
+
+# corpus: (saved page, query, search parameters)
+CASES = {
+    'rus': ('rus.xml', 'одеяло', {'get_analysis': True}),
+    'rus_parallel': ('rus_parallel.xml', 'одеяло', {'query_language': 'rus', 'get_analysis': True}),
+    'rus_pol': ('rus_pol.html', 'мешок', {'query_language': 'rus'}),
+    'zho_eng': ('zho_eng.html', 'language', {'query_language': 'eng'}),
+    'bam': ('bam_kwic.html', 'walasa', {'get_analysis': True}),
+    'emk': ('emk_kwic.html', 'kɔdɔ', {}),
+    'zho': ('zho.html', '代汉语', {}),
+    'hin': ('hin.html', 'कुत्ते', {}),
+    'deu': ('deu.html', 'Sprache', {}),
+    'dan': ('dan.html', 'kaster', {}),
+    'kat': ('kat.html', 'ენა', {}),
+    'est': ('est.html', 'keel', {}),
+}
+CASES.update({
+    lang: ('arkhangelskiy.html', 'кыл', {'get_analysis': True})
+    for lang in ARKHANGELSKIY
+})
+
+# corpora parsed with `lingcorpora.selectors`, benchmarked with both backends
+HTML = {'bam', 'emk', 'zho', 'hin', 'deu', 'dan', 'kat', 'est'} | set(ARKHANGELSKIY)
+
+
+class FixtureTransport:
+    """
+    `Transport` answering every request with one saved page
+    """
+
+    def __init__(self, filename):
+        with open(os.path.join(FIXTURES, filename), 'rb') as f:
+            self.content = f.read()
+
+        self.requests = 0
+
+    def request(self, method, url, **kwargs):
+        self.requests += 1
+        return make_response(url, 200, self.content, encoding='utf-8')
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+
+def run(lang, backend, n_results):
+    """
+    return: (int, int): pages and targets of one `extract()` of `lang`
+    """
+
+    filename, query, params = CASES[lang]
+    transport = FixtureTransport(filename)
+
+    if backend is not None:
+        params = dict(params, parser_backend=backend)
+
+    parser = functions[lang].PageParser(query, n_results=n_results, transport=transport, **params)
+    n = sum(1 for _ in parser.extract())
+
+    return transport.requests, n
+
+
+def measure(lang, backend, n_results, repeat, min_time=0.2):
+    """
+    return: dict: pages/s and targets/s of the best of `repeat` samples
+            (each one runs `extract()` for at least `min_time` seconds),
+            peak memory of one run in KiB
+    """
+
+    elapsed = float('inf')
+
+    for _ in range(repeat):
+        runs = 0
+        start = time.perf_counter()
+
+        while not runs or time.perf_counter() - start < min_time:
+            pages, n = run(lang, backend, n_results)
+            runs += 1
+
+        elapsed = min(elapsed, (time.perf_counter() - start) / runs)
+
+    gc.collect()
+    tracemalloc.start()
+    run(lang, backend, n_results)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'pages': pages,
+        'targets': n,
+        'pages_per_sec': round(pages / elapsed, 1),
+        'targets_per_sec': round(n / elapsed, 1),
+        'peak_kib': round(peak / 1024, 1)
+    }
+
+
+def compare(stats, baseline, tolerance):
+    """
+    return: list of str: regressions of `stats` against `baseline`
+    """
+
+    regressions = []
+
+    if stats['targets'] != baseline['targets']:
+        return ['baseline of %s targets' % baseline['targets']]
+
+    if stats['targets_per_sec'] < baseline['targets_per_sec'] * (1 - tolerance):
+        regressions.append('targets/s %.0f < %.0f' % (stats['targets_per_sec'], baseline['targets_per_sec']))
+
+    if stats['peak_kib'] > baseline['peak_kib'] * (1 + tolerance):
+        regressions.append('peak %.0f KiB > %.0f KiB' % (stats['peak_kib'], baseline['peak_kib']))
+
+    return regressions
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='offline benchmark of corpus parsers')
+    argparser.add_argument('corpora', nargs='*', help='corpora to run (all by default)')
+    argparser.add_argument('--save', action='store_true', help='store the results as baselines')
+    argparser.add_argument('--n-results', type=int, default=500)
+    argparser.add_argument('--repeat', type=int, default=3)
+    argparser.add_argument('--tolerance', type=float, default=0.5)
+    args = argparser.parse_args()
+
+    langs = args.corpora or sorted(CASES)
+
+    if os.path.isfile(BASELINES):
+        with open(BASELINES, encoding='utf-8') as f:
+            baselines = json.load(f)
+
+    else:
+        baselines = {}
+
+    results = {}
+    failed = False
+
+    print('%-20s %6s %8s %10s %12s %10s' % ('corpus', 'pages', 'targets', 'pages/s', 'targets/s', 'peak KiB'))
+
+    for lang in langs:
+        for backend in (('bs4', 'lxml') if lang in HTML else (None,)):
+            name = lang if backend is None else '%s[%s]' % (lang, backend)
+            stats = results[name] = measure(lang, backend, args.n_results, args.repeat)
+            regressions = [] if args.save or name not in baselines else \
+                          compare(stats, baselines[name], args.tolerance)
+            failed = failed or bool(regressions)
+
+            print('%-20s %6d %8d %10.1f %12.0f %10.0f  %s' % (
+                name, stats['pages'], stats['targets'], stats['pages_per_sec'],
+                stats['targets_per_sec'], stats['peak_kib'], '; '.join(regressions)
+            ))
+
+    if args.save:
+        baselines.update(results)
+        os.makedirs(os.path.dirname(BASELINES), exist_ok=True)
+
+        with open(BASELINES, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+
+        print('baselines saved to %s' % BASELINES)
+
+    elif failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
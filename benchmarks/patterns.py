@@ -0,0 +1,76 @@
+# python3
+# coding=<UTF-8>
+
+"""
+Per-hit regex work of arkhangelskiy_corpora (tags, target position, meta)
+and of `Target.kwic`: patterns passed to ``re`` functions as strings on every
+call (former code) vs precompiled ones from `lingcorpora.patterns`.
+
+    python benchmarks/patterns.py [n_hits]
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from lingcorpora import patterns
+from lingcorpora.target import _split_punct
+
+
+TAG = "popup(this,['мешок','мешок'],['S,m,inan','S'],['sg,nom','sg,acc'])"
+TEXT = 'Он взял мешок и пошёл домой , не оглядываясь на «мешок»!'
+META = '  Автор   \n  Название,   2004  '
+
+
+def former(n):
+    for _ in range(n):
+        regex = re.search('popup\\(this,\\[(.*?)\\],\\[(.*?)\\],\\[(.*?)\\]', TAG)
+        lemmas = re.findall("'(.*?)'", regex.group(1))
+        pos = re.findall("'(.*?)'", regex.group(2))
+        tags = re.findall("'(.*?)'", regex.group(3))
+        for p in pos:
+            re.search('^(.*?)(?:,|$)(.*?)$', p)
+        re.search('\\b' + 'мешок' + '\\b', TEXT)
+        text = re.sub('\\s{2,}', '\t', META)
+        re.sub('(^\\s+|\\s+$)', '', text)
+        c = '«мешок»!'
+        if re.search(r'[\W]', c) is not None:
+            re.search(r'^([\W]*)', c).group(1)
+            re.search(r'([\W]*)$', c).group(1)
+            c = re.sub(r'^[\W]*', '', c)
+            c = re.sub(r'[\W]*$', '', c)
+
+
+def precompiled(n):
+    for _ in range(n):
+        regex = patterns.POPUP.search(TAG)
+        lemmas = patterns.QUOTED.findall(regex.group(1))
+        pos = patterns.QUOTED.findall(regex.group(2))
+        tags = patterns.QUOTED.findall(regex.group(3))
+        for p in pos:
+            patterns.POS_AND_TAGS.search(p)
+        patterns.word('мешок').search(TEXT)
+        text = patterns.MULTIPLE_SPACES.sub('\t', META)
+        patterns.EDGE_SPACES.sub('', text)
+        _split_punct('«мешок»!')
+
+
+def timed(name, f, n):
+    start = time.perf_counter()
+    f(n)
+    elapsed = time.perf_counter() - start
+    print('%-12s %6.2f s  %5.2f us/hit' % (name, elapsed, 1e6 * elapsed / n))
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print('%s hits' % n)
+    timed('former', former, n)
+    timed('precompiled', precompiled, n)
+
+
+if __name__ == '__main__':
+    main()
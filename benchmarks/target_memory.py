@@ -0,0 +1,104 @@
+# python3
+# coding=<UTF-8>
+
+"""
+Memory taken by targets: <Target> in a <Result> (slots, equal meta strings
+shared within the result) vs the former
+<Target> with a per-instance __dict__, and <ColumnarResult> storage.
+
+    python benchmarks/target_memory.py [n_targets] [snippets_per_doc]
+"""
+
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from lingcorpora.target import Target
+from lingcorpora.result import Result
+from lingcorpora.columnar import ColumnarResult
+
+
+class DictTarget:
+    """
+    layout of <Target> before __slots__
+    """
+
+    def __init__(self, text, idxs, meta, analysis, gr_tags=None, transl=None, lang=None):
+        self.text = text
+        self.idxs = idxs
+        self.meta = meta
+        self.analysis = analysis
+        self.gr_tags = gr_tags
+        self.transl = transl
+        self.lang = lang
+
+
+def targets(cls, n, per_doc):
+    """
+    `n` targets, `per_doc` snippets per document: meta strings are equal
+    but built separately for every snippet, as parsers do
+    """
+
+    return (
+        cls(
+            'Я, например, для внучки настегала своими руками лоскутное одеяло %s' % i,
+            (59, 65),
+            ''.join(['Народный костюм: архаика или современность? // ', str(i // per_doc)]),
+            [],
+            ''.join(['S,', 'acc']),
+            None,
+            ''.join(['r', 'us'])
+        )
+        for i in range(n)
+    )
+
+
+def build(cls, n, per_doc):
+    if cls is ColumnarResult:
+        result = ColumnarResult('rus', {'query': 'одеяло'})
+
+        for target in targets(Target, n, per_doc):
+            result.add(target)
+
+        return result
+
+    if cls is Target:
+        result = Result('rus', {'query': 'одеяло'})
+
+        for target in targets(Target, n, per_doc):
+            result.add(target)
+
+        return result
+
+    return list(targets(cls, n, per_doc))
+
+
+def measure(cls, n, per_doc):
+    tracemalloc.start()
+    result = build(cls, n, per_doc)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del result
+    return size
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    per_doc = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    before = measure(DictTarget, n, per_doc)
+    after = measure(Target, n, per_doc)
+    columnar = measure(ColumnarResult, n, per_doc)
+
+    print('%s targets, %s snippets per document' % (n, per_doc))
+    print('__dict__ targets: %8.1f MiB' % (before / 2 ** 20))
+    print('slots targets:    %8.1f MiB' % (after / 2 ** 20))
+    print('reduction:        %8.1f %%' % (100 * (1 - after / before)))
+    print('columnar result:  %8.1f MiB' % (columnar / 2 ** 20))
+    print('reduction:        %8.1f %%' % (100 * (1 - columnar / before)))
+
+
+if __name__ == '__main__':
+    main()
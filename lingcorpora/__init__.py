@@ -1,4 +1,11 @@
 from .corpus import Corpus
+from .multi import MultiCorpus
+from .transport import Transport
+from .throttle import Throttle
+from .cache import ResponseCache
+from .jobs import CrawlJob
+from .replay import Archive, RecordTransport, ReplayTransport
+from .sinks import CSVSink, TSVSink, JSONLSink
 
 __version__ = '2.1'
 
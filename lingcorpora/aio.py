@@ -0,0 +1,389 @@
+# python3
+# coding=<UTF-8>
+
+import asyncio
+import warnings
+from collections import deque
+from http.cookiejar import CookieJar
+
+from requests import Request, RequestException
+
+try:
+    import aiohttp
+    from yarl import URL
+except ImportError:
+    aiohttp = None
+
+from .result import Result
+from .functions import functions
+from .corpus import _pack_queries
+from .pagination import PagedParser, check_status
+from .transport import make_response, backoff_delay, RETRY_STATUSES
+from .exceptions import EmptyPageException
+
+
+# errors of one query which do not stop the other queries of a search
+if aiohttp is not None:
+    NETWORK_ERRORS = (RequestException, aiohttp.ClientError, asyncio.TimeoutError)
+
+else:
+    NETWORK_ERRORS = (RequestException, asyncio.TimeoutError)
+
+
+class AsyncTransport:
+    """HTTP layer for ``AsyncCorpus`` built on ``aiohttp`` (``pip install aiohttp``).
+
+    Requests are prepared exactly as by ``Transport``, so parsers see the same urls,
+    bodies and ``requests.Response`` objects. Cookies are handled as by ``Transport``:
+    a cookie jar passed as ``cookies`` is sent and updated, nothing is shared.
+
+    Parameters
+    ----------
+    limit: int, default 100
+        total number of open connections.
+    limit_per_host: int, default 10
+        number of open connections per host.
+    timeout: float, default 60
+        total timeout of a request in seconds.
+    headers: dict, default None
+        headers sent with every request.
+    retries: int, default 2
+        number of times a request is repeated after a connection error,
+        a timeout or a 429 or 5xx response (see ``Transport``).
+    backoff: float, default 0.5
+        seconds: retry number ``i`` (from 0) waits a random time up to
+        ``backoff * 2 ** i``, or the ``Retry-After`` of the response.
+    max_backoff: float, default 30
+        longest wait before a retry in seconds.
+    """
+
+    def __init__(self,
+                 limit=100,
+                 limit_per_host=10,
+                 timeout=60,
+                 headers=None,
+                 retries=2,
+                 backoff=0.5,
+                 max_backoff=30
+    ):
+        if aiohttp is None:
+            raise ImportError('AsyncTransport requires aiohttp: pip install aiohttp')
+
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.headers = headers
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.__session = None
+
+    def __str__(self):
+        return 'AsyncTransport(limit=%s, limit_per_host=%s, timeout=%s)' % \
+                (self.limit, self.limit_per_host, self.timeout)
+
+    __repr__ = __str__
+
+    def __get_session(self):
+        """
+        aiohttp session is created inside the running event loop
+        """
+
+        if self.__session is None or self.__session.closed:
+            self.__session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host
+                ),
+                cookie_jar=aiohttp.DummyCookieJar(),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers=self.headers
+            )
+
+        return self.__session
+
+    async def request(self,
+                      method,
+                      url,
+                      params=None,
+                      data=None,
+                      cookies=None,
+                      headers=None,
+                      timeout=None,
+                      cache=True,
+                      stream=False
+    ):
+        """Make a request, arguments as in ``Transport.request``:
+        ``timeout`` (seconds, or ``(connect, read)`` as in ``requests``)
+        replaces the one of the transport, ``cache`` is accepted
+        for the requests of ``PagedParser._page_request``: nothing is cached
+        by this transport, every request reaches the server; ``stream``
+        is accepted likewise: the body is always read at once.
+
+        return: requests.Response
+        """
+
+        prepared = Request(
+            method.upper(),
+            url,
+            params=params,
+            data=data,
+            cookies=cookies,
+            headers=headers
+        ).prepare()
+
+        if isinstance(timeout, tuple):
+            timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+
+        elif timeout is not None:
+            timeout = aiohttp.ClientTimeout(total=timeout)
+
+        attempt = 0
+
+        while True:
+            try:
+                response = await self.__send(prepared, cookies, timeout)
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.retries:
+                    raise
+
+                retry_after = None
+
+            else:
+                if attempt >= self.retries or response.status_code not in RETRY_STATUSES:
+                    return response
+
+                retry_after = response.headers.get('Retry-After')
+
+            await asyncio.sleep(backoff_delay(attempt, self.backoff, self.max_backoff, retry_after))
+            attempt += 1
+
+    async def __send(self, prepared, cookies, timeout):
+        """
+        one attempt of a `prepared` request
+        """
+
+        kwargs = {'timeout': timeout} if timeout is not None else {}
+
+        async with self.__get_session().request(
+            prepared.method,
+            URL(prepared.url, encoded=True),
+            data=prepared.body,
+            headers=dict(prepared.headers),
+            **kwargs
+        ) as r:
+            content = await r.read()
+
+            if isinstance(cookies, CookieJar):
+                for h in list(r.history) + [r]:
+                    for name, morsel in h.cookies.items():
+                        cookies.set(
+                            name,
+                            morsel.value,
+                            domain=morsel['domain'] or h.url.host,
+                            path=morsel['path'] or '/'
+                        )
+
+            return make_response(
+                url=str(r.url),
+                status_code=r.status,
+                content=content,
+                encoding=r.get_encoding() if content else None,
+                headers=dict(r.headers)
+            )
+
+    async def get(self, url, params=None, **kwargs):
+        return await self.request('GET', url, params=params, **kwargs)
+
+    async def post(self, url, data=None, **kwargs):
+        return await self.request('POST', url, data=data, **kwargs)
+
+    async def close(self):
+        if self.__session is not None:
+            await self.__session.close()
+
+
+async def extract(parser, transport):
+    """Async counterpart of ``PagedParser.extract``: async generator of ``Target`` objects.
+
+    Pages are requested with ``transport`` (``AsyncTransport``),
+    ``parser._prefetch_depth()`` (at least one) pages ahead of the one being parsed.
+    """
+
+    if not isinstance(parser, PagedParser):
+        raise TypeError('<%s> is not a PagedParser' % type(parser).__name__)
+
+    n = 0
+    keys = parser._page_keys()
+    pending = deque()
+
+    async def fetch(key):
+        method, url, kwargs = parser._page_request(key)
+        return check_status(await transport.request(method, url, **kwargs))
+
+    def submit():
+        for key in keys:
+            pending.append((key, asyncio.ensure_future(fetch(key))))
+            return True
+
+        return False
+
+    try:
+        submit()
+
+        while pending:
+            key, task = pending.popleft()
+            response = await task
+
+            try:
+                for target in parser._parse_page(key, response):
+                    if n >= parser.n_results:
+                        return
+
+                    yield target
+                    n += 1
+
+            except EmptyPageException:
+                return
+
+            if n >= parser.n_results:
+                return
+
+            while len(pending) < max(parser._prefetch_depth(), 1) and submit():
+                pass
+
+    finally:
+        for _, task in pending:
+            task.cancel()
+
+
+class AsyncCorpus:
+    """asyncio counterpart of ``Corpus``: ``search`` is a coroutine and
+    all network work is done by ``AsyncTransport``, so one event loop
+    can run many corpus queries without a thread per request.
+
+    Parameters
+    ----------
+    language: str
+        Language ISO 639-3 code for the corpus (see ``Corpus``).
+    max_concurrency: int, default None
+        number of queries of one ``search`` processed at the same time.
+        If None, all of them.
+    transport: AsyncTransport, default None
+        If None, a new one is created.
+
+    Attributes
+    ----------
+    doc: str
+        Documentation for chosen corpus (after instance creation).
+    results: list
+        List of all Result objects, each returned by search method.
+    failed: list
+        List of Result objects where nothing was found
+        or whose search was interrupted by a network error.
+
+    Example
+    -------
+    .. code-block:: python
+
+        >>> from lingcorpora.aio import AsyncCorpus
+        >>> async with AsyncCorpus('bam', max_concurrency=20) as corp:
+        ...     results = await corp.search(['kan', 'walasa'], n_results=10)
+    """
+
+    def __init__(self, language, max_concurrency=None, transport=None):
+        self.language = language
+        self.max_concurrency = max_concurrency
+        self.transport = transport if transport is not None else AsyncTransport()
+        self.corpus = functions[self.language]
+        self.doc = self.corpus.__doc__
+        self.gr_tags_info = self.corpus.__dict__.get('GR_TAGS_INFO')
+
+        self.results = list()
+        self.failed = deque(list())
+
+        self.warn_str = 'Nothing found for query "%s"'
+        self.interrupt_str = 'Search for query "%s" interrupted after %s results (%r), ' \
+                             'retry_failed() searches it again'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def get_gr_tags_info(self):
+        return self.gr_tags_info
+
+    async def search(self, query, *args, **kwargs):
+        """Coroutine that queries the corpus and returns the results,
+        parameters as in ``Corpus.search``.
+
+        return: List[<Result>] in the order of `query`
+        """
+
+        query, gr_tags = _pack_queries(query, kwargs.get('gr_tags'))
+        semaphore = asyncio.Semaphore(self.max_concurrency or len(query) or 1)
+
+        async def run(q, c_gr_tags):
+            """
+            return: (<Result>, network error which interrupted it or None)
+            """
+
+            parser = self.corpus.PageParser(q, *args, **dict(kwargs, gr_tags=c_gr_tags))
+            result_obj = Result(self.language, parser.__dict__)
+
+            async with semaphore:
+                try:
+                    async for target in extract(parser, self.transport):
+                        result_obj.add(target)
+
+                except NETWORK_ERRORS as e:
+                    return result_obj, e
+
+            return result_obj, None
+
+        outcomes = await asyncio.gather(*[
+            run(q, c_gr_tags)
+            for q, c_gr_tags in zip(query, gr_tags)
+        ])
+
+        results = []
+
+        # a query interrupted by a network error goes to `.failed`
+        # with its targets so far, the other queries are kept
+        for result_obj, error in outcomes:
+            if error is not None:
+                warnings.warn(self.interrupt_str % (result_obj.query, result_obj.n, error))
+                self.failed.append(result_obj)
+
+            elif result_obj:
+                results.append(result_obj)
+
+            else:
+                warnings.warn(self.warn_str % result_obj.query)
+                self.failed.append(result_obj)
+
+        self.results.extend(results)
+
+        return results
+
+    async def retry_failed(self):
+        """
+        Apply `.search()` to failed queries stored in `.failed`
+        """
+
+        retrieved = []
+
+        # queries failed again are put back to `.failed` by `search`
+        n_rounds = len(self.failed)
+
+        for _ in range(n_rounds):
+            r_failed = self.failed.popleft()
+            retrieved.extend(await self.search(r_failed.query, **r_failed.params))
+
+        return retrieved
+
+    async def close(self):
+        await self.transport.close()
@@ -0,0 +1,207 @@
+# python3
+# coding=<UTF-8>
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+from threading import Lock
+
+from requests import Request
+
+
+class ResponseCache:
+    """On-disk cache of HTTP responses.
+
+    Responses are stored zlib-compressed in an SQLite database, keyed on
+    the request method, url, parameters and body. Entries older than their TTL
+    are not served; when the total size of stored bodies exceeds ``max_bytes``,
+    least recently used entries are evicted.
+
+    Parameters
+    ----------
+    path: str, default None
+        database file. If None, ``lingcorpora/responses.sqlite``
+        in the user cache directory (``$XDG_CACHE_HOME`` or ``~/.cache``).
+    max_bytes: int, default 512 MiB
+        maximum total size of compressed bodies.
+    ttl: int, default 86400
+        time to live of an entry in seconds.
+    ttls: dict, default None
+        TTLs for particular corpora, e.g. ``{'rus': 3600}``.
+        The corpus is the ``namespace`` an entry was stored with.
+
+    Example
+    -------
+    .. code-block:: python
+
+        >>> cache = lingcorpora.ResponseCache(ttl=7 * 86400, ttls={'rus': 86400})
+        >>> corp = lingcorpora.Corpus('bam', cache=cache)
+    """
+
+    def __init__(self, path=None, max_bytes=512 * 2 ** 20, ttl=86400, ttls=None):
+        if path is None:
+            cache_dir = os.environ.get('XDG_CACHE_HOME') or \
+                        os.path.join(os.path.expanduser('~'), '.cache')
+            path = os.path.join(cache_dir, 'lingcorpora', 'responses.sqlite')
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.ttls = dict(ttls) if ttls is not None else dict()
+        self.hits = 0
+        self.misses = 0
+
+        self.__lock = Lock()
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        self.__db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, namespace TEXT, url TEXT, status INTEGER, '
+            'encoding TEXT, headers TEXT, body BLOB, size INTEGER, '
+            'created REAL, accessed REAL)'
+        )
+        self.__db.execute(
+            'CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)'
+        )
+        self.__db.commit()
+
+    def __str__(self):
+        return 'ResponseCache(path=%s, N=%s, size=%s)' % \
+                (self.path, len(self), self.size)
+
+    __repr__ = __str__
+
+    def __len__(self):
+        with self.__lock:
+            return self.__db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    @property
+    def size(self):
+        """
+        total size of stored bodies in bytes
+        """
+
+        with self.__lock:
+            return self.__db.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM responses'
+            ).fetchone()[0]
+
+    @staticmethod
+    def key(method, url, params=None, data=None):
+        """
+        return: str: key of the request, independent of the order of parameters
+        """
+
+        if isinstance(params, dict):
+            params = sorted(params.items())
+
+        if isinstance(data, dict):
+            data = sorted(data.items())
+
+        prepared = Request(method.upper(), url, params=params, data=data).prepare()
+        body = prepared.body if prepared.body is not None else ''
+
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        h = hashlib.sha1()
+        h.update(prepared.method.encode('utf-8') + b' ' + prepared.url.encode('utf-8') + b'\n')
+        h.update(body)
+
+        return h.hexdigest()
+
+    def get(self, key, namespace=None):
+        """
+        return: dict with ``url``, ``status_code``, ``content``, ``encoding``, ``headers``
+                or None if there is no fresh entry
+        """
+
+        ttl = self.ttls.get(namespace, self.ttl)
+        now = time.time()
+
+        with self.__lock:
+            row = self.__db.execute(
+                'SELECT url, status, encoding, headers, body, created '
+                'FROM responses WHERE key = ?',
+                (key,)
+            ).fetchone()
+
+            if row is None or now - row[5] > ttl:
+                self.misses += 1
+                return None
+
+            self.__db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self.__db.commit()
+            self.hits += 1
+
+        return {
+            'url': row[0],
+            'status_code': row[1],
+            'encoding': row[2],
+            'headers': json.loads(row[3]),
+            'content': zlib.decompress(row[4])
+        }
+
+    def set(self, key, response, namespace=None):
+        """
+        store `response` <requests.Response> under `key`
+        """
+
+        body = zlib.compress(response.content)
+        now = time.time()
+
+        with self.__lock:
+            self.__db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, namespace, response.url, response.status_code, response.encoding,
+                 json.dumps(dict(response.headers)), body, len(body), now, now)
+            )
+            self.__evict()
+            self.__db.commit()
+
+    def __evict(self):
+        """
+        delete least recently used entries until the size fits `max_bytes`
+        """
+
+        total = self.__db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+        if total <= self.max_bytes:
+            return
+
+        stale = []
+
+        rows = self.__db.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall()
+
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+
+            stale.append((key,))
+            total -= size
+
+        self.__db.executemany('DELETE FROM responses WHERE key = ?', stale)
+
+    def clear(self, namespace=None):
+        """
+        delete all entries (of `namespace` only if given)
+        """
+
+        with self.__lock:
+            if namespace is None:
+                self.__db.execute('DELETE FROM responses')
+
+            else:
+                self.__db.execute('DELETE FROM responses WHERE namespace = ?', (namespace,))
+
+            self.__db.commit()
+
+    def close(self):
+        with self.__lock:
+            self.__db.close()
@@ -0,0 +1,490 @@
+# python3
+# coding=<UTF-8>
+
+from array import array
+
+from .target import Target, kwic_spans
+from .sinks import CSVSink
+from .patterns import NOT_ALLOWED_IN_FILENAME
+
+
+class _Dictionary:
+    """
+    dictionary-encoded column of repeated strings: codes and distinct values,
+    code -1 is None
+    """
+
+    def __init__(self):
+        self.codes = array('q')
+        self.values = []
+        self.__index = {}
+
+    def append(self, value):
+        if value is None:
+            self.codes.append(-1)
+            return
+
+        code = self.__index.get(value)
+
+        if code is None:
+            code = self.__index[value] = len(self.values)
+            self.values.append(value)
+
+        self.codes.append(code)
+
+    def __getitem__(self, i):
+        code = self.codes[i]
+        return self.values[code] if code >= 0 else None
+
+
+class _Strings:
+    """
+    column of strings as UTF-8 bytes in one buffer with n + 1 byte offsets
+    (the layout of an arrow ``large_string`` array), None is kept
+    as an empty string with `valid` 0
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array('q', [0])
+        self.valid = bytearray()
+        self.__frozen = None
+
+    def __len__(self):
+        return len(self.valid)
+
+    def append(self, value):
+        self.valid.append(value is not None)
+
+        if value is not None:
+            self.data += value.encode('utf-8')
+
+        self.offsets.append(len(self.data))
+        self.__frozen = None
+
+    def __getitem__(self, i):
+        if not self.valid[i]:
+            return None
+
+        return self.data[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def frozen(self):
+        """
+        return: (bytes, bytes, bytes): data, offsets and valid flags,
+                copied once and kept until the next `append`
+                (exported buffers would lock the growing ones)
+        """
+
+        if self.__frozen is None:
+            self.__frozen = bytes(self.data), self.offsets.tobytes(), bytes(self.valid)
+
+        return self.__frozen
+
+
+class _Texts(_Dictionary):
+    """
+    dictionary-encoded column of texts with `_Strings` values: a text equal
+    to the previous one (the hits of one sentence come one after another)
+    is stored once; texts are not indexed, so the distinct ones are not kept
+    as Python strings
+    """
+
+    def __init__(self):
+        self.codes = array('q')
+        self.values = _Strings()
+        self.__last = None
+
+    def append(self, value):
+        if value is None:
+            self.codes.append(-1)
+            return
+
+        if value != self.__last:
+            self.values.append(value)
+            self.__last = value
+
+        self.codes.append(len(self.values) - 1)
+
+
+class _Columns:
+    """
+    storage shared by a <ColumnarResult> and its views: texts as `_Texts`,
+    targets and translations as `_Strings`, target offsets in the text (characters),
+    meta, gr_tags and lang dictionary-encoded, analyses other than []
+    by row
+    """
+
+    def __init__(self):
+        self.texts = _Texts()
+        self.targets = _Strings()
+        self.transl = _Strings()
+        self.left = array('q')
+        self.right = array('q')
+        self.meta = _Dictionary()
+        self.gr_tags = _Dictionary()
+        self.lang = _Dictionary()
+        self.analysis = {}
+
+    def __len__(self):
+        return len(self.left)
+
+    def append(self, target):
+        l, r = target.idxs
+        self.texts.append(target.text)
+        self.targets.append(target.text[l:r])
+        self.transl.append(target.transl)
+        self.left.append(l)
+        self.right.append(r)
+        self.meta.append(target.meta)
+        self.gr_tags.append(target.gr_tags)
+        self.lang.append(target.lang)
+
+        # only the usual empty list is left out: None and the like are kept
+        if target.analysis != []:
+            self.analysis[len(self) - 1] = target.analysis
+
+    def target(self, i):
+        return Target(
+            self.texts[i],
+            (self.left[i], self.right[i]),
+            self.meta[i],
+            self.analysis.get(i, []),
+            gr_tags=self.gr_tags[i],
+            transl=self.transl[i],
+            lang=self.lang[i]
+        )
+
+
+class ColumnarResult:
+    """Result stored column by column instead of a list of <Target> objects.
+    It has the interface of <Result>; targets are built on access.
+
+    Texts, targets and translations are kept as UTF-8 bytes in one buffer
+    per column with byte offset arrays, repeated `meta`, `gr_tags` and `lang`
+    values are stored once, and so is the text of several hits in one sentence. Slicing returns a view sharing the storage (O(1)),
+    so million-hit results can be kept in memory, handed to pyarrow as
+    buffers and exported without building <Target> objects.
+    Use it with ``Corpus(storage='columnar')``.
+
+    Parameters
+    ----------
+    language: str
+        corpus language.
+    query_params: dict
+        all other parameters of the search.
+
+    Example
+    -------
+    .. code-block:: python
+
+        >>> corp = lingcorpora.Corpus('rus', storage='columnar')
+        >>> result = corp.search('мешок', n_results=100000)[0]
+        >>> df = result[:50000].to_pandas()
+    """
+
+    header = ('index', 'text')
+    kwic_header = ('index', 'left', 'center', 'right')
+
+    def __init__(self, language, query_params, _columns=None, _rows=None):
+        """
+        language: str
+            language
+        query_params: dict
+            __dict__ of used parser
+        """
+
+        self.lang = language
+        self.query = query_params['query']
+
+        self.params = {
+            k: query_params[k]
+            for k in query_params
+            if not k.startswith('_') and k not in {'page', 'query'}
+        }
+        self.not_allowed_sub_regexp = NOT_ALLOWED_IN_FILENAME
+
+        self.__columns = _columns if _columns is not None else _Columns()
+        self.__rows = _rows
+
+    def __str__(self):
+        return 'ColumnarResult(query=%s, N=%s, params=%s)' % \
+                (self.query, self.n, self.params)
+
+    __repr__ = __str__
+
+    @property
+    def rows(self):
+        """
+        range of rows of the storage this result (or view) covers
+        """
+
+        if self.__rows is None:
+            return range(len(self.__columns))
+
+        return self.__rows
+
+    @property
+    def n(self):
+        return len(self.rows)
+
+    def __len__(self):
+        return self.n
+
+    def __bool__(self):
+        return self.n > 0
+
+    def __iter__(self):
+        for i in self.rows:
+            yield self.__columns.target(i)
+
+    @property
+    def results(self):
+        """
+        list of <Target> objects (built for every row)
+        """
+
+        return list(self)
+
+    def __getattr__(self, name):
+        if name.lower() == 'r':
+            return self.results
+
+        raise AttributeError("'ColumnarResult' object has no attribute '%s'" % name)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return ColumnarResult(
+                self.lang,
+                dict(self.params, query=self.query),
+                _columns=self.__columns,
+                _rows=self.rows[key]
+            )
+
+        return self.__columns.target(self.rows[key])
+
+    def add(self, x):
+        if self.__rows is not None:
+            raise TypeError('cannot add targets to a view of <ColumnarResult>')
+
+        self.__columns.append(x)
+
+    def clear(self):
+        """Drops all results.
+        """
+
+        if self.__rows is not None:
+            self.__rows = range(0)
+
+        else:
+            self.__columns = _Columns()
+
+    def __widths(self, n_left, n_right):
+        if n_left is None:
+            n_left = self.params.get('n_left') if self.params.get('n_left') is not None else 10
+
+        if n_right is None:
+            n_right = self.params.get('n_right') if self.params.get('n_right') is not None else 10
+
+        return n_left, n_right
+
+    def __spans(self, texts, rows):
+        """
+        (text, (l, r)) of `rows` for `target.kwic_spans`, `texts` are their texts
+        """
+
+        c = self.__columns
+        return zip(texts, ((c.left[i], c.right[i]) for i in rows))
+
+    def kwic_table(self, n_left=None, n_right=None, level='word'):
+        """``kwic`` of all results in one pass, see `Result.kwic_table`.
+
+        return: List[(str, str, str)]
+        """
+
+        n_left, n_right = self.__widths(n_left, n_right)
+        texts = self.__columns.texts
+
+        return kwic_spans(
+            self.__spans((texts[i] for i in self.rows), self.rows),
+            n_left,
+            n_right,
+            level
+        )
+
+    def columns(self, kwic=False, n_left=None, n_right=None):
+        """Results as a dict of columns (lists): ``text``, ``target``, ``meta``,
+        ``gr_tags``, ``transl``, ``lang``; with `kwic` also ``left``, ``center``,
+        ``right`` (see `kwic_table`).
+
+        return: dict
+        """
+
+        c = self.__columns
+        rows = self.rows
+
+        table = {
+            'text': [c.texts[i] for i in rows],
+            'target': [c.targets[i] for i in rows],
+            'meta': [c.meta[i] for i in rows],
+            'gr_tags': [c.gr_tags[i] for i in rows],
+            'transl': [c.transl[i] for i in rows],
+            'lang': [c.lang[i] for i in rows]
+        }
+
+        if kwic:
+            n_left, n_right = self.__widths(n_left, n_right)
+            table['left'], table['center'], table['right'] = [], [], []
+
+            for left, center, right in kwic_spans(self.__spans(table['text'], rows), n_left, n_right):
+                table['left'].append(left)
+                table['center'].append(center)
+                table['right'].append(right)
+
+        return table
+
+    def __categorical(self, column, pandas, numpy):
+        rows = numpy.arange(self.rows.start, self.rows.stop, self.rows.step)
+        codes = numpy.frombuffer(column.codes, dtype=numpy.int64)[rows]
+
+        return pandas.Categorical.from_codes(codes, categories=column.values)
+
+    def to_pandas(self):
+        """Results as a ``pandas.DataFrame`` (pandas required). ``meta``, ``gr_tags``
+        and ``lang`` are categorical columns built from the stored codes.
+
+        return: pandas.DataFrame
+        """
+
+        try:
+            import numpy
+            import pandas
+        except ImportError:
+            raise ImportError('ColumnarResult.to_pandas requires pandas: pip install pandas')
+
+        c = self.__columns
+        table = self.columns()
+
+        for name in ('meta', 'gr_tags', 'lang'):
+            table[name] = self.__categorical(getattr(c, name), pandas, numpy)
+
+        return pandas.DataFrame(table)
+
+    def __take(self, array, pyarrow):
+        """
+        rows of this view from `array` of all the rows of the storage
+        """
+
+        rows = self.rows
+
+        if rows.step == 1:
+            return array.slice(rows.start, len(rows))
+
+        return array.take(pyarrow.array(rows, type=pyarrow.int64()))
+
+    def __strings(self, column, pyarrow, take=True):
+        """
+        `_Strings` column as a ``large_string`` array over its buffers,
+        all of them unless `take` (the rows of this view)
+        """
+
+        data, offsets, valid = column.frozen()
+        n = len(column)
+        validity = None
+
+        if 0 in valid:
+            flags = pyarrow.Array.from_buffers(pyarrow.uint8(), n, [None, pyarrow.py_buffer(valid)])
+            validity = pyarrow.compute.equal(flags, 1).buffers()[1]
+
+        array = pyarrow.Array.from_buffers(
+            pyarrow.large_string(),
+            n,
+            [validity, pyarrow.py_buffer(offsets), pyarrow.py_buffer(data)]
+        )
+
+        return self.__take(array, pyarrow) if take else array
+
+    def __dictionary(self, column, pyarrow):
+        """
+        `_Dictionary` column as a dictionary array over its codes,
+        the values of `_Texts` are a ``large_string`` array over their buffers
+        """
+
+        codes = pyarrow.Array.from_buffers(
+            pyarrow.int64(),
+            len(column.codes),
+            [None, pyarrow.py_buffer(column.codes.tobytes())]
+        )
+        codes = self.__take(codes, pyarrow)
+        codes = pyarrow.compute.if_else(
+            pyarrow.compute.less(codes, 0),
+            pyarrow.scalar(None, pyarrow.int64()),
+            codes
+        )
+
+        if isinstance(column.values, _Strings):
+            values = self.__strings(column.values, pyarrow, take=False)
+        else:
+            values = pyarrow.array(column.values, type=pyarrow.string())
+
+        return pyarrow.DictionaryArray.from_arrays(codes, values)
+
+    def to_arrow(self):
+        """Results as a ``pyarrow.Table`` (pyarrow required). ``target``
+        and ``transl`` are ``large_string`` arrays over the stored buffers,
+        ``text``, ``meta``, ``gr_tags`` and ``lang`` are dictionary arrays built
+        from the stored codes. Save it with ``pyarrow.parquet.write_table``.
+
+        return: pyarrow.Table
+        """
+
+        try:
+            import pyarrow
+            import pyarrow.compute
+        except ImportError:
+            raise ImportError('ColumnarResult.to_arrow requires pyarrow: pip install pyarrow')
+
+        c = self.__columns
+
+        return pyarrow.table({
+            'text': self.__dictionary(c.texts, pyarrow),
+            'target': self.__strings(c.targets, pyarrow),
+            'meta': self.__dictionary(c.meta, pyarrow),
+            'gr_tags': self.__dictionary(c.gr_tags, pyarrow),
+            'transl': self.__strings(c.transl, pyarrow),
+            'lang': self.__dictionary(c.lang, pyarrow)
+        })
+
+    def export_csv(self, filename=None, header=True, sep=';'):
+        """Save search result as CSV, see `Result.export_csv`.
+        Rows are written from the columns by batches, no <Target> is built.
+        """
+
+        if filename is None:
+            filename = '%s_%s_results.csv' % \
+                        (self.lang, self.not_allowed_sub_regexp.sub('', self.query))
+
+        texts = self.__columns.texts
+        rows = self.rows
+
+        with CSVSink(
+            filename,
+            sep=sep,
+            header=header,
+            kwic=self.params['kwic'],
+            n_left=self.params['n_left'],
+            n_right=self.params['n_right'],
+            batch_size=1000
+        ) as sink:
+            for start in range(0, len(rows), sink.batch_size):
+                batch = rows[start:start + sink.batch_size]
+                batch_texts = [texts[i] for i in batch]
+                contexts = None
+
+                if sink.kwic:
+                    contexts = kwic_spans(
+                        self.__spans(batch_texts, batch),
+                        sink.n_left,
+                        sink.n_right
+                    )
+
+                sink.write_texts(batch_texts, contexts)
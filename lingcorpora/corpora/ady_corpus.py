@@ -1,8 +1,15 @@
-from .arkhangelskiy_corpora import PageParser
+from .arkhangelskiy_corpora import PageParser, RATE_LIMITS
 
 language = 'adyghe'
 results = 'http://web-corpora.net/AdygheCorpus/search/results.php'
 
+META = {
+    'host': 'web-corpora.net',
+    'page_size': 100,
+    'count': True,
+    'params': ['n_results', 'kwic', 'get_analysis', 'parser_backend']
+}
+
 TEST_DATA = {'test_single_query': {'query': 'чэтыу'},
              'test_multi_query': {'query': ['чэтыу', 'хэон']}
              }
@@ -1,10 +1,18 @@
-from ..params_container import Container
-from requests import get
-from bs4 import BeautifulSoup
-import re
+from ..pagination import PagedParser
+from ..selectors import Selector, backend, has_class
+from .. import patterns
 from html import unescape
 from ..target import Target
 
+# limits of the corpus servers, see `lingcorpora.throttle.HostLimiter`
+RATE_LIMITS = {
+    'web-corpora.net': {'rate': 4, 'burst': 4, 'max_concurrency': 6},
+    'eanc.net': {'rate': 2, 'burst': 2, 'max_concurrency': 4}
+}
+
+# result pages downloaded at once when the sid and the number of hits are known
+PAGES_AT_ONCE = 6
+
 
 __author__ = 'ustya-k'
 __doc__ = \
@@ -27,25 +35,92 @@ get_analysis: bool
 """
 
 
-class PageParser(Container):
+CONTEXTS = Selector('#contexts_div', '//*[@id="contexts_div"]')
+CONTEXT_TABLES = Selector(':scope > table', './table')
+CONTEXT_ROWS = Selector(':scope > tr', './tr')
+TARGET = Selector('span.result1', './/span[%s]' % has_class('result1'))
+HEADER = Selector('.results_header', './/*[%s]' % has_class('results_header'))
+HEADER_CELLS = Selector('td', './/td')
+
+
+class PageParser(PagedParser):
 
     def __init__(self, search_language, results_url, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.__search_language = search_language
         self.__results_url = results_url
+        self.__html = backend(self.parser_backend)
         self.__per_page = 100
 
         if self.subcorpus is None:
             self.subcorpus = ''
 
-        self.sid = 0
-        self.__get_sid()
-
+        self.__sid = 0
         self.__page = None
-        self.__pagenum = 1
         self.__occurences = None
 
-    def __get_sid(self):
+    def _page_keys(self):
+        '''
+        0 is the search request which gives sid,
+        result pages are numbered from 1; pages after the first one
+        only if it gave the number of hits
+        '''
+        yield 0
+        yield 1
+        pagenum = 2
+        while self.__occurences is not None and \
+                (pagenum - 1) * self.__per_page < min(self.n_results, self.__occurences):
+            yield pagenum
+            pagenum += 1
+
+    def _prefetch_depth(self):
+        '''
+        once the first result page gives the number of hits,
+        all the pages left are known and are downloaded at once;
+        nothing is fetched ahead before: page 1 needs the sid of page 0,
+        the next ones the number of hits of page 1
+        '''
+        if self.__occurences is None:
+            return 0
+        return max(self.prefetch, PAGES_AT_ONCE)
+
+    def _page_request(self, pagenum):
+        if pagenum == 0:
+            return self.__sid_request()
+        params = {"sid": self.__sid,
+                  "page": pagenum,
+                  "search_language": self.__search_language}
+        return 'GET', self.__results_url, {'params': params}
+
+    def _parse_page(self, pagenum, response):
+        if pagenum == 0:
+            self.__get_sid(response)
+            return []
+        self.__page = unescape(response.text)
+        rows = self.parse_page()
+        return self.parse_results(rows)
+
+    def _count_keys(self):
+        '''
+        the search request and the first result page, of one occurrence
+        '''
+        self.__per_page = 1
+        return iter((0, 1))
+
+    def _parse_count(self, pagenum, response):
+        if pagenum == 0:
+            self.__get_sid(response)
+            return None
+        return self.__hits(self.__html.text(self.__html.document(unescape(response.text))))
+
+    def __hits(self, text):
+        occs = patterns.FOUND_MATCHES.search(text)
+        if occs is None:
+            # not a result page (error, changed layout): number unknown
+            return None
+        return int(occs.group(1).replace(' ', ''))
+
+    def __sid_request(self):
         params = {
             "fullsearch": self.query,
 
@@ -59,24 +134,22 @@ class PageParser(Container):
             "show_gram_info": int(self.get_analysis),
             "subcorpus_query": ""
         }
-        res = get(self.__results_url, params)
-        sid_res = re.search('sid=([0-9]+)', res.text)
-        if sid_res is not None:
-            self.sid = sid_res.group(1)
+        # the sid is only valid for a while: never replayed from the cache
+        return 'GET', self.__results_url, {'params': params, 'cache': False}
 
-    def get_results(self):
-        params = {"sid": self.sid,
-                  "page": self.__pagenum,
-                  "search_language": self.__search_language}
-        res = get(self.__results_url, params)
-        return unescape(res.text)
+    def __get_sid(self, res):
+        sid_res = patterns.SID.search(res.text)
+        if sid_res is not None:
+            self.__sid = sid_res.group(1)
 
     def parse_page(self):
-        soup = BeautifulSoup(self.__page, 'lxml')
-        occs = re.search('FOUND(.*?)MATCHES', soup.text)
-        self.__occurences = int(occs.group(1).replace(' ', ''))
-        contexts = soup.find(id="contexts_div")
-        res = list(contexts.find_all('table', recursive=False))
+        html = self.__html
+        soup = html.document(self.__page)
+        self.__occurences = self.__hits(html.text(soup))
+        contexts = html.select_one(soup, CONTEXTS)
+        if contexts is None:
+            return []
+        res = list(html.select(contexts, CONTEXT_TABLES))
         return res
 
     def parse_results(self, results):
@@ -88,7 +161,7 @@ class PageParser(Container):
         return parsed_results
 
     def __parse_context(self, context):
-        res_context = list(context.find_all('tr', recursive=False))[1]
+        res_context = list(self.__html.select(context, CONTEXT_ROWS))[1]
         meta = self.__get_meta(context)
         res_text, word, idxs = self.__get_text(res_context)
         tags = []
@@ -105,7 +178,7 @@ class PageParser(Container):
         new_pos = []
         new_tags = []
         for p, t in zip(pos, tags):
-            res = re.search('^(.*?)(?:,|$)(.*?)$', p)
+            res = patterns.POS_AND_TAGS.search(p)
             new_pos.append(res.group(1))
             new_tags.append(','.join([res.group(2), t]).strip(','))
         return new_pos, new_tags
@@ -115,14 +188,12 @@ class PageParser(Container):
         tag_text: str, tag line
         tags: list of dicts
         '''
-        brkts = '?:(\'(.*?)\',?)+'
         # [lemmas], [PoS], [tags]
-        regex = re.search(
-            'popup\(this,\[(.*?)\],\[(.*?)\],\[(.*?)\]', tag_text)
+        regex = patterns.POPUP.search(tag_text)
         try:
-            lemmas = re.findall("'(.*?)'", regex.group(1))
-            pos = re.findall("'(.*?)'", regex.group(2))
-            tags_values = re.findall("'(.*?)'", regex.group(3))
+            lemmas = patterns.QUOTED.findall(regex.group(1))
+            pos = patterns.QUOTED.findall(regex.group(2))
+            tags_values = patterns.QUOTED.findall(regex.group(3))
             pos, tags_values = self.__move_tags_from_pos(pos, tags_values)
         except AttributeError:
             lemmas = []
@@ -133,23 +204,22 @@ class PageParser(Container):
         return tags
 
     def __get_word_info(self, res_context):
-        l_context_len = 0
+        html = self.__html
         word = {}
-        for child in list(res_context.find_all('span')):
-            if 'class' in child.attrs and 'result1' in child.attrs['class']:
-                word['word'] = child.text
-                word['tag'] = self.__get_tag(child.attrs['onmouseover'])
-                break
+        child = html.select_one(res_context, TARGET)
+        if child is not None:
+            word['word'] = html.text(child)
+            word['tag'] = self.__get_tag(html.get(child, 'onmouseover'))
         return word
 
     def __get_idxs(self, text, word):
-        beg = re.search('\\b' + word + '\\b', text)
+        beg = patterns.word(word).search(text)
         if beg is None:
             return None
         return (beg.start(), beg.end())
 
     def __get_text(self, res_context):
-        res_text = res_context.text.strip()
+        res_text = self.__html.text(res_context).strip()
         word = self.__get_word_info(res_context)
         idxs = None
         if word != {}:
@@ -157,25 +227,10 @@ class PageParser(Container):
         return res_text, word, idxs
 
     def __get_meta(self, context):
-        header = context.find(class_='results_header')
-        text = header.find_all('td')[1].text
-        text = re.sub('\s{2,}', '\t', text)
-        text = re.sub('(^\s+|\s+$)', '', text)
+        html = self.__html
+        header = html.select_one(context, HEADER)
+        text = html.text(html.select(header, HEADER_CELLS)[1])
+        text = patterns.MULTIPLE_SPACES.sub('\t', text)
+        text = patterns.EDGE_SPACES.sub('', text)
         text_as_list = text.split('\t')
         return ', '.join(text_as_list)
-
-    def extract_from_page(self):
-        self.__page = self.get_results()
-        rows = self.parse_page()
-        return self.parse_results(rows)
-
-    def extract(self):
-        output_counter = 0
-        while (self.__occurences is None) or (output_counter < self.n_results and self.__occurences > output_counter):
-            self.__pagenum = output_counter / self.__per_page + 1
-            parsed_results = self.extract_from_page()
-            i = 0
-            while output_counter < self.n_results and i < len(parsed_results):
-                yield parsed_results[i]
-                i += 1
-                output_counter += 1
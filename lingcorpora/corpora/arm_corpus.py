@@ -1,8 +1,15 @@
-from .arkhangelskiy_corpora import PageParser
+from .arkhangelskiy_corpora import PageParser, RATE_LIMITS
 
 language = 'armenian1'
 results = 'http://eanc.net/EANC/search/results.php'
 
+META = {
+    'host': 'eanc.net',
+    'page_size': 100,
+    'count': True,
+    'params': ['n_results', 'kwic', 'get_analysis', 'parser_backend']
+}
+
 TEST_DATA = {'test_single_query': {'query': 'նարդի'},
              'test_multi_query': {'query': ['նարդի', 'սիրով']}
              }
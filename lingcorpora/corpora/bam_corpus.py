@@ -1,8 +1,18 @@
-from ..params_container import Container
-from requests import get
-from bs4 import BeautifulSoup
+from ..pagination import PagedParser
+from ..selectors import Selector, backend, has_class
 from html import unescape
 from ..target import Target
+from ..exceptions import EmptyPageException
+
+# limits of the Bonito server, see `lingcorpora.throttle.HostLimiter`
+RATE_LIMITS = {'maslinsky.spb.ru': {'rate': 2, 'burst': 2, 'max_concurrency': 4}}
+
+META = {
+    'host': 'maslinsky.spb.ru',
+    'page_size': 50,
+    'count': True,
+    'params': ['n_results', 'kwic', 'get_analysis', 'subcorpus', 'parser_backend']
+}
 
 TEST_DATA = {'test_single_query': {'query': 'walasa'},
              'test_multi_query': {'query': ['walasa', 'yɔrɔ']}
@@ -62,10 +72,23 @@ Example
 """
 
 
+ERROR = Selector('div#error', '//div[@id="error"]')
+TABLE = Selector('table', '//table')
+ROWS = Selector('tr', './/tr')
+N_RESULTS = Selector('strong.add_commas', '//strong[%s]' % has_class('add_commas'))
+LEFT = Selector('td.lc span.nott', './/td[%s]//span[%s]' % (has_class('lc'), has_class('nott')))
+RIGHT = Selector('td.rc span.nott', './/td[%s]//span[%s]' % (has_class('rc'), has_class('nott')))
+KWIC_TOKENS = Selector('td.kw div.token', './/td[%s]//div[%s]' % (has_class('kw'), has_class('token')))
+SENTENCE = Selector('td.par', './/td[%s]' % has_class('par'))
+TOKENS = Selector('div.token', './/div[%s]' % has_class('token'))
+WORDS = Selector('span.nott', './/span[%s]' % has_class('nott'))
+GLOSSES = Selector('div.aline', './/div[%s]' % has_class('aline'))
 
-class PageParser(Container):
+
+class PageParser(PagedParser):
     def __init__(self,*args,**kwargs):
         super().__init__(*args,**kwargs)
+        self.__html = backend(self.parser_backend)
         if self.subcorpus is None:
             self.subcorpus = 'corbama-net-non-tonal'
         if self.kwic:
@@ -73,45 +96,71 @@ class PageParser(Container):
         else:
             self.__viewmode = 'sen'
             
-        self.__page = None
-        self.__pagenum = 1
+        self.__per_page = None
 
-        
-    def get_results(self):
+
+    def _page_keys(self):
+        """
+        page numbers, known to be needed after the first page is parsed
+        """
+        pagenum = 1
+        while self.__per_page is None or (pagenum - 1) * self.__per_page < self.n_results:
+            yield pagenum
+            pagenum += 1
+
+
+    def _page_request(self, pagenum):
+        """
+        create a query url for one page
+        """
         params = {
             "corpname": self.subcorpus,
             "iquery": self.query,
-            "fromp": self.__pagenum,
+            "fromp": pagenum,
             "viewmode": self.__viewmode
         }
+        return 'GET', 'http://maslinsky.spb.ru/bonito/run.cgi/first', {'params': params}
+
+
+    def __hits(self, soup):
         """
-        create a query url and get results for one page
+        total number of results shown on the first page
         """
-        r = get('http://maslinsky.spb.ru/bonito/run.cgi/first',params)
-        return unescape(r.text)
+        html = self.__html
+        return int(html.text(html.select(soup, N_RESULTS)[0]).replace(',',''))
+
+
+    def _parse_count(self, pagenum, response):
+        html = self.__html
+        soup = html.document(unescape(response.text))
+        if html.select(soup, ERROR):
+            return 0
+        return self.__hits(soup)
 
 
-    def parse_page(self):
+    def parse_page(self, page, pagenum):
         """
         find results (and total number of results) in the page code
         """
-        soup = BeautifulSoup(self.__page, 'lxml')
-        if soup.select('div#error'):
+        html = self.__html
+        soup = html.document(page)
+        if html.select(soup, ERROR):
             return []
-        res = soup.find('table')
-        res = res.find_all('tr')
-        if self.__pagenum == 1:
-            self.n_results = min(int(soup.select('strong.add_commas')[0].text.replace(',','')),self.n_results)
+        res = html.select(html.select_one(soup, TABLE), ROWS)
+        if pagenum == 1:
+            self.n_results = min(self.__hits(soup),self.n_results)
+            self.__per_page = len(res)
         return res
 
         
     def extract_kws(self,kws):
+        html = self.__html
         final_kws = []
         tags = []
         for kw in kws:
-            text_kw = kw.select('span.nott')[0].text.strip()
-            tag = kw.select('div.aline')
-            tag = [x.text.strip() for x in tag if x.text.strip()]
+            text_kw = html.text(html.select(kw, WORDS)[0]).strip()
+            tag = [html.text(x).strip() for x in html.select(kw, GLOSSES)]
+            tag = [x for x in tag if x]
             if self.get_analysis and self.subcorpus == 'corbama-net-non-tonal':
                 tags.append({'lemma': tag[0], 'tag': tag[1], 'gloss': tag[2]})
             final_kws.append(text_kw)
@@ -124,10 +173,11 @@ class PageParser(Container):
         find hit and its left and right contexts
         in the extracted row of table
         """
-        lc = ' '.join([x.text.strip() for x in result.select('td.lc span.nott')])
-        kws = result.select('td.kw div.token')
+        html = self.__html
+        lc = ' '.join([html.text(x).strip() for x in html.select(result, LEFT)])
+        kws = html.select(result, KWIC_TOKENS)
         final_kws,tags = self.extract_kws(kws)
-        rc = ' '.join([x.text.strip() for x in result.select('td.rc span.nott')])
+        rc = ' '.join([html.text(x).strip() for x in html.select(result, RIGHT)])
         
         idx = (len(lc) + 1, len(lc) + 1 + len(final_kws))
         text = lc + ' ' + final_kws + ' ' + rc
@@ -136,23 +186,24 @@ class PageParser(Container):
  
  
     def parse_sen_result(self,result):
-        sentence = result.select('td.par  ')[0]
+        html = self.__html
+        sentence = html.select(result, SENTENCE)[0]
         text = ''
         if self.subcorpus == 'corbama-net-non-tonal':
-            for ch in sentence.children:
-                if ch.name is not None:
-                    if 'token' in ch['class']:
-                        w = ch.select('span.nott')[0].text.strip()
-                        text += w + ' '
-                    elif ch.name == 'span':
-                        kws = ch.select('div.token')
-                        final_kws, tags = self.extract_kws(kws)
-                        idx = (len(text),len(text)+len(final_kws))
-                        text += final_kws + ' '
+            for ch in html.children(sentence):
+                if html.has_class(ch, 'token'):
+                    w = html.text(html.select(ch, WORDS)[0]).strip()
+                    text += w + ' '
+                elif html.tag(ch) == 'span':
+                    kws = html.select(ch, TOKENS)
+                    final_kws, tags = self.extract_kws(kws)
+                    idx = (len(text),len(text)+len(final_kws))
+                    text += final_kws + ' '
         else:
-            lc = sentence.select('span.nott')[0].string.strip()
-            rc = sentence.select('span.nott')[-1].string.strip()
-            kws = sentence.select('div.token')
+            words = html.select(sentence, WORDS)
+            lc = html.string(words[0]).strip()
+            rc = html.string(words[-1]).strip()
+            kws = html.select(sentence, TOKENS)
             final_kws, tags = self.extract_kws(kws)
             idx = (len(lc) + 1, len(lc) + 1 + len(final_kws))
             text = lc + ' ' + final_kws + ' ' + rc
@@ -160,19 +211,12 @@ class PageParser(Container):
         return t
         
 
-    def extract(self):
-        n = 0
-        while n < self.n_results:
-            self.__page = self.get_results()
-            rows = self.parse_page()
-            if not rows:
-                break
-            r = 0
-            while n < self.n_results and r < len(rows):
-                if self.kwic:
-                    yield self.parse_kwic_result(rows[r])
-                else:
-                    yield self.parse_sen_result(rows[r])
-                n += 1
-                r += 1
-            self.__pagenum += 1
+    def _parse_page(self, pagenum, response):
+        rows = self.parse_page(unescape(response.text), pagenum)
+        if not rows:
+            raise EmptyPageException
+        for row in rows:
+            if self.kwic:
+                yield self.parse_kwic_result(row)
+            else:
+                yield self.parse_sen_result(row)
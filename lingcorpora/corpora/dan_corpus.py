@@ -1,8 +1,16 @@
-import requests
-from bs4 import BeautifulSoup
-from ..params_container import Container
+from requests.cookies import RequestsCookieJar
+from ..pagination import PagedParser
 from ..target import Target
-import re
+from ..exceptions import EmptyPageException
+from ..selectors import Selector, backend, has_class
+from .. import patterns
+
+META = {
+    'host': 'ordnet.dk',
+    'page_size': 50,
+    'count': True,
+    'params': ['n_results', 'parser_backend']
+}
 
 TEST_DATA = {'test_single_query': {'query': 'kaster'},
              'test_multi_query': {'query': ['kaster', 'kanon']}
@@ -52,76 +60,104 @@ Example
 """
 
 
-class PageParser(Container):
+LEFT = Selector('.left-context-cell', './/*[%s]' % has_class('left-context-cell'))
+RIGHT = Selector('.right-context-cell', './/*[%s]' % has_class('right-context-cell'))
+MATCH = Selector('.conc_match', './/*[%s]' % has_class('conc_match'))
+LINK = Selector('a', './/a')
+OCCURRENCES = Selector('.value', '//*[%s]' % has_class('value'))
+TABLE = Selector('.conc_table', '//*[%s]' % has_class('conc_table'))
+ROWS = Selector('tr[onmouseover]', './/tr[@onmouseover]')
+
+
+class PageParser(PagedParser):
     def __init__(self,*args,**kwargs):
         super().__init__(*args,**kwargs)
-        self.punc = re.compile("[.-\[\]:\";,!?']")
-        self.__pagenum = 1
+        self.__html = backend(self.parser_backend)
         self.__page = None
         self.__occurrences = 0
-        self.__session = requests.Session()
-        
-    def get_first_page(self):
-        params = {'query': '"' + self.query + '"',
-                  'search': 'Search',
-                  'tag': 'word'}
-        response = self.__session.get('http://ordnet.dk/korpusdk_en/concordance/action', params=params)
-        return response
-
-
-    def get_page(self):
-        params = {'page': self.__pagenum}
-        page = requests.get('http://ordnet.dk/korpusdk_en/concordance/result/navigate',
-                            params=params, cookies=self.__session.cookies)
-        return page
+        self.__num_page = 1
+        self.__cookies = RequestsCookieJar()
+
+
+    def _page_keys(self):
+        """
+        the number of pages is known after the first page
+        """
+        yield 1
+        for pagenum in range(2, self.__num_page + 1):
+            yield pagenum
+
+
+    def _page_request(self, pagenum):
+        """
+        the first page starts the search in the server session,
+        the others are navigated to within it
+        """
+        if pagenum == 1:
+            params = {'query': '"' + self.query + '"',
+                      'search': 'Search',
+                      'tag': 'word'}
+            return 'GET', 'http://ordnet.dk/korpusdk_en/concordance/action', \
+                   {'params': params, 'cookies': self.__cookies}
+        params = {'page': pagenum}
+        return 'GET', 'http://ordnet.dk/korpusdk_en/concordance/result/navigate', \
+               {'params': params, 'cookies': self.__cookies}
 
 
     def extract_one_res(self,sen):
+        html = self.__html
         left_part = ''
         right_part = ''
-        for word in sen.select('.left-context-cell'):
-           left_part = left_part + ' ' + word.select('a')[0].text
-        for word in sen.select('.right-context-cell'):
-            right_part = right_part + ' ' + word.select('a')[0].text
-        center_part = ' '.join([m.a.text.strip() for m in sen.select('.conc_match')])
+        for word in html.select(sen, LEFT):
+            left_part = left_part + ' ' + html.text(html.select(word, LINK)[0])
+        for word in html.select(sen, RIGHT):
+            right_part = right_part + ' ' + html.text(html.select(word, LINK)[0])
+        center_part = ' '.join([html.text(html.select_one(m, LINK)).strip()
+                                for m in html.select(sen, MATCH)])
         left_part, right_part = left_part.strip(), right_part.strip()
-        if self.punc.search(center_part[1:]) is not None:
-            right_part = center_part[self.punc.search(center_part[1:]).start()+1:].strip() + ' ' + right_part
-            center_part = center_part[0:self.punc.search(center_part[1:]).start()+1].strip()
+        punc = patterns.DAN_PUNCT.search(center_part[1:])
+        if punc is not None:
+            right_part = center_part[punc.start()+1:].strip() + ' ' + right_part
+            center_part = center_part[0:punc.start()+1].strip()
         idx = (len(left_part) + 1, len(left_part) + 1 + len(center_part))
         text = left_part + ' ' + center_part + ' ' + right_part
         t = Target(text, idx, '', None)
         return t        
         
         
-    def get_results_page(self):
-        soup = BeautifulSoup(self.__page.text, 'lxml')
-        if self.__pagenum == 1:
-            occur = soup.select('.value')[0].text
-            self.__occurrences = int(occur[(occur.find('of') + 2):(occur.find('occur'))].strip())
-            if self.__occurrences > 49:
-                self.__occurrences -= 1
-        p = soup.select('.conc_table')[0]
-        return p.select('tr[onmouseover]')
-
-
-    def extract(self):
-        n = 0
-        self.__page = self.get_first_page()
-        if self.__page.status_code == 200:
-            results = self.get_results_page()
-            final_total = min(self.n_results,self.__occurrences)
-            num_page = final_total // 50 + 1
-            while n < final_total and n < len(results):
-                yield self.extract_one_res(results[n])
-                n += 1
-            for i in range(2, num_page + 1):
-                r = 0
-                self.__pagenum = i
-                self.__page = self.get_page()
-                results = self.get_results_page()
-                while n < final_total and r < len(results):
-                    yield self.extract_one_res(results[r])
-                    n += 1
-                    r += 1
-        self.__session.close()
+    def get_results_page(self, pagenum):
+        html = self.__html
+        soup = html.document(self.__page.text)
+        if pagenum == 1:
+            self.__occurrences = self.__hits(soup)
+        p = html.select(soup, TABLE)[0]
+        return html.select(p, ROWS)
+
+
+    def __hits(self, soup):
+        """
+        total number of results shown on the first page
+        """
+        occur = self.__html.text(self.__html.select(soup, OCCURRENCES)[0])
+        occurrences = int(occur[(occur.find('of') + 2):(occur.find('occur'))].strip())
+        if occurrences > 49:
+            occurrences -= 1
+        return occurrences
+
+
+    def _parse_count(self, pagenum, response):
+        if response.status_code != 200:
+            return 0
+        return self.__hits(self.__html.document(response.text))
+
+
+    def _parse_page(self, pagenum, response):
+        if pagenum == 1 and response.status_code != 200:
+            raise EmptyPageException
+        self.__page = response
+        results = self.get_results_page(pagenum)
+        if pagenum == 1:
+            self.n_results = min(self.n_results, self.__occurrences)
+            self.__num_page = self.n_results // 50 + 1
+        for sen in results:
+            yield self.extract_one_res(sen)
@@ -1,7 +1,13 @@
-from ..params_container import Container
+from ..pagination import PagedParser
 from ..target import Target
-from requests import post
-from bs4 import BeautifulSoup
+from ..selectors import Selector, backend, has_class
+
+META = {
+    'host': 'www.dwds.de',
+    'page_size': None,
+    'count': False,
+    'params': ['n_results', 'kwic', 'subcorpus', 'parser_backend']
+}
 
 TEST_DATA = {'test_single_query': {'query': 'da'},
              'test_multi_query': {'query': ['da', 'immer']}
@@ -74,16 +80,25 @@ Example
 """
 
 
-class PageParser(Container):
+LEFT = Selector('.ddc-kwic-ls', '//*[%s]' % has_class('ddc-kwic-ls'))
+CENTER = Selector('.ddc-kwic-kw.ddc-hl', '//*[%s and %s]' % (has_class('ddc-kwic-kw'), has_class('ddc-hl')))
+RIGHT = Selector('.ddc-kwic-rs', '//*[%s]' % has_class('ddc-kwic-rs'))
+
+
+class PageParser(PagedParser):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.__html = backend(self.parser_backend)
 
         self.__page = None
         if self.subcorpus is None:
             self.subcorpus = 'kern'
 
-    def __get_page(self):
+    def _page_keys(self):
+        yield 0
+
+    def _page_request(self, key):
         params = {'corpus': self.subcorpus,
                   'date-end': '1999',
                   'date-start': '1900',
@@ -95,8 +110,7 @@ class PageParser(Container):
                   'limit': self.n_results,
                   'q': self.query,
                   'sort': 'date_asc'}
-        s = post('https://www.dwds.de/r', params=params)
-        return s
+        return 'POST', 'https://www.dwds.de/r', {'params': params}
 
     def __new_target(self, left, word, right):
         text = '%s %s %s' % (left, word, right)
@@ -109,24 +123,19 @@ class PageParser(Container):
         left_list = []
         right_list = []
         center_list = []
-        soup = BeautifulSoup(self.__page.text, 'lxml')
-        for left in soup.select('.ddc-kwic-ls'):
-            left_list.append(left.text.strip())
-        for center in soup.select('.ddc-kwic-kw.ddc-hl'):
-            center_list.append(center.text.strip())
-        for right in soup.select('.ddc-kwic-rs'):
-            right_list.append(right.text.strip())
+        html = self.__html
+        soup = html.document(self.__page.text)
+        for left in html.select(soup, LEFT):
+            left_list.append(html.text(left).strip())
+        for center in html.select(soup, CENTER):
+            center_list.append(html.text(center).strip())
+        for right in html.select(soup, RIGHT):
+            right_list.append(html.text(right).strip())
 
         s = [self.__new_target(l, w, r) for l, w, r in zip(
             left_list, center_list, right_list)]
         return s
 
-    def __extract_results(self):
-        self.__page = self.__get_page()
-        parsed_results = self.__get_results()
-        return parsed_results
-
-    def extract(self):
-        parsed_results = self.__extract_results()
-        for res in parsed_results:
-            yield res
+    def _parse_page(self, key, response):
+        self.__page = response
+        return self.__get_results()
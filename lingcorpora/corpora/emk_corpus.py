@@ -1,8 +1,18 @@
-from requests import get
-from bs4 import BeautifulSoup
-from ..params_container import Container
+from ..pagination import PagedParser
+from ..selectors import Selector, backend, has_class
 from html import unescape
 from ..target import Target
+from ..exceptions import EmptyPageException
+
+# limits of the Bonito server, see `lingcorpora.throttle.HostLimiter`
+RATE_LIMITS = {'maslinsky.spb.ru': {'rate': 2, 'burst': 2, 'max_concurrency': 4}}
+
+META = {
+    'host': 'maslinsky.spb.ru',
+    'page_size': 50,
+    'count': True,
+    'params': ['n_results', 'kwic', 'subcorpus', 'writing_system', 'parser_backend']
+}
 
 TEST_DATA = {'test_single_query': {'query': 'kɔdɔ'},
              'test_multi_query': {'query': ['alu', 'kɔdɔ']}
@@ -63,7 +73,16 @@ Example
 
 """
 
-class PageParser(Container):
+ERROR = Selector('div#error', '//div[@id="error"]')
+TABLE = Selector('table', '//table')
+ROWS = Selector('tr', './/tr')
+N_RESULTS = Selector('strong[data-num]', '//strong[@data-num]')
+LEFT = Selector('td.lc span.nott', './/td[%s]//span[%s]' % (has_class('lc'), has_class('nott')))
+RIGHT = Selector('td.rc span.nott', './/td[%s]//span[%s]' % (has_class('rc'), has_class('nott')))
+WORDS = Selector('span.nott', './/span[%s]' % has_class('nott'))
+TARGET = Selector('div.token span.nott', './/div[%s]//span[%s]' % (has_class('token'), has_class('nott')))
+
+class PageParser(PagedParser):
     """
     TODO: 
     tackle emerging latin in nko subcorp
@@ -71,6 +90,7 @@ class PageParser(Container):
     """
     def __init__(self,*args,**kwargs):
         super().__init__(*args,**kwargs)
+        self.__html = backend(self.parser_backend)
         if self.subcorpus is None:
             self.subcorpus = 'cormani-brut-lat'
         if self.writing_system is None or self.subcorpus.endswith(self.writing_system[:3]):
@@ -80,17 +100,26 @@ class PageParser(Container):
         else:
             self.__viewmode = 'sen'
             
-        self.__page = None
-        self.__pagenum = 1
+        self.__per_page = None
+
+
+    def _page_keys(self):
+        """
+        page numbers, known to be needed after the first page is parsed
+        """
+        pagenum = 1
+        while self.__per_page is None or (pagenum - 1) * self.__per_page < self.n_results:
+            yield pagenum
+            pagenum += 1
         
  
-    def get_results(self):
+    def _page_request(self, pagenum):
         """
-        create a query url and get results for one page
+        create a query url for one page
         """
         params = {
             "corpname": self.subcorpus,
-            "fromp": self.__pagenum,
+            "fromp": pagenum,
             "viewmode": self.__viewmode,
             "attrs": self.writing_system,
             "ctxattrs": self.writing_system,
@@ -102,48 +131,59 @@ class PageParser(Container):
             params['iquery'] = ''
             params['word'] = self.query
             params['queryselector'] = 'wordrow'
-        r = get('http://maslinsky.spb.ru/emk/run.cgi/first', params)
-        return unescape(r.text)
+        return 'GET', 'http://maslinsky.spb.ru/emk/run.cgi/first', {'params': params}
+
+
+    def __hits(self, soup):
+        """
+        total number of results shown on the first page
+        """
+        html = self.__html
+        return int(html.text(html.select(soup, N_RESULTS)[0]))
+
+
+    def _parse_count(self, pagenum, response):
+        html = self.__html
+        soup = html.document(unescape(response.text))
+        if html.select(soup, ERROR):
+            return 0
+        return self.__hits(soup)
 
 
-    def parse_page(self):
+    def parse_page(self, page, pagenum):
         """
         find results (and total number of results) in the page code
         """
-        soup = BeautifulSoup(self.__page, 'lxml')
-        if soup.select('div#error'):
+        html = self.__html
+        soup = html.document(page)
+        if html.select(soup, ERROR):
             return []
-        res = soup.find('table')
-        res = res.find_all('tr')
-        if self.__pagenum == 1:
-            self.n_results = min(int(soup.select('strong[data-num]')[0].text),self.n_results)
+        res = html.select(html.select_one(soup, TABLE), ROWS)
+        if pagenum == 1:
+            self.n_results = min(self.__hits(soup),self.n_results)
+            self.__per_page = len(res)
         return res      
         
    
     def parse_result(self,result):
+        html = self.__html
         if self.kwic:
-            lc = ' '.join([x.text.strip() for x in result.select('td.lc span.nott')]).strip()
-            rc = ' '.join([x.text.strip() for x in result.select('td.rc span.nott')]).strip()
+            lc = ' '.join([html.text(x).strip() for x in html.select(result, LEFT)]).strip()
+            rc = ' '.join([html.text(x).strip() for x in html.select(result, RIGHT)]).strip()
         else:
-            lc = result.select('span.nott')[0].string.strip()
-            rc = result.select('span.nott')[-1].string.strip()
-        final_kws = result.select('div.token span.nott')[0].string.strip()
+            words = html.select(result, WORDS)
+            lc = html.string(words[0]).strip()
+            rc = html.string(words[-1]).strip()
+        final_kws = html.string(html.select(result, TARGET)[0]).strip()
         idx = (len(lc) + 1, len(lc) + 1 + len(final_kws))
         text = lc + ' ' + final_kws + ' ' + rc
         t = Target(text.strip(), idx, '', None)
         return t
 
         
-    def extract(self):
-        n = 0
-        while n < self.n_results:
-            self.__page = self.get_results()
-            rows = self.parse_page()
-            if not rows:
-                break
-            r = 0
-            while n < self.n_results and r < len(rows):
-                yield self.parse_result(rows[r])
-                n += 1
-                r += 1
-            self.__pagenum += 1
+    def _parse_page(self, pagenum, response):
+        rows = self.parse_page(unescape(response.text), pagenum)
+        if not rows:
+            raise EmptyPageException
+        for row in rows:
+            yield self.parse_result(row)
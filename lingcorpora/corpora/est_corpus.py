@@ -1,8 +1,14 @@
-from ..params_container import Container
+from ..pagination import PagedParser
 from ..target import Target
-from requests import get
-from bs4 import BeautifulSoup
-import re
+from ..selectors import Selector, backend
+from .. import patterns
+
+META = {
+    'host': 'www.cl.ut.ee',
+    'page_size': None,
+    'count': False,
+    'params': ['n_results', 'subcorpus', 'parser_backend']
+}
 
 TEST_DATA = {'test_single_query': {'query': 'keele'},
              'test_multi_query': {'query': ['keele', 'tulnud']}
@@ -127,58 +133,64 @@ Example
 
 """
 
-class PageParser(Container):
+TARGETS = Selector('strong', '//strong')
+
+class PageParser(PagedParser):
     def __init__(self,*args,**kwargs):
         super().__init__(*args,**kwargs)
+        self.__html = backend(self.parser_backend)
         self.__page = None
-        self.p = re.compile('[ .-:;,!?]')
         if self.subcorpus is None:
             self.subcorpus = '1990_ajalehed_26_08_04'
 
-    def get_page(self):
+    def _page_keys(self):
+        yield 0
+
+    def _page_request(self, key):
         params = {'otsisona': r'\b'+self.query+r'\b',
                   'subcorp': self.subcorpus.split(';'),
                   'kontekst': '0',
                   'lause_arv': '0'}
-        s = get('http://www.cl.ut.ee/korpused/kasutajaliides/konk.cgi.et', params=params)
-        return s
+        return 'GET', 'http://www.cl.ut.ee/korpused/kasutajaliides/konk.cgi.et', {'params': params}
 
     def find_right_part(self, elem, right_part):
-        right_part = right_part + elem.string + elem.next_sibling
-        if elem.next_sibling.next_sibling.name != 'br':
-            right_part = self.find_right_part(elem.next_sibling.next_sibling, right_part)
+        html = self.__html
+        right_part = right_part + html.string(elem) + html.next_string(elem)
+        if html.tag(html.next_element(elem)) != 'br':
+            right_part = self.find_right_part(html.next_element(elem), right_part)
         return right_part
 
     def find_left_part(self, elem, left_part):
-        left_part = elem.previous_sibling + elem.string + left_part
-        if elem.previous_sibling.previous_sibling.name != 'hr':
-            left_part = self.find_left_part(elem.previous_sibling.previous_sibling, left_part)
+        html = self.__html
+        left_part = html.previous_string(elem) + html.string(elem) + left_part
+        if html.tag(html.previous_element(elem)) != 'hr':
+            left_part = self.find_left_part(html.previous_element(elem), left_part)
         return left_part
 
-    def extract(self):
-        s = 0
-        self.__page = self.get_page()
-        soup = BeautifulSoup(self.__page.text, 'lxml')
-        strong = soup.select('strong')
+    def _parse_page(self, key, response):
+        self.__page = response
+        html = self.__html
+        soup = html.document(self.__page.text)
+        strong = html.select(soup, TARGETS)
         if strong:
             for elem in strong:
-                right_part = elem.next_sibling
-                left_part = elem.previous_sibling
-                center_part = elem.string
-                if elem.next_sibling.next_sibling.name != 'br':
-                    right_part = self.find_right_part(elem.next_sibling.next_sibling, right_part)
-                if elem.previous_sibling.previous_sibling.name != 'hr':
-                    left_part = self.find_left_part(elem.previous_sibling.previous_sibling, left_part)
+                right_part = html.next_string(elem)
+                left_part = html.previous_string(elem)
+                center_part = html.string(elem)
+                if html.tag(html.next_element(elem)) != 'br':
+                    right_part = self.find_right_part(html.next_element(elem), right_part)
+                if html.tag(html.previous_element(elem)) != 'hr':
+                    left_part = self.find_left_part(html.previous_element(elem), left_part)
                     
+                # a hit at the end of its line has no right context
+                punct = patterns.EST_PUNCT.search(right_part)
+                punct = punct.start() if punct is not None else len(right_part)
                 left_part, center_part, right_part = (
                     left_part.split('    ', maxsplit=1)[1].strip(),
-                    center_part + right_part[0:self.p.search(right_part).start()].strip(),
-                    right_part[self.p.search(right_part).start():].strip()
+                    center_part + right_part[0:punct].strip(),
+                    right_part[punct:].strip()
                 )
                 idx = (len(left_part) + 1, len(left_part) + 1 + len(center_part))
                 text = left_part + ' ' + center_part + ' ' + right_part
                 t = Target(text, idx, '', None)
                 yield t
-                s += 1
-                if s == self.n_results:
-                    break
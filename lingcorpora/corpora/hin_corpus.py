@@ -1,11 +1,17 @@
-from ..params_container import Container
+from ..pagination import PagedParser
 from ..target import Target
-from requests import get
-from bs4 import BeautifulSoup
-import re
+from ..selectors import Selector, backend
+from .. import patterns
 
 # has errors exporting results with words with diacritics on the end
 
+META = {
+    'host': 'www.cfilt.iitb.ac.in',
+    'page_size': None,
+    'count': False,
+    'params': ['n_results', 'kwic', 'start', 'parser_backend']
+}
+
 TEST_DATA = {'test_single_query': {'query': 'कुत्ते'},
              'test_multi_query': {'query': ['कुत्ते', 'हाय']}
             }
@@ -58,24 +64,34 @@ Example
 """
 
 
-class PageParser(Container):
+SENTENCES = Selector('tr[bgcolor*="f"] td', '//tr[contains(@bgcolor, "f")]//td')
+TARGET = Selector('font a[target]', './/font//a[@target]')
+
+
+class PageParser(PagedParser):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self.__html = backend(self.parser_backend)
         self.page = None
         if self.start is None:
             self.start = 0
 
-    def __get_page(self):
+    def _page_keys(self):
+        """
+        all results are on one page
+        """
+        yield self.start
+
+    def _page_request(self, start):
         """
-        create a query url and return a page with results
+        create a query url of the page with results
         """
         params = {'word': self.query,
                   'limit': self.n_results,
-                  'start': self.start,
+                  'start': start,
                   'submit': 'Search'}
-        s = get('http://www.cfilt.iitb.ac.in/~corpus/hindi/find.php', params=params)
-        return s
+        return 'GET', 'http://www.cfilt.iitb.ac.in/~corpus/hindi/find.php', {'params': params}
 
     def __new_target(self, left, word, right):
         text = '%s %s %s' % (left, word, right)
@@ -88,18 +104,19 @@ class PageParser(Container):
         """
         parse the page and get results
         """
-        num = re.compile(r'\d+')
         sentence_list = []
         center_list = []
         left_list = []
         right_list = []
-        soup = BeautifulSoup(self.page.text, 'lxml')
-        for sentence in soup.select('tr[bgcolor*="f"] td'):
-            if not num.match(sentence.text) and sentence.text.strip():
-                sentence_list.append(sentence.text)
-                center = sentence.select('font a[target]')
-                if center and not num.match(center[0].text):
-                    center_list.append(center[0].text)
+        html = self.__html
+        soup = html.document(self.page.text)
+        for sentence in html.select(soup, SENTENCES):
+            sentence_text = html.text(sentence)
+            if not patterns.DIGITS.match(sentence_text) and sentence_text.strip():
+                sentence_list.append(sentence_text)
+                center = html.select(sentence, TARGET)
+                if center and not patterns.DIGITS.match(html.text(center[0])):
+                    center_list.append(html.text(center[0]))
                 else:
                     center_list.append('')
         for i in range(len(sentence_list)):
@@ -114,12 +131,6 @@ class PageParser(Container):
             left_list, center_list, right_list)]
         return s
 
-    def __extract_results(self):
-        self.page = self.__get_page()
-        parsed_results = self.__get_results()
-        return parsed_results
-
-    def extract(self):
-        parsed_results = self.__extract_results()
-        for res in parsed_results:
-            yield res
+    def _parse_page(self, start, response):
+        self.page = response
+        return self.__get_results()
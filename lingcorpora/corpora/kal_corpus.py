@@ -1,8 +1,15 @@
-from .arkhangelskiy_corpora import PageParser
+from .arkhangelskiy_corpora import PageParser, RATE_LIMITS
 
 language = 'kalmyk'
 results = 'http://web-corpora.net/KalmykCorpus/search/results.php'
 
+META = {
+    'host': 'web-corpora.net',
+    'page_size': 100,
+    'count': True,
+    'params': ['n_results', 'kwic', 'get_analysis', 'parser_backend']
+}
+
 TEST_DATA = {'test_single_query': {'query': 'мис'},
              'test_multi_query': {'query': ['мис', 'бәәх']}
              }
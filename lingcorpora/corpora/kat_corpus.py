@@ -1,9 +1,17 @@
-from ..params_container import Container
+from ..pagination import PagedParser
 from ..target import Target
-import requests
-from bs4 import BeautifulSoup
+from ..exceptions import EmptyPageException
+from requests.cookies import RequestsCookieJar
+from ..selectors import Selector, backend, has_class
 
 
+META = {
+    'host': 'corpora.iliauni.edu.ge',
+    'page_size': 10,
+    'count': True,
+    'params': ['n_results', 'parser_backend']
+}
+
 TEST_DATA = {'test_single_query': {'query': 'წელი'},
              'test_multi_query': {'query': ['წამს', 'დეიდა']}
             }
@@ -52,52 +60,91 @@ Example
 
 """
 
-class PageParser(Container):
+OCCURRENCES = Selector('.mtavruli', '//*[%s]' % has_class('mtavruli'))
+TABLE = Selector('.result_table', '//*[%s]' % has_class('result_table'))
+ROWS = Selector('tr', './/tr')
+LEFT = Selector('.left_side', './/*[%s]' % has_class('left_side'))
+RIGHT = Selector('.right_side', './/*[%s]' % has_class('right_side'))
+TARGET = Selector('.found_word', './/*[%s]' % has_class('found_word'))
+
+class PageParser(PagedParser):
     def __init__(self,*args,**kwargs):
         super().__init__(*args,**kwargs)
-        self.__pagenum = 0
+        self.__html = backend(self.parser_backend)
         self.__page = None
         self.__occurrences = 0
-        self.__session = requests.Session()
+        self.__num_page = 1
+        self.__cookies = RequestsCookieJar()
+
+
+    def _page_keys(self):
+        """
+        the number of pages is known after the first page
+        """
+        yield 0
+        for pagenum in range(1, self.__num_page):
+            yield pagenum
+
+
+    def _page_request(self, pagenum):
+        """
+        the first page starts the search in the server session,
+        the others are navigated to within it
+        """
+        if pagenum == 0:
+            return self.__first_page_request()
+        params = {'page': str(pagenum),
+                  'q':	'search-words'}
+        return 'GET', 'http://corpora.iliauni.edu.ge/', {'params': params, 'cookies': self.__cookies}
+
         
-    def get_first_page(self):
+    def __first_page_request(self):
         data = {'exact_word': self.query,
                 'op': 'Search',
                 'form_build_id': 'form-hMOF3mG0n7lwL6LmHrPi9vZCcaLbsZmCAco4z8vALT4',
                 'form_id': 'sw_exact_word_search_form'}
         params = {'q': 'search-words'}
-        response = self.__session.post('http://corpora.iliauni.edu.ge/', params=params, data=data)
-        return response
+        return 'POST', 'http://corpora.iliauni.edu.ge/', \
+               {'params': params, 'data': data, 'cookies': self.__cookies}
 
 
-    def get_page(self):
-        params = {'page': str(self.__pagenum),
-                  'q':	'search-words'}
-        page = requests.get('http://corpora.iliauni.edu.ge/', params=params, cookies=self.__session.cookies)
-        return page
+    def get_results_page(self, pagenum):
+        html = self.__html
+        soup = html.document(self.__page.text)
+        if pagenum == 0:
+            self.__occurrences = self.__hits(soup)
+        table = html.select(soup, TABLE)[0]
+        return html.select(table, ROWS)
+
+        
+    def __hits(self, soup):
+        """
+        total number of results shown on the first page
+        """
+        occur = self.__html.string(self.__html.select(soup, OCCURRENCES)[0])
+        return int(occur.split(' ')[2])
 
 
-    def get_results_page(self):
-        res = []
-        soup = BeautifulSoup(self.__page.text, 'lxml')
-        if self.__pagenum == 0:
-            occur = soup.select('.mtavruli')[0].string
-            self.__occurrences = int(occur.split(' ')[2])
-        table = soup.select('.result_table')[0]
-        return table.select('tr')
+    def _parse_count(self, pagenum, response):
+        if response.status_code != 200:
+            return 0
+        return self.__hits(self.__html.document(response.text))
 
         
     def extract_one_res(self,sen):
+        html = self.__html
         left_part = ''
         right_part = ''
-        for word in sen.select('.left_side'):
-            if word.string:
-                left_part = left_part + ' ' + word.string
-        for word in sen.select('.right_side'):
-            if word.string:
-                right_part = right_part + ' ' + word.string
+        for word in html.select(sen, LEFT):
+            string = html.string(word)
+            if string:
+                left_part = left_part + ' ' + string
+        for word in html.select(sen, RIGHT):
+            string = html.string(word)
+            if string:
+                right_part = right_part + ' ' + string
         left_part, center_part, right_part = left_part.strip(), \
-                                             sen.select('.found_word')[0].string.strip(), \
+                                             html.string(html.select(sen, TARGET)[0]).strip(), \
                                              right_part.strip()
         idx = (len(left_part) + 1, len(left_part) + 1 + len(center_part))
         text = left_part + ' ' + center_part + ' ' + right_part
@@ -105,24 +152,13 @@ class PageParser(Container):
         return t
 
         
-    def extract(self):
-        n = 0
-        self.__page = self.get_first_page()
-        if self.__page.status_code == 200:
-            results = self.get_results_page()
-            final_total = min(self.n_results, self.__occurrences)
-            num_page = (final_total + 9) // 10
-            while n < final_total and n < len(results):
-                yield self.extract_one_res(results[n])
-                n += 1
-            for i in range(1, num_page):
-                r = 0
-                self.__pagenum = i
-                self.__page = self.get_page()
-                results = self.get_results_page()
-                while n < final_total and r < len(results):
-                    yield self.extract_one_res(results[r])
-                    n += 1
-                    r += 1
-        self.__session.close()
-
+    def _parse_page(self, pagenum, response):
+        if pagenum == 0 and response.status_code != 200:
+            raise EmptyPageException
+        self.__page = response
+        results = self.get_results_page(pagenum)
+        if pagenum == 0:
+            self.n_results = min(self.n_results, self.__occurrences)
+            self.__num_page = (self.n_results + 9) // 10
+        for sen in results:
+            yield self.extract_one_res(sen)
@@ -1,13 +1,11 @@
 # python3
 # coding=<UTF-8>
 
-import os
-import re
-
-from lxml.etree import parse
+from itertools import chain
 from urllib.request import quote
 
-from ..params_container import Container
+from ..iterparse import iter_elements, CHUNK_SIZE
+from ..pagination import PagedParser
 from ..target import Target
 from ..exceptions import EmptyPageException
 
@@ -164,18 +162,23 @@ GR_TAGS_INFO = \
     несовершенный: ipf
 """
 
+META = {
+    'host': 'search1.ruscorpora.ru',
+    'page_size': 100,
+    'count': False,
+    'params': ['n_results', 'kwic', 'get_analysis', 'subcorpus', 'gr_tags']
+}
+
 TEST_DATA = {'test_single_query': {'query': 'фонема'},
              'test_multi_query': {'query': ['фонема', 'морфема']}
 }
 
 
-class PageParser(Container):
+class PageParser(PagedParser):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
-        self.__stop_flag = False
-        self.__page_num = 0
         self.__targets_seen = 0
         
         self.subcorpus = self.subcorpus if self.subcorpus is not None else 'main' 
@@ -244,9 +247,16 @@ class PageParser(Container):
                 else:
                     continue
         
-    def __get_page(self, page_num):
+    def _page_keys(self):
+        page_num = 0
+        
+        while self.__targets_seen < self.n_results:
+            yield page_num
+            page_num += 1
+    
+    def _page_request(self, page_num):
         """
-        return: etree of the page
+        return: request of the page
         """
 
         if self.gr_tags is not None:
@@ -269,34 +279,27 @@ class PageParser(Container):
         request = self.__request_gr if self.gr_tags is not None else self.__request
         request = request % (arguments)
         
-        return parse(self.__url + request)
+        # the current page is parsed while it is downloaded; pages fetched
+        # ahead are read in full by the background threads
+        return 'GET', self.__url + request, {'stream': not self._prefetch_depth()}
 
-    def __get_results(self, page):
-        docs_tree = page.xpath(self.__xpath)
-        
-        if not docs_tree:
-            raise EmptyPageException
-    
-        for doc in self.__parse_docs(docs_tree, self.get_analysis):
-            self.__targets_seen += 1
-            
-            if self.__targets_seen <= self.n_results:
-                yield Target(*doc) 
-            
-            else:
-                self.__stop_flag = True
-                return
-    
-    def extract(self):
+    def _parse_page(self, page_num, response):
         """
-        A streamer to Corpus
+        documents are parsed one by one while the page is being downloaded
+        (it is requested with ``stream=True``)
         """
 
-        while not self.__stop_flag:
-            try:
-                page = self.__get_page(self.__page_num)
-                yield from self.__get_results(page)
-                self.__page_num += 1
-                
-            except EmptyPageException:
-                self.__stop_flag = True
+        try:
+            docs = iter_elements(response.iter_content(CHUNK_SIZE), self.__xpath)
+            first = next(docs, None)
+
+            if first is None:
+                raise EmptyPageException
+
+            for doc in self.__parse_docs(chain((first,), docs), self.get_analysis):
+                self.__targets_seen += 1
+                yield Target(*doc)
+
+        finally:
+            # the connection goes back to the pool even if parsing stops early
+            response.close()
@@ -1,10 +1,11 @@
 # python3
 # coding=<UTF-8>
 
-from lxml import etree
+from itertools import chain
 import urllib.request as ur
 
-from ..params_container import Container
+from ..iterparse import iter_elements, CHUNK_SIZE
+from ..pagination import PagedParser
 from ..target import Target
 from ..exceptions import EmptyPageException
 
@@ -73,12 +74,19 @@ Example
 """
 
 
+META = {
+    'host': 'search1.ruscorpora.ru',
+    'page_size': 100,
+    'count': False,
+    'params': ['n_results', 'kwic', 'get_analysis', 'subcorpus', 'query_language']
+}
+
 TEST_DATA = {'test_single_query': {'query': 'стул', 'query_language': 'rus'},
              'test_multi_query': {'query': ['стол', 'стул'], 'query_language': 'rus'}
             }
 
 
-class PageParser(Container):
+class PageParser(PagedParser):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
@@ -92,8 +100,6 @@ class PageParser(Container):
         self.__temp = 'temptree.xml'
         self.__xpath = '/page/searchresult/body/result/document'
         self.__dpp = 100
-        self.__stop_flag = False
-        self.__c_page = 0
         self.__targets_seen = 0
             
         self.__dom = 'http://search1.ruscorpora.ru/dump.xml?'
@@ -192,9 +198,16 @@ class PageParser(Container):
                     else:
                         continue
         
-    def get_page(self):
+    def _page_keys(self):
+        c_page = 0
+
+        while self.__targets_seen < self.n_results:
+            yield c_page
+            c_page += 1
+
+    def _page_request(self, c_page):
         """
-        return documents tree
+        return request of the page
         """
         params = ('%28lang%3A%22'+self.subcorpus+'%22+%7C+lang_trans%3A%22'+self.subcorpus+'%22%29',
                   'lexform',
@@ -202,35 +215,30 @@ class PageParser(Container):
                   'gr_tagging',
                   'alpha',
                   ur.quote(self.query),
-                  self.__c_page)
+                  c_page)
 
         post = self.__post % (params)
-        return etree.parse(self.__dom + post)
+        # the current page is parsed while it is downloaded; pages fetched
+        # ahead are read in full by the background threads
+        return 'GET', self.__dom + post, {'stream': not self._prefetch_depth()}
 
-    def get_results(self):
-        docs_tree = self.page.xpath(self.__xpath)
-
-        if not docs_tree:
-            raise EmptyPageException
-    
-        for doc in self.__parse_docs(docs_tree, self.query_language, analyses=self.get_analysis):
-            self.__targets_seen += 1
-            if self.__targets_seen <= self.n_results:
-                yield Target(*doc) 
-            else:
-                self.__stop_flag = True
-                return
-    
-    def extract(self):
+    def _parse_page(self, c_page, response):
         """
-        streamer to Query
+        documents are parsed one by one while the page is being downloaded
+        (it is requested with ``stream=True``)
         """
-        while not self.__stop_flag:
-            try:
-                self.page = self.get_page()
-                yield from self.get_results()
 
-            except EmptyPageException:
-                self.__stop_flag = True
-            
-            self.__c_page += 1
+        try:
+            docs = iter_elements(response.iter_content(CHUNK_SIZE), self.__xpath)
+            first = next(docs, None)
+
+            if first is None:
+                raise EmptyPageException
+
+            for doc in self.__parse_docs(chain((first,), docs), self.query_language, analyses=self.get_analysis):
+                self.__targets_seen += 1
+                yield Target(*doc)
+
+        finally:
+            # the connection goes back to the pool even if parsing stops early
+            response.close()
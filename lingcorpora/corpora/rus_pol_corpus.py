@@ -3,7 +3,7 @@
 
 from lxml import html
 
-from ..params_container import Container
+from ..pagination import PagedParser
 from ..target import Target
 from ..exceptions import EmptyPageException
 
@@ -59,12 +59,19 @@ Example
 """
 
 
+META = {
+    'host': 'pol-ros.polon.uw.edu.pl',
+    'page_size': None,
+    'count': False,
+    'params': ['n_results', 'kwic', 'subcorpus', 'query_language']
+}
+
 TEST_DATA = {'test_single_query': {'query': 'стул', 'query_language': 'rus'},
              'test_multi_query': {'query': ['стул', 'стол'], 'query_language': 'rus'}
             }
 
 
-class PageParser(Container):
+class PageParser(PagedParser):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -100,16 +107,19 @@ class PageParser(Container):
             self.query_language = 'ru'
 
         self.__dom = 'http://pol-ros.polon.uw.edu.pl/searchresults/searchw' + self.query_language + '.php?'
-        self.__post = ''
-        self.__stop_flag = False
-        self.__c_page = 0
-        self.__targets_seen = 0
         self.__xpath = '/html/body/table/tr'
 
-    def get_page(self):
+    def _page_keys(self):
+        """
+        all results are on one page
         """
-        return documents tree
+        yield 0
+
+    def _page_request(self, key):
         """
+        return request of the page
+        """
+        post = ''
         params = {'string' + self.query_language: self.query,
                   'limit' + self.query_language.title(): str(self.n_results)}
 
@@ -117,12 +127,12 @@ class PageParser(Container):
             params[corpus] = 'on'
 
         for key in params:
-            self.__post += key
-            self.__post += '='
-            self.__post += params[key]
-            self.__post += '&'
+            post += key
+            post += '='
+            post += params[key]
+            post += '&'
 
-        return html.parse(self.__dom + self.__post[:-1])
+        return 'GET', self.__dom + post[:-1], {}
 
     def __parse_docs(self, tree):
         """
@@ -162,30 +172,15 @@ class PageParser(Container):
             else:
                 continue
 
-    def get_results(self):
+    def _parse_page(self, key, response):
         """
-        iterate over results and yield Target objects to extract() method
+        iterate over results and yield Target objects
         """
-        docs_tree = self.page.xpath(self.__xpath)
+        page = html.document_fromstring(response.content).getroottree()
+        docs_tree = page.xpath(self.__xpath)
 
         if not docs_tree:
             raise EmptyPageException
 
         for doc in self.__parse_docs(docs_tree):
-            self.__targets_seen += 1
-            if self.__targets_seen <= self.n_results:
-                yield Target(*doc)
-            else:
-                self.__stop_flag = True
-                return
-
-    def extract(self):
-        """
-        streamer to Query
-        """
-        try:
-            self.page = self.get_page()
-            yield from self.get_results()
-
-        except EmptyPageException:
-            self.__stop_flag = True
+            yield Target(*doc)
@@ -1,10 +1,17 @@
-from ..params_container import Container
-from requests import get
-from bs4 import BeautifulSoup
+from ..pagination import PagedParser
+from ..selectors import Selector, backend, has_class
 from html import unescape
 from ..target import Target
+from ..exceptions import EmptyPageException
 
 
+META = {
+    'host': 'ccl.pku.edu.cn',
+    'page_size': 50,
+    'count': True,
+    'params': ['n_results', 'subcorpus', 'n_left', 'n_right', 'parser_backend']
+}
+
 TEST_DATA = {'test_single_query': {'query': '代汉语'},
              'test_multi_query': {'query': ['古', '问题']}
             }
@@ -62,11 +69,18 @@ Example
 """
 
 
-class PageParser(Container):
+TABLE = Selector('table[align="center"]', '//table[@align="center"]')
+ROWS = Selector('tr', './/tr')
+TOTAL = Selector('td.totalright', '//td[%s]' % has_class('totalright'))
+BOLD = Selector('b', './/b')
+CELLS = Selector('td[align]', './/td[@align]')
+
+
+class PageParser(PagedParser):
     def __init__(self,*args,**kwargs):
         super().__init__(*args,**kwargs)
+        self.__html = backend(self.parser_backend)
         self.__per_page = 50
-        self.__pagenum = 0
         if self.subcorpus is None:
             self.subcorpus = 'xiandai'
         if self.n_left is None:
@@ -74,13 +88,23 @@ class PageParser(Container):
         if self.n_right is None:
             self.n_right = 30
 
+
+    def _page_keys(self):
+        """
+        offsets of the pages, total number of results is known after the first page
+        """
+        start = 0
+        while start < self.n_results:
+            yield start
+            start += self.__per_page
+
             
-    def get_results(self):
+    def _page_request(self, start):
         """
-        create a query url and get results for one page
+        create a query url for one page
         """
         params = {'q': self.query,
-                  'start': self.__pagenum,
+                  'start': start,
                   'num': self.n_results,
                   'index':'FullIndex',
                   'outputFormat':'HTML',
@@ -91,48 +115,58 @@ class PageParser(Container):
                   'dir':self.subcorpus,
                   'scopestr':'' # text selection: TO DO?
                   }
-        r = get('http://ccl.pku.edu.cn:8080/ccl_corpus/search',params)
-        return unescape(r.text)
+        return 'GET', 'http://ccl.pku.edu.cn:8080/ccl_corpus/search', {'params': params}
 
 
-    def parse_page(self):
+    def parse_page(self, page, start):
         """
         find results (and total number of results) in the page code
         """
-        soup = BeautifulSoup(self.__page, 'lxml')
-        res = soup.find('table',align='center')
-        if res:
-            res = res.find_all('tr')
+        html = self.__html
+        soup = html.document(page)
+        res = html.select_one(soup, TABLE)
+        if res is not None:
+            res = html.select(res, ROWS)
         else:
             return []
-        if self.__pagenum == 0:
-            self.n_results = min(self.n_results,int(soup.find('td',class_='totalright').find('b').text))
+        if start == 0:
+            hits = self.__hits(soup)
+            if hits is not None:
+                self.n_results = min(self.n_results, hits)
         return res
 
+
+    def __hits(self, soup):
+        """
+        total number of results shown on the first page,
+        None if it is not shown
+        """
+        html = self.__html
+        total = html.select_one(soup, TOTAL)
+        if total is None:
+            return None
+        return int(html.text(html.select_one(total, BOLD)))
+
+
+    def _parse_count(self, start, response):
+        return self.__hits(self.__html.document(unescape(response.text)))
+
         
     def parse_result(self,result):
         """
         find hit and its left and right contexts
         in the extracted row of table
         """
-        result = result.select('td[align]')
-        result = [x.text.strip() for x in result]
+        html = self.__html
+        result = [html.text(x).strip() for x in html.select(result, CELLS)]
         text = ''.join(result)
         idxs = (len(result[0]),len(result[0])+len(result[1]))
         return Target(text, idxs, '', None)
 
         
-    def extract(self):
-        n = 0
-        while n < self.n_results:
-            self.__page = self.get_results()
-            rows = self.parse_page()
-            if not rows:
-                break
-            r = 0
-            while n < self.n_results and r < len(rows):
-                yield self.parse_result(rows[r])
-                n += 1
-                r += 1
-            self.__pagenum += self.__per_page
-
+    def _parse_page(self, start, response):
+        rows = self.parse_page(unescape(response.text), start)
+        if not rows:
+            raise EmptyPageException
+        for row in rows:
+            yield self.parse_result(row)
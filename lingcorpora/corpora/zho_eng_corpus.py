@@ -3,7 +3,7 @@
 
 from lxml import etree
 
-from ..params_container import Container
+from ..pagination import PagedParser
 from ..target import Target
 from ..exceptions import EmptyPageException
 
@@ -54,12 +54,19 @@ Example
 
 '''
 
+META = {
+    'host': 'www.jukuu.com',
+    'page_size': 10,
+    'count': False,
+    'params': ['n_results', 'kwic', 'query_language']
+}
+
 TEST_DATA = {'test_single_query': {'query': 'table', 'query_language': 'eng'},
              'test_multi_query': {'query': ['table', 'chair'], 'query_language': 'eng'}
              }
 
 
-class PageParser(Container):
+class PageParser(PagedParser):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -67,8 +74,7 @@ class PageParser(Container):
         self.__temp = 'temptree.xml'
         self.__xpath = ".//*[@class='e'] | .//*[@class='c']"
         self.__dpp = 100
-        self.__stop_flag = False
-        self.__c_page = 0
+        self.__max_pages = 10
         self.__targets_seen = 0
 
         self.__dom = 'http://www.jukuu.com/show-'
@@ -122,46 +128,31 @@ class PageParser(Container):
             else:
                 continue
 
-    def get_page(self):
+    def _page_keys(self):
+        c_page = 0
+
+        while c_page < self.__max_pages and self.__targets_seen < self.n_results:
+            yield c_page
+            c_page += 1
+
+    def _page_request(self, c_page):
         """
-        return documents tree
+        return request of the page
         """
         params = (self.query,
-                  self.__c_page)
+                  c_page)
 
         post = self.__post % (params)
-        parser = etree.HTMLParser(recover=True)
-        return etree.parse(self.__dom + post, parser=parser)
+        return 'GET', self.__dom + post, {}
 
-    def get_results(self):
-        docs_tree = self.page.xpath(self.__xpath)
+    def _parse_page(self, c_page, response):
+        parser = etree.HTMLParser(recover=True)
+        page = etree.fromstring(response.content, parser=parser).getroottree()
+        docs_tree = page.xpath(self.__xpath)
 
         if not docs_tree:
             raise EmptyPageException
 
         for doc in self.__parse_docs(docs_tree, analyses=self.get_analysis):
             self.__targets_seen += 1
-            if self.__targets_seen <= self.n_results:
-                yield Target(*doc)
-            else:
-                self.__stop_flag = True
-                return
-
-    def extract(self):
-        """
-        streamer to Query
-        """
-
-        while not self.__stop_flag:
-            try:
-                self.page = self.get_page()
-                yield from self.get_results()
-
-            except EmptyPageException:
-                self.__stop_flag = True
-
-            self.__c_page += 1
-
-            if self.__c_page > 9:
-                self.__stop_flag = True
-                return
+            yield Target(*doc)
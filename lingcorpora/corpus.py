@@ -2,18 +2,80 @@
 # coding=<UTF-8>
 
 import warnings
-from collections import deque
+from collections import deque, OrderedDict
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 
 from tqdm import tqdm
+from requests import RequestException
 
 from .result import Result
+from .columnar import ColumnarResult
 from .functions import functions
+from .transport import default_transport
+from .cache import ResponseCache
+from .throttle import Throttle
+from .pagination import PagedParser
 
 
 warnings.simplefilter('always', UserWarning)
 
 
+def _freeze(value):
+    """
+    hashable version of a search parameter value
+    """
+    
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    
+    if isinstance(value, set):
+        return frozenset(value)
+    
+    return value
+
+
+def _to_multisearch_format(arg, arg_name, len_multiplier=1):
+    """
+    pack <str> or List[str] `arg` to multisearch format
+    """
+    
+    if isinstance(arg, str):
+        arg = [arg] * len_multiplier
+    
+    if not isinstance(arg, Iterable):
+        raise TypeError(
+            'Argument `%s` must be of type <str> or iterable[str], got <%s>'
+            % (arg_name, type(arg))
+        )
+        
+    return arg
+
+
+def _pack_queries(query, gr_tags):
+    """
+    return: (List[str], List[str]): queries and gr_tags of equal length
+    """
+    
+    query = _to_multisearch_format(arg=query, arg_name='query')
+    if gr_tags is None:
+        gr_tags = [None] * len(query)
+    gr_tags = _to_multisearch_format(
+        arg=gr_tags,
+        arg_name='gr_tags',
+        len_multiplier=len(query)
+    )
+
+    if len(query) != len(gr_tags):
+        raise ValueError('`query`, `gr_tags` length mismatch')
+    
+    return query, gr_tags
+
+
 class Corpus:
     """The object of this class should be instantiated for each corpus. Search is conducted via search method.
     
@@ -75,6 +137,28 @@ class Corpus:
         
     verbose: bool, default True
         whether to enable tqdm progressbar.
+    max_workers: int, default None
+        number of queries processed at the same time when `search`
+        gets several queries. If None or 1, queries are processed one by one.
+    transport: Transport, default None
+        HTTP transport (connection pools and timeouts) used by the corpus.
+        If None, the library-wide default one is shared.
+    cache: bool, str or ResponseCache, default None
+        on-disk cache of responses. True for the default location,
+        str for a path to the cache database. None or False: no caching.
+    memo_size: int, default 128
+        number of search results kept in memory: a repeated search with the same
+        parameters (or the same ones and smaller `n_results`) is served from memory
+        without requests. 0 disables it.
+    storage: str, default 'list'
+        how results are stored: 'list' of <Target> objects (<Result>) or
+        'columnar' (<ColumnarResult>: text buffer with offset arrays, cheap
+        for very large results).
+    throttle: bool or Throttle, default None
+        per-host rate limits and adaptive concurrency of requests
+        (see <Throttle>). True for a new one. The limits the corpus module
+        declares in ``RATE_LIMITS`` are applied to hosts not configured
+        in it already. None or False: requests are not limited.
     
     Attributes
     ----------
@@ -83,10 +167,22 @@ class Corpus:
     results: list
         List of all Result objects, each returned by search method.
     failed: list
-        List of Result objects where nothing was found.
+        List of Result objects where nothing was found
+        or whose search was interrupted by a network error.
     """
 
-    def __init__(self, language, verbose=True):
+    storages = {'list': Result, 'columnar': ColumnarResult}
+
+    def __init__(self,
+                 language,
+                 verbose=True,
+                 max_workers=None,
+                 transport=None,
+                 cache=None,
+                 memo_size=128,
+                 storage='list',
+                 throttle=None
+    ):
         """
         Parameters
         ----------
@@ -94,18 +190,80 @@ class Corpus:
             language alias
         verbose: bool
             enable tqdm progressbar
+        max_workers: int
+            number of queries processed concurrently
+        transport: Transport
+            HTTP transport
+        cache: bool, str or ResponseCache
+            responses cache
+        memo_size: int
+            number of search results kept in memory
+        storage: str
+            'list' or 'columnar'
+        throttle: bool or Throttle
+            per-host request limits
         """
         
         self.language = language
         self.verbose = verbose
-        self.corpus = functions[self.language] 
+        self.max_workers = max_workers
+        self.transport = transport if transport is not None else default_transport()
+
+        if cache is True:
+            cache = ResponseCache()
+
+        elif isinstance(cache, str):
+            cache = ResponseCache(cache)
+
+        elif cache is False:
+            cache = None
+
+        if cache is not None:
+            self.transport = self.transport.with_cache(cache, namespace=self.language)
+
+        self.corpus = functions[self.language]
+
+        if throttle is True:
+            throttle = Throttle()
+
+        elif throttle is False:
+            throttle = None
+
+        if throttle is not None:
+            for host, limits in self.corpus.__dict__.get('RATE_LIMITS', {}).items():
+                throttle.configure(host, override=False, **limits)
+
+            self.transport = self.transport.with_throttle(throttle)
+
+        self.throttle = throttle
+
+        if storage not in self.storages:
+            raise ValueError(
+                'got invalid `storage` "%s", expected one of %s'
+                % (storage, ', '.join(sorted(self.storages)))
+            )
+
+        self.storage = storage
+        self.__result_cls = self.storages[storage]
+
+        self.memo_size = memo_size
+        self.__memo = OrderedDict()
+        self.__memo_lock = Lock()
+        # memo key: number of hits, see `count`
+        self.__counts = dict()
+
         self.doc = self.corpus.__doc__
         self.gr_tags_info = self.corpus.__dict__.get('GR_TAGS_INFO')
 
         self.results = list()
         self.failed = deque(list())
+        # id of interrupted <Result>: (<Result>, parser, error)
+        self.__interrupted = dict()
         
         self.warn_str = 'Nothing found for query "%s"'
+        self.interrupt_str = 'Search for query "%s" interrupted after %s results (%s), ' \
+                             'retry_failed() resumes it'
+        self.count_fail_str = 'Count for query "%s" failed (%s)'
         self.pbar_desc = '"%s"'
     
     def __getattr__(self, name):
@@ -114,24 +272,79 @@ class Corpus:
         
         raise AttributeError("<Corpus> object has no attribute '%s'" % name)
 
-    def __to_multisearch_format(self, arg, arg_name, len_multiplier=1):
+    def get_gr_tags_info(self):
+        return self.gr_tags_info
+
+    def __memo_key(self, result_obj):
         """
-        pack <str> or List[str] `arg` to multisearch format
+        key of normalized search parameters, `n_results` excluded
         """
         
-        if isinstance(arg, str):
-            arg = [arg] * len_multiplier
+        return (result_obj.query,) + tuple(sorted(
+            (k, _freeze(v))
+            for k, v in result_obj.params.items()
+            if k not in {'n_results', 'prefetch', 'parser_backend'}
+        ))
+
+    def __memo_get(self, result_obj):
+        """
+        fill `result_obj` from memory if a search with the same parameters
+        and at least as many `n_results` (or exhausted) has been made
         
-        if not isinstance(arg, Iterable):
-            raise TypeError(
-                'Argument `%s` must be of type <str> or iterable[str], got <%s>'
-                % (arg_name, type(arg))
-            )
+        return: bool: whether `result_obj` was filled
+        """
+        
+        if not self.memo_size:
+            return False
+        
+        key = self.__memo_key(result_obj)
+        n_results = result_obj.params['n_results']
+        
+        with self.__memo_lock:
+            if key not in self.__memo:
+                return False
+            
+            n_wanted, targets = self.__memo[key]
             
-        return arg
+            if n_wanted < n_results and len(targets) >= n_wanted:
+                return False
+            
+            self.__memo.move_to_end(key)
+        
+        for target in targets[:n_results]:
+            result_obj.add(target)
+        
+        return True
 
-    def get_gr_tags_info(self):
-        return self.gr_tags_info
+    def __memo_put(self, result_obj):
+        """
+        keep targets of non-empty `result_obj` in memory
+        """
+        
+        if not self.memo_size or not result_obj:
+            return
+        
+        key = self.__memo_key(result_obj)
+        n_results = result_obj.params['n_results']
+        
+        with self.__memo_lock:
+            if key in self.__memo and self.__memo[key][0] > n_results:
+                return
+            
+            self.__memo[key] = (n_results, result_obj[:])
+            self.__memo.move_to_end(key)
+            
+            while len(self.__memo) > self.memo_size:
+                self.__memo.popitem(last=False)
+
+    def clear_memo(self):
+        """
+        Forget search results kept in memory
+        """
+        
+        with self.__memo_lock:
+            self.__memo.clear()
+            self.__counts.clear()
 
     def search(self, query, *args, **kwargs):
         """This is a search function that queries the corpus and returns the results.
@@ -140,6 +353,10 @@ class Corpus:
         ----------
         query: str
             query, for arguments see `params_container.Container`
+        sink: Sink, default None
+            writer (`CSVSink`, `TSVSink`, `JSONLSink`) each found target is saved with.
+            Targets of several queries are written in the order of `query`;
+            with `max_workers` a query is written once it and the previous ones are done.
         
         Example
         -------
@@ -152,49 +369,322 @@ class Corpus:
             [Result(query=мешок, N=10, params={'n_results': 10, 'kwic': True, 'n_left': None, 'n_right': None, 'query_language': None, 'subcorpus': 'main', 'get_analysis': False, 'gr_tags': None, 'start': 0, 'writing_system': None})]
         """
 
-        query = self.__to_multisearch_format(arg=query, arg_name='query')
-        gr_tags = kwargs.get('gr_tags')
-        if gr_tags is None:
-            gr_tags = [None] * len(query)
-        gr_tags = self.__to_multisearch_format(
-            arg=gr_tags,
-            arg_name='gr_tags',
-            len_multiplier=len(query)
-        )
-
-        if len(query) != len(gr_tags):
-            raise ValueError('`query`, `gr_tags` length mismatch')
+        query, gr_tags = _pack_queries(query, kwargs.get('gr_tags'))
+        kwargs['transport'] = self.transport
+        sink = kwargs.pop('sink', None)
 
-        results = []
+        if self.max_workers is not None and self.max_workers > 1 and len(query) > 1:
+            result_objs = self.__search_concurrent(query, gr_tags, args, kwargs, sink)
         
-        for q, c_gr_tags in zip(query, gr_tags):
-            kwargs['gr_tags'] = c_gr_tags            
-            parser = self.corpus.PageParser(q, *args, **kwargs)
-            result_obj = Result(self.language, parser.__dict__)
+        else:
+            result_objs = []
+            
+            for q, c_gr_tags in zip(query, gr_tags):
+                kwargs['gr_tags'] = c_gr_tags
+                parser = self.corpus.PageParser(q, *args, **kwargs)
+                result_obj = self.__result_cls(self.language, parser.__dict__)
+                
+                if self.__memo_get(result_obj):
+                    if sink is not None:
+                        sink.write_all(result_obj)
+                
+                else:
+                    self.__extract(parser, result_obj, sink)
                 
+                result_objs.append(result_obj)
+        
+        if sink is not None:
+            sink.flush()
+        
+        return self.__collect(result_objs)
+
+    def count(self, query, *args, **kwargs):
+        """Total number of hits of queries, without downloading their results:
+        the number is read from the first result page of a query, asked for
+        with as few results as the corpus allows (the corpora of web-corpora.net
+        make a search request first). Queries are counted `max_workers` at a time.
+        Counts are kept in memory (`clear_memo` forgets them), a query counted
+        already with the same parameters is not requested again.
+        
+        Parameters
+        ----------
+        query: str or List[str]
+            query or queries, for arguments see `params_container.Container`
+            (`n_results` is ignored).
+        
+        return: List[int]: numbers of hits in the order of `query`,
+                None for queries whose page could not be downloaded
+        
+        Only some corpora give the number of hits, ``'count'`` of their ``META``
+        tells which (``lingcorpora.corpus.functions.meta('bam')['count']``).
+        Other corpora raise ValueError listing the supported ones.
+        
+        Example
+        -------
+        .. code-block:: python
+
+            >>> bam_corp = lingcorpora.Corpus('bam', max_workers=8)
+            >>> bam_corp.count(['jamana', 'dugu'])
+            [6311, 12420]
+        """
+
+        query, gr_tags = _pack_queries(query, kwargs.get('gr_tags'))
+        kwargs['transport'] = self.transport
+        kwargs['n_results'] = 1
+        parsers = [
+            self.corpus.PageParser(q, *args, **dict(kwargs, gr_tags=c_gr_tags))
+            for q, c_gr_tags in zip(query, gr_tags)
+        ]
+
+        if parsers and (not isinstance(parsers[0], PagedParser) or
+                        type(parsers[0])._parse_count is PagedParser._parse_count):
+            raise ValueError(
+                'corpus "%s" does not give the number of hits, count is supported by: %s' %
+                (self.language, ', '.join(code for code in functions if functions.meta(code).get('count')))
+            )
+
+        pbar = tqdm(
+            total=len(parsers),
+            unit='queries',
+            desc='%s queries' % len(parsers),
+            disable=not self.verbose
+        )
+        lock = Lock()
+
+        def count(parser):
+            key = self.__memo_key(self.__result_cls(self.language, parser.__dict__))
+
+            with self.__memo_lock:
+                n = self.__counts.get(key)
+
+            if n is None:
+                try:
+                    n = parser.count()
+
+                except RequestException as e:
+                    warnings.warn(self.count_fail_str % (parser.query, e))
+
+                else:
+                    with self.__memo_lock:
+                        self.__counts[key] = n
+
+            with lock:
+                pbar.update()
+
+            return n
+
+        try:
+            if self.max_workers is not None and self.max_workers > 1 and len(parsers) > 1:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    return list(executor.map(count, parsers))
+
+            return [count(parser) for parser in parsers]
+
+        finally:
+            pbar.close()
+
+    def __extract(self, parser, result_obj, sink=None):
+        """
+        add targets of `parser` to `result_obj` with a progressbar;
+        a network error interrupts it, see `__interrupt`
+        """
+
+        try:
             for target in tqdm(
                 parser.extract(),
                 total=parser.n_results,
+                initial=result_obj.n,
                 unit='docs',
-                desc=self.pbar_desc % q,
+                desc=self.pbar_desc % result_obj.query,
                 disable=not self.verbose
             ):
                 result_obj.add(target)
-            
-            if result_obj:
+
+                if sink is not None:
+                    sink.write(target)
+
+        except RequestException as e:
+            self.__interrupt(parser, result_obj, e)
+
+        else:
+            self.__memo_put(result_obj)
+
+    def __interrupt(self, parser, result_obj, error):
+        """
+        keep `parser` of `result_obj` whose page could not be downloaded:
+        the targets of the previous pages stay in `result_obj`
+        and `retry_failed` resumes the parser from the failed page
+        """
+
+        with self.__memo_lock:
+            self.__interrupted[id(result_obj)] = (result_obj, parser, error)
+
+    def __collect(self, result_objs):
+        """
+        store found results in `.results`, empty and interrupted ones in `.failed`
+
+        return: List[<Result>]: found results
+        """
+
+        results = []
+
+        for result_obj in result_objs:
+            if id(result_obj) in self.__interrupted:
+                error = self.__interrupted[id(result_obj)][2]
+                warnings.warn(self.interrupt_str % (result_obj.query, result_obj.n, error))
+                self.failed.append(result_obj)
+
+            elif result_obj:
                 results.append(result_obj)
-            
+
             else:
-                warnings.warn(self.warn_str % q)
+                warnings.warn(self.warn_str % result_obj.query)
                 self.failed.append(result_obj)
-        
+
         self.results.extend(results)
-        
+
         return results
 
+    def stream(self, query, *args, keep=False, sink=None, **kwargs):
+        """Lazy version of `search` for one query: a generator of <Target> objects
+        yielded as soon as they are extracted, so memory use does not grow
+        with `n_results`.
+
+        Parameters
+        ----------
+        query: str
+            query, for arguments see `params_container.Container`
+        keep: bool, default False
+            whether to collect the targets into a <Result> stored in `.results`
+            (as `search` does) once the stream is exhausted.
+        sink: Sink, default None
+            writer (`CSVSink`, `TSVSink`, `JSONLSink`) each target is saved with
+            before it is yielded.
+
+        Example
+        -------
+        .. code-block:: python
+
+            >>> rus_corp = lingcorpora.Corpus('rus')
+            >>> for target in rus_corp.stream('мешок', n_results=100000):
+            ...     print(target.meta)
+        """
+
+        if not isinstance(query, str):
+            raise TypeError(
+                'Argument `query` must be of type <str>, got <%s>' % type(query)
+            )
+
+        kwargs['transport'] = self.transport
+        parser = self.corpus.PageParser(query, *args, **kwargs)
+        result_obj = self.__result_cls(self.language, parser.__dict__)
+
+        from_memo = self.__memo_get(result_obj)
+        targets = iter(result_obj) if from_memo else parser.extract()
+        n = 0
+
+        pbar = tqdm(
+            total=parser.n_results,
+            unit='docs',
+            desc=self.pbar_desc % query,
+            disable=not self.verbose or from_memo
+        )
+
+        try:
+            for target in targets:
+                if keep and not from_memo:
+                    result_obj.add(target)
+
+                if sink is not None:
+                    sink.write(target)
+
+                n += 1
+                pbar.update()
+
+                yield target
+
+        finally:
+            pbar.close()
+
+            if sink is not None:
+                sink.flush()
+
+        if not n:
+            warnings.warn(self.warn_str % query)
+            self.failed.append(result_obj)
+
+        elif keep:
+            if not from_memo:
+                self.__memo_put(result_obj)
+
+            self.results.append(result_obj)
+
+    def __search_concurrent(self, query, gr_tags, args, kwargs, sink=None):
+        """
+        run parsers of several queries on a pool of `self.max_workers` threads,
+        results are written to `sink` in the order of `query`
+        
+        return: List[<Result>] in the order of `query`
+        """
+        
+        pbar = tqdm(
+            total=0,
+            unit='docs',
+            desc='%s queries' % len(query),
+            disable=not self.verbose
+        )
+        lock = Lock()
+        
+        def run(q, c_gr_tags):
+            parser = self.corpus.PageParser(q, *args, **dict(kwargs, gr_tags=c_gr_tags))
+            result_obj = self.__result_cls(self.language, parser.__dict__)
+            
+            if self.__memo_get(result_obj):
+                return result_obj
+            
+            with lock:
+                pbar.total += parser.n_results
+                pbar.refresh()
+            
+            try:
+                for target in parser.extract():
+                    result_obj.add(target)
+                    
+                    with lock:
+                        pbar.update()
+            
+            except RequestException as e:
+                self.__interrupt(parser, result_obj, e)
+            
+            else:
+                self.__memo_put(result_obj)
+            
+            return result_obj
+        
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [
+                    executor.submit(run, q, c_gr_tags)
+                    for q, c_gr_tags in zip(query, gr_tags)
+                ]
+                
+                result_objs = []
+                
+                for future in futures:
+                    result_objs.append(future.result())
+                    
+                    if sink is not None:
+                        sink.write_all(result_objs[-1])
+                
+                return result_objs
+        
+        finally:
+            pbar.close()
+
     def retry_failed(self):
         """
-        Apply `.search()` to failed queries stored in `.failed`
+        Apply `.search()` to failed queries stored in `.failed`;
+        interrupted searches are resumed from the page that failed
         """
         
         if self.failed:
@@ -203,12 +693,19 @@ class Corpus:
             
             for _ in range(n_rounds):
                 r_failed = self.failed.popleft()
+                interrupted = self.__interrupted.pop(id(r_failed), None)
+                
+                if interrupted is not None:
+                    result_obj, parser, _ = interrupted
+                    self.__extract(parser, result_obj)
+                    results_new = self.__collect([result_obj])
                 
-                # List[<Result>]
-                results_new = self.search(
-                    r_failed.query,
-                    **r_failed.params
-                )
+                else:
+                    # List[<Result>]
+                    results_new = self.search(
+                        r_failed.query,
+                        **r_failed.params
+                    )
                 
                 if results_new:
                     retrieved.append(results_new[0])
@@ -221,3 +718,4 @@ class Corpus:
         """
         
         self.failed = deque(list())
+        self.__interrupted.clear()
@@ -4,3 +4,7 @@
 
 class EmptyPageException(Exception):
     """Raised when empty page encountered"""
+
+
+class NotRecordedError(Exception):
+    """Raised by ReplayTransport for a request missing from the archive"""
@@ -0,0 +1,76 @@
+# python3
+# coding=<UTF-8>
+
+from lxml import etree
+
+
+# bytes fed to the parser at once
+CHUNK_SIZE = 2 ** 16
+
+
+def iter_elements(content, path, chunk_size=CHUNK_SIZE):
+    """
+    Elements at `path` of an XML document, parsed incrementally.
+
+    Each element is yielded as soon as its closing tag is parsed, then it is
+    cleared and dropped from the tree, so the whole tree is never kept
+    in memory. Given the chunks of a streamed response
+    (``response.iter_content(CHUNK_SIZE)`` of a request made with
+    ``stream=True``), the first elements are yielded while the rest
+    of the document is still being downloaded.
+
+    Parameters
+    ----------
+    content: bytes or iterable of bytes
+        XML document or its consecutive chunks.
+    path: str
+        absolute path of the elements: ``'/page/searchresult/body/result/document'``.
+    chunk_size: int, default 65536
+        number of bytes of a `content` given as bytes fed to the parser at once.
+
+    return: generator of <lxml.etree._Element>
+    """
+
+    path = path.strip('/').split('/')
+    parser = etree.XMLPullParser(events=('end',), tag=path[-1])
+
+    if isinstance(content, bytes):
+        chunks = (
+            content[start:start + chunk_size]
+            for start in range(0, len(content), chunk_size)
+        )
+    else:
+        chunks = content
+
+    def elements():
+        for _, element in parser.read_events():
+            if _path(element) != path:
+                continue
+
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+            yield element
+
+            element.clear()
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from elements()
+
+    parser.close()
+    yield from elements()
+
+
+def _path(element):
+    """
+    return: list of tags from the root to `element`
+    """
+
+    path = []
+
+    while element is not None:
+        path.append(element.tag)
+        element = element.getparent()
+
+    return path[::-1]
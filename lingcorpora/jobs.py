@@ -0,0 +1,308 @@
+# python3
+# coding=<UTF-8>
+
+import json
+import time
+import sqlite3
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+
+from tqdm import tqdm
+from requests import RequestException
+
+from .corpus import _pack_queries
+from .target import Target
+from .pagination import PagedParser
+
+
+PENDING = 'pending'
+DONE = 'done'
+EMPTY = 'empty'
+FAILED = 'failed'
+
+
+class CrawlJob:
+    """Large batch of queries to one corpus, crawled with checkpoints
+    in an SQLite file so that it survives crashes and restarts.
+
+    Targets are stored page by page together with the progress of the query:
+    the number of targets emitted and the state of its parser (see
+    `PagedParser.snapshot`). `run` processes the queries which are not done yet
+    and resumes interrupted ones from the first page not stored,
+    pages which were collected are never requested again.
+
+    Parameters
+    ----------
+    path: str
+        job file, created if it does not exist.
+    corpus: Corpus
+        corpus to search: its `language`, `transport` (with its cache and
+        throttle), `max_workers`, `storage` and `verbose` are used.
+    **params:
+        search parameters of the queries added to the job
+        (``n_results``, ``kwic``, ``subcorpus``, ...), JSON-serializable.
+
+    Example
+    -------
+    .. code-block:: python
+
+        >>> corp = lingcorpora.Corpus('bam', max_workers=4, throttle=True)
+        >>> job = lingcorpora.CrawlJob('bam_crawl.sqlite', corp, n_results=50000)
+        >>> job.add(queries)
+        >>> job.run()
+        {'done': 3996, 'empty': 2, 'failed': 2, 'pending': 0}
+        >>> job.run()  # after a restart or for the failed queries
+        >>> results = job.results()
+    """
+
+    def __init__(self, path, corpus, **params):
+        self.path = path
+        self.corpus = corpus
+        self.params = params
+
+        self.__lock = Lock()
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        self.__db.executescript(
+            'CREATE TABLE IF NOT EXISTS job (language TEXT);'
+            'CREATE TABLE IF NOT EXISTS queries ('
+            'id INTEGER PRIMARY KEY, query TEXT, gr_tags TEXT, params TEXT, status TEXT, '
+            'n INTEGER, page TEXT, state BLOB, error TEXT, updated REAL, '
+            'UNIQUE (query, gr_tags));'
+            'CREATE TABLE IF NOT EXISTS targets ('
+            'query_id INTEGER, idx INTEGER, target TEXT, PRIMARY KEY (query_id, idx));'
+        )
+
+        row = self.__db.execute('SELECT language FROM job').fetchone()
+
+        if row is None:
+            self.__db.execute('INSERT INTO job VALUES (?)', (corpus.language,))
+
+        elif row[0] != corpus.language:
+            raise ValueError(
+                'job %s crawls corpus "%s", got corpus "%s"' % (path, row[0], corpus.language)
+            )
+
+        self.__db.commit()
+
+    def __str__(self):
+        return 'CrawlJob(path=%s, language=%s, progress=%s)' % \
+                (self.path, self.corpus.language, self.progress())
+
+    __repr__ = __str__
+
+    def __len__(self):
+        with self.__lock:
+            return self.__db.execute('SELECT COUNT(*) FROM queries').fetchone()[0]
+
+    def add(self, query, gr_tags=None):
+        """
+        add `query` (str or List[str]) to the job with `gr_tags` and the job
+        parameters; queries which are in the job already are left as they are
+
+        return: int: number of queries added
+        """
+
+        query, gr_tags = _pack_queries(query, gr_tags)
+        params = json.dumps(self.params, sort_keys=True)
+
+        with self.__lock:
+            before = self.__db.total_changes
+            self.__db.executemany(
+                'INSERT OR IGNORE INTO queries (query, gr_tags, params, status, n, updated) '
+                'VALUES (?, ?, ?, ?, 0, ?)',
+                [(q, json.dumps(t), params, PENDING, time.time()) for q, t in zip(query, gr_tags)]
+            )
+            self.__db.commit()
+
+            return self.__db.total_changes - before
+
+    def progress(self):
+        """
+        return: dict: number of queries by status
+                (``'pending'``, ``'done'``, ``'empty'``, ``'failed'``)
+        """
+
+        counts = dict.fromkeys((PENDING, DONE, EMPTY, FAILED), 0)
+
+        with self.__lock:
+            for status, n in self.__db.execute('SELECT status, COUNT(*) FROM queries GROUP BY status'):
+                counts[status] = n
+
+        return counts
+
+    def run(self):
+        """Search the queries which are not done: pending ones, interrupted
+        and failed ones (resumed). Queries are processed `corpus.max_workers`
+        at a time. A query whose page cannot be downloaded or parsed is marked
+        failed with the error and the others go on, the next `run` resumes it.
+
+        return: dict: `progress` after the run
+        """
+
+        with self.__lock:
+            rows = self.__db.execute(
+                'SELECT id, query, gr_tags, params, state FROM queries '
+                'WHERE status IN (?, ?) ORDER BY id',
+                (PENDING, FAILED)
+            ).fetchall()
+
+        pbar = tqdm(
+            total=len(rows),
+            unit='queries',
+            desc='%s queries' % len(rows),
+            disable=not self.corpus.verbose
+        )
+
+        def run(row):
+            try:
+                self.__run(*row)
+
+            except Exception as e:
+                self.__fail(row[0], e)
+
+            pbar.update()
+
+        try:
+            if self.corpus.max_workers is not None and self.corpus.max_workers > 1:
+                with ThreadPoolExecutor(max_workers=self.corpus.max_workers) as executor:
+                    for future in [executor.submit(run, row) for row in rows]:
+                        future.result()
+
+            else:
+                for row in rows:
+                    run(row)
+
+        finally:
+            pbar.close()
+
+        return self.progress()
+
+    def __parser(self, query, gr_tags, params):
+        """
+        return: parser of `query` with the stored `gr_tags` and `params` (JSON)
+        """
+
+        params = dict(json.loads(params), gr_tags=json.loads(gr_tags))
+
+        return self.corpus.corpus.PageParser(query, transport=self.corpus.transport, **params)
+
+    def __run(self, query_id, query, gr_tags, params, state):
+        """
+        search one query, storing targets and progress after every page
+        """
+
+        parser = self.__parser(query, gr_tags, params)
+        paged = isinstance(parser, PagedParser)
+        targets = []
+
+        if paged and state is not None:
+            parser.restore(state)
+
+        else:
+            # nothing of the query is kept without page checkpoints
+            self.__checkpoint(query_id, [], 0, None, None, reset=True)
+
+        def on_page(key):
+            n = parser.checkpoint[1]
+            self.__checkpoint(query_id, targets, n - len(targets), key, parser.snapshot())
+            targets.clear()
+
+        if paged:
+            for target in parser.extract(on_page=on_page):
+                targets.append(target)
+
+        else:
+            targets.extend(parser.extract())
+
+        n = parser.checkpoint[1] if paged else len(targets)
+        self.__checkpoint(query_id, targets, n - len(targets), None, None, status=DONE if n else EMPTY)
+
+    def __fail(self, query_id, error):
+        """
+        mark `query_id` failed with `error`, the pages stored before it are kept
+        """
+
+        if not isinstance(error, RequestException):
+            error = '%s: %s' % (type(error).__name__, error)
+
+        with self.__lock:
+            self.__db.execute(
+                'UPDATE queries SET status = ?, error = ?, updated = ? WHERE id = ?',
+                (FAILED, str(error), time.time(), query_id)
+            )
+            self.__db.commit()
+
+    def __checkpoint(self, query_id, targets, start, page, state, status=PENDING, reset=False):
+        """
+        store `targets` of `query_id` from index `start` and its progress
+        (`page`: key of the last page stored) in one transaction
+        """
+
+        rows = [
+            (query_id, start + i, json.dumps([getattr(t, f) for f in Target._fields], ensure_ascii=False))
+            for i, t in enumerate(targets)
+        ]
+
+        with self.__lock:
+            with self.__db:
+                if reset:
+                    self.__db.execute('DELETE FROM targets WHERE query_id = ?', (query_id,))
+
+                self.__db.executemany('INSERT OR REPLACE INTO targets VALUES (?, ?, ?)', rows)
+                self.__db.execute(
+                    'UPDATE queries SET status = ?, n = ?, page = COALESCE(?, page), state = ?, error = NULL, '
+                    'updated = ? WHERE id = ?',
+                    (status, start + len(targets), None if page is None else repr(page),
+                     state, time.time(), query_id)
+                )
+
+    def __result(self, query_id, query, gr_tags, params):
+        # all the parameters of the parser (with its defaults), as by `Corpus.search`
+        result_obj = self.corpus.storages[self.corpus.storage](
+            self.corpus.language,
+            self.__parser(query, gr_tags, params).__dict__
+        )
+
+        with self.__lock:
+            rows = self.__db.execute(
+                'SELECT target FROM targets WHERE query_id = ? ORDER BY idx', (query_id,)
+            ).fetchall()
+
+        for row in rows:
+            fields = json.loads(row[0])
+            fields[1] = tuple(fields[1])
+            result_obj.add(Target(*fields))
+
+        return result_obj
+
+    def result(self, query, gr_tags=None):
+        """
+        return: <Result> (or <ColumnarResult>) of `query` with the targets
+                stored so far, None if `query` is not in the job
+        """
+
+        with self.__lock:
+            row = self.__db.execute(
+                'SELECT id, query, gr_tags, params FROM queries WHERE query = ? AND gr_tags = ?',
+                (query, json.dumps(gr_tags))
+            ).fetchone()
+
+        return None if row is None else self.__result(*row)
+
+    def results(self):
+        """
+        return: List[<Result>] of the done queries where something was found,
+                in the order they were added
+        """
+
+        with self.__lock:
+            rows = self.__db.execute(
+                'SELECT id, query, gr_tags, params FROM queries WHERE status = ? ORDER BY id',
+                (DONE,)
+            ).fetchall()
+
+        return [self.__result(*row) for row in rows]
+
+    def close(self):
+        with self.__lock:
+            self.__db.close()
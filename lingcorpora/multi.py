@@ -0,0 +1,245 @@
+# python3
+# coding=<UTF-8>
+
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from tqdm import tqdm
+
+from .corpus import Corpus
+from .cache import ResponseCache
+from .throttle import Throttle
+
+
+class MultiCorpus:
+    """Several corpora searched at once: `search` sends a query to all of them
+    concurrently, so it takes as long as the slowest corpus.
+
+    The corpora share one transport and one <Throttle>, so corpora served
+    by the same host (the web-corpora.net family: ady, alb, arm, bua, ...)
+    share its limits (``RATE_LIMITS`` of their modules) instead of each
+    sending its own requests to it.
+
+    Parameters
+    ----------
+    languages: List[str]
+        codes of the corpora (see <Corpus>).
+    verbose: bool, default True
+        whether to enable tqdm progressbar (one for all corpora).
+    max_workers: int, default None
+        number of queries processed at the same time by each corpus
+        (see <Corpus>). Corpora are always searched at the same time.
+    transport: Transport, default None
+        HTTP transport shared by the corpora.
+        If None, the library-wide default one is shared.
+    cache: bool, str or ResponseCache, default None
+        on-disk cache of responses shared by the corpora (see <Corpus>).
+    memo_size: int, default 128
+        number of search results kept in memory by each corpus.
+    storage: str, default 'list'
+        'list' or 'columnar' (see <Corpus>).
+    throttle: bool or Throttle, default True
+        per-host request limits shared by the corpora. True for a new <Throttle>,
+        None or False: requests are not limited.
+
+    Attributes
+    ----------
+    corpora: OrderedDict
+        language: <Corpus>.
+    errors: dict
+        language: exception of the corpus whose last search failed
+        (network errors interrupt searches instead, see <Corpus>.failed).
+
+    Example
+    -------
+    .. code-block:: python
+
+        >>> multi = lingcorpora.MultiCorpus(['ady', 'alb', 'arm', 'kaz'], max_workers=4)
+        >>> results = multi.search(['вода', 'огонь'], n_results=20)
+        >>> results['kaz']
+        [Result(query=вода, N=20, ...), Result(query=огонь, N=20, ...)]
+        >>> results = multi.search({'alb': 'ujë', 'arm': 'ջուր'}, n_results=20)
+    """
+
+    def __init__(self,
+                 languages,
+                 verbose=True,
+                 max_workers=None,
+                 transport=None,
+                 cache=None,
+                 memo_size=128,
+                 storage='list',
+                 throttle=True
+    ):
+        if isinstance(languages, str):
+            languages = [languages]
+
+        self.verbose = verbose
+
+        # one database and one set of limiters for all the corpora
+        if cache is True:
+            cache = ResponseCache()
+
+        elif isinstance(cache, str):
+            cache = ResponseCache(cache)
+
+        if throttle is True:
+            throttle = Throttle()
+
+        elif throttle is False:
+            throttle = None
+
+        self.throttle = throttle
+        self.corpora = OrderedDict(
+            (language, Corpus(
+                language,
+                verbose=False,
+                max_workers=max_workers,
+                transport=transport,
+                cache=cache,
+                memo_size=memo_size,
+                storage=storage,
+                throttle=throttle
+            ))
+            for language in languages
+        )
+        self.errors = dict()
+
+    def __str__(self):
+        return 'MultiCorpus(%s)' % ', '.join(self.corpora)
+
+    __repr__ = __str__
+
+    def __getitem__(self, language):
+        return self.corpora[language]
+
+    def __iter__(self):
+        return iter(self.corpora)
+
+    def __len__(self):
+        return len(self.corpora)
+
+    @property
+    def languages(self):
+        return list(self.corpora)
+
+    @property
+    def results(self):
+        """
+        return: dict: language: list of <Result> of the corpus (<Corpus>.results)
+        """
+
+        return OrderedDict((language, corp.results) for language, corp in self.corpora.items())
+
+    @property
+    def failed(self):
+        """
+        return: dict: language: failed <Result> objects of the corpus (<Corpus>.failed)
+        """
+
+        return OrderedDict((language, corp.failed) for language, corp in self.corpora.items())
+
+    def __run(self, tasks, desc):
+        """
+        call `tasks` (language: function of <Corpus>) concurrently,
+        exceptions are kept in `.errors`
+
+        return: OrderedDict: language: value of its function, [] if it failed
+        """
+
+        pbar = tqdm(
+            total=len(tasks),
+            unit='corpora',
+            desc=desc,
+            disable=not self.verbose
+        )
+
+        def run(language, task):
+            try:
+                return task(self.corpora[language])
+
+            finally:
+                pbar.update()
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(len(tasks), 1)) as executor:
+                futures = OrderedDict(
+                    (language, executor.submit(run, language, task))
+                    for language, task in tasks.items()
+                )
+
+                results = OrderedDict()
+
+                for language, future in futures.items():
+                    try:
+                        results[language] = future.result()
+                        self.errors.pop(language, None)
+
+                    except Exception as e:
+                        warnings.warn('Search in corpus "%s" failed: %r' % (language, e))
+                        self.errors[language] = e
+                        results[language] = []
+
+                return results
+
+        finally:
+            pbar.close()
+
+    def search(self, query, *args, **kwargs):
+        """Search all the corpora at once.
+
+        Parameters
+        ----------
+        query: str, List[str] or dict
+            query or queries sent to every corpus, or a dict
+            language: query or queries to search only these corpora.
+            For other arguments see `params_container.Container`,
+            they are passed to every corpus.
+
+        return: OrderedDict: language: List[<Result>] found by the corpus
+                (see <Corpus>.search)
+        """
+
+        if isinstance(query, dict):
+            unknown = [language for language in query if language not in self.corpora]
+
+            if unknown:
+                raise KeyError(
+                    'got queries for corpora %s not in %s' % (', '.join(unknown), self)
+                )
+
+            queries = OrderedDict((language, query[language]) for language in self.corpora if language in query)
+
+        else:
+            queries = OrderedDict((language, query) for language in self.corpora)
+
+        tasks = OrderedDict(
+            (language, lambda corp, q=q: corp.search(q, *args, **kwargs))
+            for language, q in queries.items()
+        )
+
+        return self.__run(tasks, '%s corpora' % len(tasks))
+
+    def retry_failed(self):
+        """
+        Apply `.retry_failed()` of the corpora with failed queries at once
+
+        return: OrderedDict: language: List[<Result>] retrieved
+        """
+
+        tasks = OrderedDict(
+            (language, lambda corp: corp.retry_failed() or [])
+            for language, corp in self.corpora.items()
+            if corp.failed
+        )
+
+        return self.__run(tasks, 'retry %s corpora' % len(tasks))
+
+    def reset_failed(self):
+        """
+        Reset `.failed` of all the corpora
+        """
+
+        for corp in self.corpora.values():
+            corp.reset_failed()
@@ -0,0 +1,294 @@
+# python3
+# coding=<UTF-8>
+
+import zlib
+import pickle
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+
+from .params_container import Container
+from .exceptions import EmptyPageException
+from .transport import RETRY_STATUSES
+
+
+# most pages downloaded at once when the depth is given by a function
+MAX_PREFETCH = 32
+
+_END = object()
+
+
+def check_status(response):
+    """
+    raise ``requests.HTTPError`` for an error page left after the retries
+    of the transport (429, 5xx): it is not a page without results
+
+    return: `response`
+    """
+
+    if response.status_code in RETRY_STATUSES:
+        response.raise_for_status()
+
+    return response
+
+
+def prefetch(fetch, keys, depth=0):
+    """Generator of ``(key, fetch(key))`` pairs for every key in ``keys``, in order.
+
+    With ``depth`` > 0 up to ``depth`` next pages are being downloaded
+    in background threads while the caller processes the current one.
+
+    ``keys`` is consumed lazily: a new key is taken only after the caller
+    is done with the previous page, so a key generator may rely on
+    what was parsed so far (e.g. the total number of hits).
+
+    Parameters
+    ----------
+    fetch: callable
+        key -> page.
+    keys: iterable
+        page keys (page numbers, offsets, ...).
+    depth: int or callable, default 0
+        number of pages fetched ahead. 0 means no background fetching.
+        A function returning the number is called after every page,
+        so the depth may change as pages are parsed (up to `MAX_PREFETCH`).
+    """
+
+    keys = iter(keys)
+
+    if callable(depth):
+        get_depth = lambda: min(depth(), MAX_PREFETCH)
+        max_workers = MAX_PREFETCH
+
+    else:
+        get_depth = lambda: depth
+        max_workers = depth
+
+    # threads are started when the first page is fetched ahead
+    executor = None
+    pending = deque()
+
+    def submit():
+        nonlocal executor
+
+        for key in keys:
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=max_workers)
+
+            pending.append((key, executor.submit(fetch, key)))
+            return True
+
+        return False
+
+    try:
+        while True:
+            if pending:
+                key, future = pending.popleft()
+                page = future.result()
+
+            else:
+                key = next(keys, _END)
+
+                if key is _END:
+                    return
+
+                page = fetch(key)
+
+            yield key, page
+
+            while len(pending) < get_depth() and submit():
+                pass
+
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+class PagedParser(Container):
+    """Base class for parsers which download results page by page.
+
+    A subclass defines
+
+    * ``_page_keys()``: generator of page keys (page numbers, offsets, ...),
+      evaluated lazily so it may stop once the total number of hits is known;
+    * ``_page_request(key)``: ``(method, url, kwargs)`` of the request for the page,
+      ``'cache': False`` in `kwargs` keeps a request which starts a server session
+      out of the response cache;
+    * ``_parse_page(key, response)``: iterable of ``Target`` objects found on the page.
+      It raises ``EmptyPageException`` when the page has no results.
+
+    ``extract`` downloads pages with ``prefetch`` (``_prefetch_depth()`` pages ahead,
+    ``self.prefetch`` unless the subclass redefines it) and stops after
+    ``self.n_results`` targets.
+
+    Progress is checkpointed page by page: if a page cannot be downloaded
+    (the transport retries failed requests first), ``extract`` raises the error
+    and the next ``extract()`` call resumes from that page, with the state
+    the parser has collected so far (server session, number of hits, ...).
+    ``snapshot()`` and ``restore()`` carry this state over to another process.
+
+    A parser which can read the total number of hits from its first page(s)
+    defines ``_parse_count(key, response)`` (and ``_count_keys()`` if more
+    than the first page is needed) for ``count``.
+    """
+
+    # `_page_keys()` generator, number of keys taken from it, the ones whose
+    # pages are not parsed yet and the number of targets yielded,
+    # kept between `extract` calls
+    __keys = None
+    __taken = 0
+    __pending = ()
+    __n = 0
+
+    def _page_keys(self):
+        raise NotImplementedError
+
+    def _page_request(self, key):
+        raise NotImplementedError
+
+    def _parse_page(self, key, response):
+        raise NotImplementedError
+
+    def _count_keys(self):
+        """
+        keys of the pages `count` reads the number of hits from:
+        the first page by default
+        """
+
+        return islice(self._page_keys(), 1)
+
+    def _parse_count(self, key, response):
+        """
+        total number of hits shown on the page of `key`,
+        None if it is not there (the next `_count_keys` page is read)
+        """
+
+        raise NotImplementedError
+
+    def count(self):
+        """
+        return: int: total number of hits of the query, read from the pages
+                of `_count_keys` (one request for most corpora),
+                without parsing their results
+        """
+
+        for key in self._count_keys():
+            n = self._parse_count(key, self._fetch_page(key))
+
+            if n is not None:
+                return n
+
+        return 0
+
+    def _prefetch_depth(self):
+        """
+        number of pages downloaded ahead, asked after every page:
+        a parser whose next pages are independent of each other once
+        the first ones are parsed may raise it then
+        """
+
+        return self.prefetch
+
+    def _fetch_page(self, key):
+        method, url, kwargs = self._page_request(key)
+        return check_status(self._transport.request(method, url, **kwargs))
+
+    @property
+    def checkpoint(self):
+        """
+        (key of the page `extract` resumes from or None, number of targets yielded)
+        """
+
+        return (self.__pending[0] if self.__pending else None), self.__n
+
+    def snapshot(self):
+        """
+        return: bytes: attributes of the parser and progress of its extraction
+                (taken between pages, e.g. in the `on_page` callback of `extract`)
+        """
+
+        state = {
+            k: v for k, v in vars(self).items()
+            if k not in {'_transport', '_PagedParser__keys'}
+        }
+
+        return zlib.compress(pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def restore(self, snapshot):
+        """
+        continue the extraction `snapshot` was taken from: `extract` resumes
+        from the first page not parsed then, earlier pages are not requested.
+        Server sessions of the snapshot may have expired meanwhile
+        """
+
+        vars(self).update(pickle.loads(zlib.decompress(snapshot)))
+        self.__pending = deque(self.__pending)
+        self.__keys = self._page_keys()
+
+        # the keys taken are skipped, ones of unparsed pages are in `__pending`
+        for _ in islice(self.__keys, self.__taken):
+            pass
+
+    def __keys_left(self):
+        """
+        keys of the pages not parsed yet: ones of the interrupted call first
+        """
+
+        interrupted = list(self.__pending)
+        self.__pending.clear()
+
+        for key in interrupted:
+            self.__pending.append(key)
+            yield key
+
+        for key in self.__keys:
+            self.__taken += 1
+            self.__pending.append(key)
+            yield key
+
+    def extract(self, on_page=None):
+        """
+        A streamer to Corpus, resumes an interrupted extraction
+
+        Parameters
+        ----------
+        on_page: callable, default None
+            called with the key of a page once all its targets are yielded,
+            before the next page is parsed.
+        """
+
+        if self.__keys is None:
+            self.__keys = self._page_keys()
+            self.__pending = deque()
+
+        pages = prefetch(self._fetch_page, self.__keys_left(), self._prefetch_depth)
+
+        try:
+            for key, response in pages:
+                try:
+                    for target in self._parse_page(key, response):
+                        if self.__n >= self.n_results:
+                            self.__pending.clear()
+                            return
+
+                        yield target
+                        self.__n += 1
+
+                except EmptyPageException:
+                    self.__pending.clear()
+                    return
+
+                self.__pending.popleft()
+
+                if on_page is not None:
+                    on_page(key)
+
+                if self.__n >= self.n_results:
+                    self.__pending.clear()
+                    return
+
+        finally:
+            pages.close()
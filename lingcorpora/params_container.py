@@ -1,6 +1,9 @@
 # python3
 # coding=<UTF-8>
 
+from .transport import default_transport
+
+
 class Container:
     """
     Universal arguments: ``query``, ``n_results``.
@@ -31,6 +34,16 @@ class Container:
         result index to start from.
     writing_system: str, default None
         writing system of results.
+    prefetch: int, default 0
+        number of result pages downloaded in background while
+        the current page is parsed (for corpora with paginated results).
+    transport: Transport, default None
+        HTTP transport to make requests with (passed by ``Corpus``).
+        If None, the library-wide default one is used.
+    parser_backend: str, default 'bs4'
+        HTML parsing backend of the scraping parsers: ``'bs4'`` (BeautifulSoup)
+        or ``'lxml'`` (lxml.html with precompiled XPath, faster),
+        see `lingcorpora.selectors`.
     """
     def __init__(self,
          query,
@@ -43,7 +56,10 @@ class Container:
          gr_tags=None,
          query_language=None,
          start=0,
-         writing_system=None
+         writing_system=None,
+         prefetch=0,
+         transport=None,
+         parser_backend='bs4'
     ):
         """
         Universal arguments:
@@ -71,6 +87,12 @@ class Container:
                 Result index to start from.
             writing_system: str, optional:
                 Writing system of results.
+            prefetch: int, optional, default 0:
+                Number of result pages downloaded in background.
+            transport: Transport, optional:
+                HTTP transport, the default one if None.
+            parser_backend: str, optional, default 'bs4':
+                HTML parsing backend: 'bs4' or 'lxml'.
         """
         self.query = query
         self.n_results = n_results
@@ -83,3 +105,6 @@ class Container:
         self.gr_tags = gr_tags
         self.start = start
         self.writing_system = writing_system
+        self.prefetch = prefetch
+        self.parser_backend = parser_backend
+        self._transport = transport if transport is not None else default_transport()
@@ -0,0 +1,50 @@
+# python3
+# coding=<UTF-8>
+
+"""
+Regular expressions used by `Target` and corpus parsers,
+compiled once at import instead of on every hit or page.
+"""
+
+import re
+from functools import lru_cache
+
+
+# Target.kwic: punctuation around the target
+NON_WORD = re.compile(r'\W')
+LEADING_NON_WORD = re.compile(r'^\W*')
+TRAILING_NON_WORD = re.compile(r'\W*$')
+
+# Result.export_csv: characters not allowed in file names
+NOT_ALLOWED_IN_FILENAME = re.compile('/\\?%*:|"<>')
+
+# Target.kwic: tokens as of str.split
+TOKEN = re.compile(r'\S+')
+
+# numbers of hits / lines
+DIGITS = re.compile(r'\d+')
+
+# whitespace
+MULTIPLE_SPACES = re.compile(r'\s{2,}')
+EDGE_SPACES = re.compile(r'(^\s+|\s+$)')
+
+# arkhangelskiy_corpora
+SID = re.compile('sid=([0-9]+)')
+FOUND_MATCHES = re.compile('FOUND(.*?)MATCHES')
+POPUP = re.compile(r'popup\(this,\[(.*?)\],\[(.*?)\],\[(.*?)\]')
+QUOTED = re.compile("'(.*?)'")
+POS_AND_TAGS = re.compile('^(.*?)(?:,|$)(.*?)$')
+
+# dan_corpus, est_corpus: punctuation ending the target
+DAN_PUNCT = re.compile("[.-\\[\\]:\";,!?']")
+EST_PUNCT = re.compile('[ .-:;,!?]')
+
+
+@lru_cache(maxsize=1024)
+def word(w):
+    """
+    return: compiled pattern of `w` (escaped) as a whole word
+    """
+
+    return re.compile(r'\b%s\b' % re.escape(w))
+
@@ -0,0 +1,364 @@
+# python3
+# coding=<UTF-8>
+
+"""
+Registry of corpus modules. Corpora come from three sources, later ones
+override earlier ones with the same code:
+
+* modules of ``lingcorpora.corpora`` (``functions.MODULES``);
+* entry points of the ``lingcorpora.corpora`` group of installed packages:
+  ``name = package.module``, the name is the corpus code;
+* ``*_corpus.py`` files of local plugin directories (``LINGCORPORA_PLUGINS``,
+  paths separated by ``os.pathsep``): ``xxx_corpus.py`` is corpus ``xxx``.
+  Plugins are loaded outside of the package, so they import it absolutely
+  (``from lingcorpora.pagination import PagedParser``).
+
+Plugin directories are listed on the first lookup of any corpus, so a plugin
+file overrides a built-in corpus with the same code no matter what is requested
+first. Installed packages are scanned for entry points (slow) only when a code
+is not built-in and not a plugin file, or when all the corpora are listed
+(iteration, `Registry.sources`, `Registry.discover`): an entry point named as
+a built-in corpus replaces it from then on, call ``functions.discover()``
+before the first search to be sure it is used. A module is imported the first
+time its corpus is requested and is used from then on, even if
+`Registry.discover` finds another source for its code later. Its ``META``
+(``host``, ``page_size``, ``params``) and ``RATE_LIMITS`` are module-level
+literals, `Registry.meta` reads them from the source without importing it.
+"""
+
+import os
+import ast
+import sys
+import warnings
+from importlib import import_module, util
+from collections.abc import MutableMapping
+from threading import RLock
+
+
+ENTRY_POINT_GROUP = 'lingcorpora.corpora'
+PLUGINS_ENV = 'LINGCORPORA_PLUGINS'
+
+
+def _entry_points(group):
+    """
+    return: list of (name, value) of installed entry points of `group`
+    """
+
+    # scanning installed packages is slow: only when a corpus is not built-in
+    # (or all of them are listed)
+    try:
+        from importlib.metadata import entry_points
+
+    except ImportError:
+        # Python < 3.8: the backport, a dependency of the package there
+        try:
+            from importlib_metadata import entry_points
+
+        except ImportError:
+            warnings.warn(
+                'entry points of %s are not searched: pip install importlib_metadata' % group
+            )
+            return []
+
+    found = entry_points()
+
+    if hasattr(found, 'select'):
+        found = found.select(group=group)
+
+    else:
+        found = found.get(group, [])
+
+    return [(ep.name, ep.value) for ep in found]
+
+
+def plugin_directories():
+    """
+    return: list of plugin directories from ``LINGCORPORA_PLUGINS``
+    """
+
+    return [d for d in os.environ.get(PLUGINS_ENV, '').split(os.pathsep) if d]
+
+
+def read_literal(path, name):
+    """Value of the module-level literal `name` of the module at `path`,
+    read from its source. A name imported from a sibling module
+    (``from .base import NAME``) is looked up there.
+
+    return: the value or None if it is not a literal of the module
+    """
+
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and \
+                any(isinstance(t, ast.Name) and t.id == name for t in node.targets):
+            try:
+                return ast.literal_eval(node.value)
+
+            except ValueError:
+                return None
+
+        if isinstance(node, ast.ImportFrom) and node.level == 1 and node.module and \
+                any((alias.asname or alias.name) == name for alias in node.names):
+            alias = next(a for a in node.names if (a.asname or a.name) == name)
+            sibling = os.path.join(os.path.dirname(path), node.module.replace('.', os.sep) + '.py')
+
+            if os.path.isfile(sibling):
+                return read_literal(sibling, alias.name)
+
+    return None
+
+
+class Registry(MutableMapping):
+    """Corpus code -> corpus module, imported on first lookup.
+    Behaves as a dict: modules may be set and removed directly.
+
+    Parameters
+    ----------
+    names: dict
+        corpus code: module name in `package`.
+    package: str
+        package of the built-in corpora.
+    group: str, default None
+        entry point group of plugin packages. If None, not searched.
+    directories: list of str, default None
+        plugin directories. If None, ``LINGCORPORA_PLUGINS``.
+
+    Example
+    -------
+    .. code-block:: python
+
+        >>> from lingcorpora.functions import functions
+        >>> functions.meta('bam')
+        {'host': 'maslinsky.spb.ru', 'page_size': 50, 'params': [...], 'rate_limits': {...}}
+        >>> functions.sources()['bam']
+        'lingcorpora.corpora.bam_corpus'
+    """
+
+    def __init__(self, names, package, group=None, directories=None):
+        self.package = package
+        self.group = group
+        self.directories = directories
+
+        # code: module name or path of a plugin file; built-in and set
+        # directly, of entry points, of plugin directories (in that precedence)
+        self.__sources = {code: '%s.%s' % (package, name) for code, name in names.items()}
+        self.__entries = None
+        self.__files = None
+        self.__modules = {}
+        self.__lock = RLock()
+
+    def __repr__(self):
+        return 'Registry(%s, loaded=%s)' % (sorted(self), sorted(self.__modules))
+
+    def __scan_entry_points(self):
+        found = {}
+
+        if self.group is not None:
+            for code, value in _entry_points(self.group):
+                found[code] = value.split(':')[0].strip()
+
+        return found
+
+    def __scan_directories(self):
+        found = {}
+        directories = self.directories if self.directories is not None else plugin_directories()
+
+        for directory in directories:
+            if not os.path.isdir(directory):
+                warnings.warn('plugin directory %s does not exist' % directory)
+                continue
+
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith('_corpus.py'):
+                    found[filename[:-len('_corpus.py')]] = \
+                        os.path.abspath(os.path.join(directory, filename))
+
+        return found
+
+    def discover(self):
+        """
+        look for corpora of entry points and plugin directories (again);
+        codes whose modules are imported already keep them
+        """
+
+        entries = self.__scan_entry_points()
+        files = self.__scan_directories()
+
+        # corpora created before must not change under running searches:
+        # imported modules are looked up before any source
+        with self.__lock:
+            self.__entries = entries
+            self.__files = files
+
+    def __ensure_files(self):
+        if self.__files is None:
+            files = self.__scan_directories()
+
+            with self.__lock:
+                if self.__files is None:
+                    self.__files = files
+
+    def __ensure_entries(self):
+        if self.__entries is None:
+            entries = self.__scan_entry_points()
+
+            with self.__lock:
+                if self.__entries is None:
+                    self.__entries = entries
+
+    def __source(self, code):
+        """
+        return: module name or plugin file of `code`, installed packages
+                are scanned only if it is neither built-in nor a plugin file
+
+        raise: KeyError if there is no corpus `code`
+        """
+
+        self.__ensure_files()
+
+        if code in self.__files:
+            return self.__files[code]
+
+        if self.__entries is None and code not in self.__sources:
+            self.__ensure_entries()
+
+        if self.__entries is not None and code in self.__entries:
+            return self.__entries[code]
+
+        return self.__sources[code]
+
+    def sources(self):
+        """
+        return: dict: corpus code: module name or plugin file
+        """
+
+        self.__ensure_files()
+        self.__ensure_entries()
+
+        with self.__lock:
+            sources = dict(self.__sources)
+            sources.update(self.__entries)
+            sources.update(self.__files)
+
+            return sources
+
+    def __import(self, code, source):
+        if not source.endswith('.py'):
+            return import_module(source)
+
+        name = 'lingcorpora_plugin_%s' % code
+        spec = util.spec_from_file_location(name, source)
+        module = util.module_from_spec(spec)
+        sys.modules[name] = module
+
+        try:
+            spec.loader.exec_module(module)
+
+        except BaseException:
+            del sys.modules[name]
+            raise
+
+        return module
+
+    def __getitem__(self, code):
+        module = self.__modules.get(code)
+
+        if module is not None:
+            return module
+
+        with self.__lock:
+            if code not in self.__modules:
+                self.__modules[code] = self.__import(code, self.__source(code))
+
+            return self.__modules[code]
+
+    def __setitem__(self, code, module):
+        with self.__lock:
+            self.__sources[code] = module.__name__
+            self.__modules[code] = module
+
+            # set directly: over entry points and plugin files
+            for found in (self.__entries, self.__files):
+                if found is not None:
+                    found.pop(code, None)
+
+    def __delitem__(self, code):
+        with self.__lock:
+            sources = [found for found in (self.__sources, self.__entries, self.__files) if found]
+
+            if not any(code in found for found in sources):
+                raise KeyError(code)
+
+            for found in sources:
+                found.pop(code, None)
+
+            self.__modules.pop(code, None)
+
+    def __iter__(self):
+        return iter(list(self.sources()))
+
+    def __len__(self):
+        return len(self.sources())
+
+    def __contains__(self, code):
+        if code in self.__modules:
+            return True
+
+        try:
+            self.__source(code)
+
+        except KeyError:
+            return False
+
+        return True
+
+    def loaded(self):
+        """
+        return: list of codes of the corpora imported so far
+        """
+
+        return list(self.__modules)
+
+    def path(self, code):
+        """
+        return: str: source file of corpus `code`, found without importing it
+                (its package is imported for modules of installed packages)
+        """
+
+        if code in self.__modules:
+            return getattr(self.__modules[code], '__file__', None)
+
+        source = self.__source(code)
+
+        if source.endswith('.py'):
+            return source
+
+        spec = util.find_spec(source)
+
+        return spec.origin if spec is not None else None
+
+    def meta(self, code):
+        """
+        return: dict: ``META`` of corpus `code` with its ``RATE_LIMITS``
+                as ``'rate_limits'``, read from the source of the module
+                (from the module if it is imported)
+        """
+
+        if code in self.__modules:
+            module = self.__modules[code]
+            meta = dict(getattr(module, 'META', None) or {})
+            meta['rate_limits'] = getattr(module, 'RATE_LIMITS', None)
+
+            return meta
+
+        path = self.path(code)
+
+        if path is None or not path.endswith('.py'):
+            return {'rate_limits': None}
+
+        meta = dict(read_literal(path, 'META') or {})
+        meta['rate_limits'] = read_literal(path, 'RATE_LIMITS')
+
+        return meta
@@ -0,0 +1,330 @@
+# python3
+# coding=<UTF-8>
+
+import copy
+import json
+import time
+import zlib
+import random
+import sqlite3
+import hashlib
+from threading import Lock
+from http.cookiejar import CookieJar
+
+from requests.cookies import create_cookie
+
+from .cache import ResponseCache
+from .exceptions import NotRecordedError
+from .transport import Transport, make_response
+
+
+def request_key(method, url, params=None, data=None, cookies=None):
+    """
+    return: str: key of the request as in `ResponseCache.key`,
+            cookies sent with it included (the server session state
+            of corpora which navigate result pages within a session)
+    """
+
+    key = ResponseCache.key(method, url, params, data)
+
+    if isinstance(cookies, CookieJar):
+        cookies = sorted((c.name, c.value) for c in cookies)
+
+    elif isinstance(cookies, dict):
+        cookies = sorted(cookies.items())
+
+    if not cookies:
+        return key
+
+    h = hashlib.sha1(key.encode('utf-8'))
+    h.update(json.dumps(cookies).encode('utf-8'))
+
+    return h.hexdigest()
+
+
+class Archive:
+    """Recorded HTTP responses in an SQLite file, written by <RecordTransport>
+    and served by <ReplayTransport>. Bodies are stored zlib-compressed
+    together with the cookies the responses set.
+
+    Parameters
+    ----------
+    path: str
+        database file, created if it does not exist.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__lock = Lock()
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        self.__db.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            'key TEXT PRIMARY KEY, method TEXT, url TEXT, status INTEGER, encoding TEXT, '
+            'headers TEXT, cookies TEXT, body BLOB, recorded REAL)'
+        )
+        self.__db.commit()
+
+    def __str__(self):
+        return 'Archive(path=%s, N=%s)' % (self.path, len(self))
+
+    __repr__ = __str__
+
+    def __len__(self):
+        with self.__lock:
+            return self.__db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+    def get(self, key):
+        """
+        return: dict with ``url``, ``status_code``, ``content``, ``encoding``,
+                ``headers`` and ``cookies`` or None if nothing is recorded for `key`
+        """
+
+        with self.__lock:
+            row = self.__db.execute(
+                'SELECT url, status, encoding, headers, cookies, body '
+                'FROM responses WHERE key = ?',
+                (key,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            'url': row[0],
+            'status_code': row[1],
+            'encoding': row[2],
+            'headers': json.loads(row[3]),
+            'cookies': json.loads(row[4]),
+            'content': zlib.decompress(row[5])
+        }
+
+    def put(self, key, method, response, cookies=()):
+        """
+        store `response` <requests.Response> under `key`,
+        `cookies` is the list of cookies it set
+        """
+
+        cookies = [[c.name, c.value, c.domain, c.path] for c in cookies]
+
+        with self.__lock:
+            self.__db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, method.upper(), response.url, response.status_code, response.encoding,
+                 json.dumps(dict(response.headers)), json.dumps(cookies),
+                 zlib.compress(response.content), time.time())
+            )
+            self.__db.commit()
+
+    def close(self):
+        with self.__lock:
+            self.__db.close()
+
+
+def _archive(archive):
+    return archive if isinstance(archive, Archive) else Archive(archive)
+
+
+class RecordTransport:
+    """Transport which makes requests with another one and records
+    every response in an <Archive>.
+
+    Parameters
+    ----------
+    archive: Archive or str
+        archive or path of its file.
+    transport: Transport, default None
+        transport making the requests. If None, a new <Transport>.
+
+    Example
+    -------
+    .. code-block:: python
+
+        >>> transport = lingcorpora.RecordTransport('bam.sqlite')
+        >>> corp = lingcorpora.Corpus('bam', transport=transport)
+        >>> corp.search(['walasa', 'yɔrɔ'], n_results=500)
+    """
+
+    def __init__(self, archive, transport=None):
+        self.archive = _archive(archive)
+        self.transport = transport if transport is not None else Transport()
+
+    def __str__(self):
+        return 'RecordTransport(archive=%s)' % self.archive.path
+
+    __repr__ = __str__
+
+    def request(self, method, url, **kwargs):
+        """Make a request with `transport` and record the response.
+
+        return: requests.Response
+        """
+
+        key = request_key(
+            method, url, kwargs.get('params'), kwargs.get('data'), kwargs.get('cookies')
+        )
+        response = self.transport.request(method, url, **kwargs)
+        cookies = [c for r in response.history + [response] for c in r.cookies]
+        self.archive.put(key, method, response, cookies)
+
+        return response
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def with_cache(self, cache, namespace=None):
+        return RecordTransport(self.archive, self.transport.with_cache(cache, namespace))
+
+    def with_throttle(self, throttle):
+        return RecordTransport(self.archive, self.transport.with_throttle(throttle))
+
+    def close(self):
+        self.transport.close()
+
+
+class _Replay:
+    """
+    lookup of recorded responses shared by the sync and async replay transports
+    """
+
+    def __init__(self, archive, latency=0.0, jitter=0.0, strict=True):
+        self.archive = _archive(archive)
+        self.latency = latency
+        self.jitter = jitter
+        self.strict = strict
+        self.requests = 0
+        self.__lock = Lock()
+
+    def __str__(self):
+        return '%s(archive=%s, latency=%s, jitter=%s)' % \
+                (type(self).__name__, self.archive.path, self.latency, self.jitter)
+
+    __repr__ = __str__
+
+    def _delay(self):
+        return self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+
+    def _response(self, method, url, params=None, data=None, cookies=None, **kwargs):
+        # pages are replayed from several threads with prefetch
+        with self.__lock:
+            self.requests += 1
+
+        entry = self.archive.get(request_key(method, url, params, data, cookies))
+
+        if entry is None:
+            if self.strict:
+                raise NotRecordedError('no recorded response for %s %s' % (method.upper(), url))
+
+            return make_response(url, 404, b'')
+
+        if isinstance(cookies, CookieJar):
+            for name, value, domain, path in entry['cookies']:
+                cookies.set_cookie(create_cookie(name, value, domain=domain, path=path))
+
+        del entry['cookies']
+
+        return make_response(**entry)
+
+    def with_cache(self, cache, namespace=None):
+        # responses are local already
+        return self
+
+
+class ReplayTransport(_Replay):
+    """Transport which serves responses from an <Archive> recorded
+    by <RecordTransport> instead of the network, after an artificial
+    latency. Requests sleep in the calling thread, so concurrent searches
+    (``Corpus(max_workers=...)``, ``prefetch``) overlap as they would online.
+
+    Parameters
+    ----------
+    archive: Archive or str
+        archive or path of its file.
+    latency: float, default 0
+        seconds every request takes.
+    jitter: float, default 0
+        random extra seconds (uniform from 0 to `jitter`) added to `latency`.
+    strict: bool, default True
+        raise `NotRecordedError` for a request that was not recorded.
+        If False, an empty 404 response is returned.
+    throttle: Throttle, default None
+        per-host limits the replayed requests wait for, as with <Transport>.
+
+    Example
+    -------
+    .. code-block:: python
+
+        >>> transport = lingcorpora.ReplayTransport('bam.sqlite', latency=0.2, jitter=0.1)
+        >>> corp = lingcorpora.Corpus('bam', transport=transport, max_workers=2)
+        >>> corp.search(['walasa', 'yɔrɔ'], n_results=500)
+    """
+
+    def __init__(self, archive, latency=0.0, jitter=0.0, strict=True, throttle=None):
+        super().__init__(archive, latency, jitter, strict)
+        self.throttle = throttle
+
+    def request(self, method, url, **kwargs):
+        """
+        return: requests.Response: the recorded response
+        """
+
+        if self.throttle is None:
+            return self.__replay(method, url, **kwargs)
+
+        with self.throttle.slot(url) as slot:
+            response = self.__replay(method, url, **kwargs)
+            slot.status = response.status_code
+            slot.retry_after = response.headers.get('Retry-After')
+
+        return response
+
+    def __replay(self, method, url, **kwargs):
+        delay = self._delay()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        return self._response(method, url, **kwargs)
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def with_throttle(self, throttle):
+        transport = copy.copy(self)
+        transport.throttle = throttle
+
+        return transport
+
+    def close(self):
+        pass
+
+
+class AsyncReplayTransport(_Replay):
+    """<ReplayTransport> for ``lingcorpora.aio.AsyncCorpus``:
+    the latency is awaited with ``asyncio.sleep``.
+    """
+
+    async def request(self, method, url, **kwargs):
+        # not imported with the module: `import lingcorpora` stays light
+        import asyncio
+
+        delay = self._delay()
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        return self._response(method, url, **kwargs)
+
+    async def get(self, url, params=None, **kwargs):
+        return await self.request('GET', url, params=params, **kwargs)
+
+    async def post(self, url, data=None, **kwargs):
+        return await self.request('POST', url, data=data, **kwargs)
+
+    async def close(self):
+        pass
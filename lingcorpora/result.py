@@ -1,8 +1,9 @@
 # python3
 # coding=<UTF-8>
 
-import re
-import csv
+from .sinks import CSVSink
+from .patterns import NOT_ALLOWED_IN_FILENAME
+from .target import kwic_table
 
 
 class Result:
@@ -53,9 +54,12 @@ class Result:
         }
         self.results = list()
         self.n = 0
+        # one copy of strings repeated across targets (document meta
+        # of every snippet, gr_tags, lang), freed with the result
+        self.__strings = dict()
         self.header = ('index', 'text')
         self.kwic_header = ('index', 'left', 'center', 'right')
-        self.not_allowed_sub_regexp = re.compile('/\\?%*:|"<>')
+        self.not_allowed_sub_regexp = NOT_ALLOWED_IN_FILENAME
 
     def __str__(self):
         return 'Result(query=%s, N=%s, params=%s)' % \
@@ -84,10 +88,47 @@ class Result:
     def __delitem__(self, key):
         del self.results[key]
         
+    def __share(self, value):
+        if type(value) is not str:
+            return value
+
+        return self.__strings.setdefault(value, value)
+
     def add(self, x):
+        x.meta = self.__share(x.meta)
+        x.gr_tags = self.__share(x.gr_tags)
+        x.lang = self.__share(x.lang)
+        
+        if self.results:
+            x._share_text_index(self.results[-1])
+        
         self.results.append(x)
         self.n += 1
     
+    def kwic_table(self, n_left=None, n_right=None, level='word'):
+        """``kwic`` of all results, computed in one pass:
+        each text is tokenized once for all its hits.
+        
+        Parameters
+        ----------
+        n_left: int, default None
+            length of left context. If None, `n_left` of the search or 10.
+        n_right: int, default None
+            length of right context. If None, `n_right` of the search or 10.
+        level: str, default word
+            counting context length by tokens (word) or by characters (char)
+        
+        return: List[(str, str, str)]: (left, center, right) for every target
+        """
+        
+        if n_left is None:
+            n_left = self.params.get('n_left') if self.params.get('n_left') is not None else 10
+        
+        if n_right is None:
+            n_right = self.params.get('n_right') if self.params.get('n_right') is not None else 10
+        
+        return kwic_table(self.results, n_left, n_right, level)
+    
     def export_csv(self, filename=None, header=True, sep=';'):
         """Save search result as CSV.
         
@@ -107,32 +148,17 @@ class Result:
             filename = '%s_%s_results.csv' % \
                         (self.lang, self.not_allowed_sub_regexp.sub('', self.query))
         
-        with open(filename, 'w', encoding='utf-8-sig') as f:
-            writer = csv.writer(
-                f,
-                delimiter=sep,
-                quotechar='"',
-                quoting=csv.QUOTE_MINIMAL,
-                lineterminator='\n'
-            )
-            
-            if self.params['kwic']:
-                if header:
-                    writer.writerow(self.kwic_header)
-                
-                n_left = self.params['n_left'] if self.params['n_left'] is not None else 10 
-                n_right = self.params['n_right'] if self.params['n_right'] is not None else 10
-                    
-                for i, t in enumerate(self.results):
-                    writer.writerow((i + 1, *t.kwic(n_left, n_right)))
-            
-            else:
-                if header:
-                    writer.writerow(self.header)
-                
-                for i, t in enumerate(self.results):
-                    writer.writerow((i + 1, t.text))
-                    
+        with CSVSink(
+            filename,
+            sep=sep,
+            header=header,
+            kwic=self.params['kwic'],
+            n_left=self.params['n_left'],
+            n_right=self.params['n_right'],
+            batch_size=1000
+        ) as sink:
+            sink.write_all(self.results)
+
     def clear(self):
         """Overwrites the results attribute to empty list.
         
@@ -148,3 +174,4 @@ class Result:
         """
         del self.results
         self.results = list()
+        self.__strings.clear()
@@ -0,0 +1,221 @@
+# python3
+# coding=<UTF-8>
+
+"""
+HTML parsing backends of the scraping parsers.
+
+A parser selects the elements of a result page with <Selector> objects,
+which hold a CSS selector for BeautifulSoup and the same selection
+as a compiled XPath for lxml, so one parsing code runs on both trees.
+The backend is chosen with the ``parser_backend`` search parameter:
+
+* ``'bs4'``: BeautifulSoup over lxml (default);
+* ``'lxml'``: lxml.html tree and precompiled XPath.
+
+On the fixture pages of ``benchmarks/parsers.py`` the lxml backend parses
+4 to 15 times more pages per second than bs4 (e.g. est: 117 against
+1186 pages/s, bam: 9.5 against 129 pages/s); the pages are hand-written,
+so the figures are relative.
+"""
+
+from bs4 import BeautifulSoup, NavigableString
+from lxml import etree
+from lxml import html as lxml_html
+from lxml.etree import ParserError
+
+
+def has_class(name):
+    """
+    return: XPath predicate of the elements with class `name` (as CSS ``.name``)
+    """
+
+    return "contains(concat(' ', normalize-space(@class), ' '), ' %s ')" % name
+
+
+class Selector:
+    """
+    one selection of elements as a CSS selector (bs4)
+    and an XPath relative to the context element (lxml)
+    """
+
+    __slots__ = ('css', 'xpath')
+
+    def __init__(self, css, xpath):
+        self.css = css
+        self.xpath = etree.XPath(xpath)
+
+    def __repr__(self):
+        return 'Selector(%s)' % self.css
+
+
+class SoupBackend:
+    """
+    BeautifulSoup tree
+    """
+
+    name = 'bs4'
+
+    @staticmethod
+    def document(page):
+        return BeautifulSoup(page, 'lxml')
+
+    @staticmethod
+    def select(element, selector):
+        return element.select(selector.css)
+
+    @staticmethod
+    def select_one(element, selector):
+        return element.select_one(selector.css)
+
+    @staticmethod
+    def text(element):
+        return element.text
+
+    @staticmethod
+    def string(element):
+        return element.string
+
+    @staticmethod
+    def tag(element):
+        return element.name
+
+    @staticmethod
+    def get(element, attribute):
+        return element.get(attribute)
+
+    @staticmethod
+    def has_class(element, name):
+        return name in element['class']
+
+    @staticmethod
+    def children(element):
+        return [ch for ch in element.children if ch.name is not None]
+
+    @staticmethod
+    def next_string(element):
+        # '' if the element is followed by a tag or nothing
+        following = element.next_sibling
+        return following if isinstance(following, NavigableString) else ''
+
+    @staticmethod
+    def next_element(element):
+        return element.find_next_sibling()
+
+    @staticmethod
+    def previous_string(element):
+        previous = element.previous_sibling
+        return previous if isinstance(previous, NavigableString) else ''
+
+    @staticmethod
+    def previous_element(element):
+        return element.find_previous_sibling()
+
+
+# plain `str` results, not ones keeping the tree alive
+_string = etree.XPath('string()', smart_strings=False)
+
+
+class LxmlBackend:
+    """
+    lxml.html tree, elements are selected with compiled XPath
+    """
+
+    name = 'lxml'
+
+    @staticmethod
+    def document(page):
+        try:
+            return lxml_html.document_fromstring(page)
+
+        except ValueError:
+            # str with an XML encoding declaration
+            return lxml_html.document_fromstring(page.encode('utf-8'))
+
+        except ParserError:
+            # empty page
+            return lxml_html.document_fromstring('<html></html>')
+
+    @staticmethod
+    def select(element, selector):
+        return selector.xpath(element)
+
+    @staticmethod
+    def select_one(element, selector):
+        found = selector.xpath(element)
+        return found[0] if found else None
+
+    @staticmethod
+    def text(element):
+        return _string(element)
+
+    @staticmethod
+    def string(element):
+        # as `bs4.Tag.string`: the only string inside the element,
+        # looked for through single children
+        while len(element):
+            if len(element) > 1 or element.text or element[0].tail:
+                return None
+
+            element = element[0]
+
+            if element.tag is etree.Comment:
+                break
+
+        return element.text
+
+    @staticmethod
+    def tag(element):
+        return element.tag
+
+    @staticmethod
+    def get(element, attribute):
+        return element.get(attribute)
+
+    @staticmethod
+    def has_class(element, name):
+        return name in element.attrib['class'].split()
+
+    @staticmethod
+    def children(element):
+        return [ch for ch in element if isinstance(ch.tag, str)]
+
+    @staticmethod
+    def next_string(element):
+        return element.tail or ''
+
+    @staticmethod
+    def next_element(element):
+        return element.getnext()
+
+    @staticmethod
+    def previous_string(element):
+        previous = element.getprevious()
+
+        if previous is None:
+            return element.getparent().text or ''
+
+        return previous.tail or ''
+
+    @staticmethod
+    def previous_element(element):
+        return element.getprevious()
+
+
+BACKENDS = {
+    SoupBackend.name: SoupBackend,
+    LxmlBackend.name: LxmlBackend
+}
+
+
+def backend(name):
+    """
+    return: parsing backend called `name`
+    """
+
+    if name not in BACKENDS:
+        raise ValueError(
+            'got invalid `parser_backend` "%s", expected one of %s'
+            % (name, ', '.join(sorted(BACKENDS)))
+        )
+
+    return BACKENDS[name]
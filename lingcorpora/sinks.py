@@ -0,0 +1,345 @@
+# python3
+# coding=<UTF-8>
+
+import os
+import io
+import csv
+import json
+from itertools import islice
+from threading import Lock
+
+from .target import kwic_table
+
+
+class Sink:
+    """Base class of writers which save <Target> objects to a file
+    as soon as they are extracted.
+
+    Rows are buffered and written every `batch_size` targets, so the file
+    holds usable partial output if a long crawl dies halfway through.
+
+    Parameters
+    ----------
+    filename: str
+        name of the file.
+    kwic: bool, default True
+        whether to write targets in ``kwic`` format (left, center, right)
+        or as full texts.
+    n_left: int, default None
+        length of left context in words. If None, 10.
+    n_right: int, default None
+        length of right context in words. If None, 10.
+    batch_size: int, default 100
+        number of targets buffered before they are written.
+    resume: bool, default False
+        continue an existing file instead of overwriting it. The first targets
+        passed to the sink are skipped as many as rows the file already has,
+        so rerunning the same search completes the file without duplicates.
+    """
+
+    encoding = 'utf-8'
+
+    def __init__(self,
+                 filename,
+                 kwic=True,
+                 n_left=None,
+                 n_right=None,
+                 batch_size=100,
+                 resume=False
+    ):
+        self.filename = filename
+        self.kwic = kwic
+        self.n_left = n_left if n_left is not None else 10
+        self.n_right = n_right if n_right is not None else 10
+        self.batch_size = batch_size
+        self.resume = resume
+
+        self.n = 0
+        self.skip = 0
+        self.__buffer = []
+        self.__lock = Lock()
+
+        if resume and os.path.isfile(filename):
+            self._truncate_partial()
+            self.n = self.skip = self._count_rows()
+            # a file with the header and no rows yet has it already
+            new = os.path.getsize(filename) == 0
+            self._file = open(filename, 'a', encoding=self.encoding, newline='')
+
+        else:
+            new = True
+            self._file = open(filename, 'w', encoding=self.encoding, newline='')
+
+        if new:
+            self._write_header()
+
+    def __str__(self):
+        return '%s(filename=%s, N=%s)' % (type(self).__name__, self.filename, self.n)
+
+    __repr__ = __str__
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _truncate_partial(self):
+        """
+        drop an incomplete last line left by an interrupted write
+        """
+
+        with open(self.filename, 'rb+') as f:
+            data = f.read()
+
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+
+    def _count_rows(self):
+        raise NotImplementedError
+
+    def _write_header(self):
+        pass
+
+    def _row(self, index, target, context):
+        raise NotImplementedError
+
+    def _text_row(self, index, text, context):
+        raise NotImplementedError('%s rows need <Target> objects' % type(self).__name__)
+
+    def _write_rows(self, rows):
+        raise NotImplementedError
+
+    def write(self, target, context=None):
+        """
+        add `target` <Target> to the file,
+        `context` is its ``kwic`` if already computed
+        """
+
+        with self.__lock:
+            if self.skip:
+                self.skip -= 1
+                return
+
+            if self.kwic and context is None:
+                context = kwic_table((target,), self.n_left, self.n_right)[0]
+
+            self.n += 1
+            self.__buffer.append(self._row(self.n, target, context))
+
+            if len(self.__buffer) >= self.batch_size:
+                self.__flush()
+
+    def write_all(self, targets):
+        """
+        add all `targets` to the file, ``kwic`` is computed
+        by batches of `batch_size` with `target.kwic_table`
+        """
+
+        targets = iter(targets)
+
+        while True:
+            batch = list(islice(targets, self.batch_size))
+
+            if not batch:
+                break
+
+            if self.kwic:
+                contexts = kwic_table(batch, self.n_left, self.n_right)
+
+            else:
+                contexts = [None] * len(batch)
+
+            for target, context in zip(batch, contexts):
+                self.write(target, context)
+
+    def write_texts(self, texts, contexts=None):
+        """
+        add rows of `texts` (str) and their ``kwic`` `contexts`
+        without <Target> objects, for sinks whose rows are made of the text
+        only (`CSVSink`); `contexts` are required if `kwic`
+        """
+
+        if self.kwic and contexts is None:
+            raise ValueError('kwic rows need `contexts`')
+
+        if contexts is None:
+            contexts = [None] * len(texts)
+
+        with self.__lock:
+            for text, context in zip(texts, contexts):
+                if self.skip:
+                    self.skip -= 1
+                    continue
+
+                self.n += 1
+                self.__buffer.append(self._text_row(self.n, text, context))
+
+            if len(self.__buffer) >= self.batch_size:
+                self.__flush()
+
+    def __flush(self):
+        if self.__buffer:
+            self._write_rows(self.__buffer)
+            self.__buffer = []
+
+        self._file.flush()
+
+    def flush(self):
+        """
+        write buffered targets
+        """
+
+        with self.__lock:
+            self.__flush()
+
+    def close(self):
+        with self.__lock:
+            if not self._file.closed:
+                self.__flush()
+                self._file.close()
+
+
+class CSVSink(Sink):
+    """Writes targets to a CSV file in the format of `Result.export_csv`.
+
+    Parameters
+    ----------
+    filename: str
+        name of the file.
+    sep: str, default ';'
+        cell separator in the csv.
+    header: bool, default True
+        whether to include a header in the table:
+        ``('index', 'left', 'center', 'right')`` or ``('index', 'text')``.
+    **kwargs:
+        see `Sink`.
+
+    Example
+    -------
+    .. code-block:: python
+
+        >>> corp = lingcorpora.Corpus('rus')
+        >>> with lingcorpora.CSVSink('rus_results.csv', resume=True) as sink:
+        ...     corp.search('мешок', n_results=100000, sink=sink)
+    """
+
+    encoding = 'utf-8-sig'
+    header = ('index', 'text')
+    kwic_header = ('index', 'left', 'center', 'right')
+
+    def __init__(self, filename, sep=';', header=True, **kwargs):
+        self.sep = sep
+        self.with_header = header
+        super().__init__(filename, **kwargs)
+
+    def __reader(self, f, strict=False):
+        return csv.reader(f, delimiter=self.sep, quotechar='"', strict=strict)
+
+    def _truncate_partial(self):
+        """
+        drop an incomplete last record left by an interrupted write:
+        records are read with `csv.reader`, a quoted field may span lines
+        """
+
+        with open(self.filename, 'rb+') as f:
+            text = f.read().decode(self.encoding, errors='replace')
+            read = 0
+            end = 0
+
+            def lines():
+                nonlocal read
+
+                for line in io.StringIO(text, newline=''):
+                    read += len(line)
+                    yield line
+
+            try:
+                for _ in self.__reader(lines(), strict=True):
+                    # the record is complete if its line terminator is written
+                    if text[read - 1] == '\n':
+                        end = read
+
+            except csv.Error:
+                # the file ends inside a quoted field
+                pass
+
+            if end < len(text):
+                f.truncate(len(text[:end].encode(self.encoding)) if end else 0)
+
+    def _count_rows(self):
+        with open(self.filename, encoding=self.encoding, newline='') as f:
+            n = sum(1 for _ in self.__reader(f))
+
+        return max(0, n - 1) if self.with_header else n
+
+    def _write_header(self):
+        if self.with_header:
+            self.__writer().writerow(self.kwic_header if self.kwic else self.header)
+
+    def __writer(self):
+        return csv.writer(
+            self._file,
+            delimiter=self.sep,
+            quotechar='"',
+            quoting=csv.QUOTE_MINIMAL,
+            lineterminator='\n'
+        )
+
+    def _row(self, index, target, context):
+        return self._text_row(index, target.text, context)
+
+    def _text_row(self, index, text, context):
+        if self.kwic:
+            return (index, *context)
+
+        return (index, text)
+
+    def _write_rows(self, rows):
+        self.__writer().writerows(rows)
+
+
+class TSVSink(CSVSink):
+    """`CSVSink` with tab separated cells.
+    """
+
+    def __init__(self, filename, header=True, **kwargs):
+        super().__init__(filename, sep='\t', header=header, **kwargs)
+
+
+class JSONLSink(Sink):
+    """Writes targets to a JSON Lines file, one object per target with keys
+    ``index``, ``text``, ``idxs``, ``meta``, ``gr_tags``, ``transl``, ``lang``,
+    ``analysis`` and, if `kwic`, ``left``, ``center``, ``right``.
+
+    Parameters
+    ----------
+    filename: str
+        name of the file.
+    **kwargs:
+        see `Sink`.
+    """
+
+    def _count_rows(self):
+        with open(self.filename, encoding=self.encoding) as f:
+            return sum(1 for line in f if line.strip())
+
+    def _row(self, index, target, context):
+        row = {
+            'index': index,
+            'text': target.text,
+            'idxs': list(target.idxs),
+            'meta': target.meta,
+            'gr_tags': target.gr_tags,
+            'transl': target.transl,
+            'lang': target.lang,
+            'analysis': target.analysis
+        }
+
+        if self.kwic:
+            row['left'], row['center'], row['right'] = context
+
+        return json.dumps(row, ensure_ascii=False, default=str)
+
+    def _write_rows(self, rows):
+        self._file.write('\n'.join(rows) + '\n')
@@ -1,7 +1,14 @@
 # python3
 # coding=<UTF-8>
 
-import re
+from array import array
+from bisect import bisect_left
+from operator import add
+from functools import partial
+from itertools import accumulate, chain, count
+
+
+from .patterns import NON_WORD, LEADING_NON_WORD, TRAILING_NON_WORD, TOKEN
 
 
 class Target:
@@ -36,15 +43,20 @@ class Target:
     
     .. code-block:: python
     
-        >>> for k, v in vars(first_hit).items():
-        >>> print(k, v)
+        >>> for k in first_hit._fields:
+        >>>     print(k, getattr(first_hit, k))
         text  Я, например, для внучки настегала своими руками лоскутное одеяло, зная, что оно будет её оберегать, давать ей энергию. 
         idxs (59, 65)
         meta Народный костюм: архаика или современность? // «Народное творчество», 2004
-        tags {'lex': ['одеяло'], 'gramm': ['S', 'inan', 'n', 'sg', 'acc', 'disamb'], 'sem': ['r:concr', 't:tool:bedding'], 'flags': ['animred', 'bcomma', 'bmark', 'casered', 'genderred', 'numred']}
+        analysis {'lex': ['одеяло'], 'gramm': ['S', 'inan', 'n', 'sg', 'acc', 'disamb'], 'sem': ['r:concr', 't:tool:bedding'], 'flags': ['animred', 'bcomma', 'bmark', 'casered', 'genderred', 'numred']}
+        gr_tags None
         transl None
         lang None
     """
+
+    _fields = ('text', 'idxs', 'meta', 'analysis', 'gr_tags', 'transl', 'lang')
+    __slots__ = _fields + ('__kwic_index',)
+
     def __init__(self,
                  text,
                  idxs,
@@ -80,6 +92,7 @@ class Target:
         self.gr_tags = gr_tags
         self.transl = transl
         self.lang = lang
+        self.__kwic_index = None
         
     def __str__(self):
         return 'Target(%s, %s)' % \
@@ -87,29 +100,61 @@ class Target:
 
     __repr__ = __str__
             
-    def __get_kwic_wlvl_target_idx(self):
+    def _share_text_index(self, other):
         """
-        get word level index of target
+        use one token index for `other` and this target, which are in
+        the same text: <Result> links the hits in one text, which come
+        one after another; the index is built on the first word level
+        ``kwic`` of either
         """
         
-        return len(self.text[:self.idxs[0]].split())
+        if self.text is not other.text and self.text != other.text:
+            return
+        
+        cached = other.__text_cell()
+        self.__kwic_index = (self.text, self.idxs, cached[2], None)
     
-    def __handle_punct(self, l, c, r):
+    def __text_cell(self):
         """
-        handle punctuation outside the target
-        ('one;', 'two;', 'three!') >> ('one;', 'two', ';three!') 
+        return: `__kwic_index` valid for the current `text`: (text, idxs,
+                [`_text_index` of the text or None] shared by the targets
+                in the text, (word level index, punct) or None)
         """
         
-        if re.search(r'[\W]', c) is not None:
-            l_punct = re.search(r'^([\W]*)', c).group(1)
-            r_punct = re.search(r'([\W]*)$', c).group(1)
-            c = re.sub(r'^[\W]*', '', c)
-            c = re.sub(r'[\W]*$', '', c)
-            l += l_punct
-            r = r_punct + ' ' + r
-            r = r.strip()
-            
-        return (l, c, r)
+        cached = self.__kwic_index
+        
+        if cached is None or cached[0] is not self.text:
+            cached = self.__kwic_index = (self.text, self.idxs, [None], None)
+        
+        return cached
+    
+    def __get_kwic_index(self):
+        """
+        token index of the text and position of the target, built on the first
+        word level ``kwic`` call: later calls only slice the text.
+        It is kept with the `text` and `idxs` it was built for
+        and built again if they are changed (the text index is reused
+        if only `idxs` are)
+        
+        return: ((str, array, array), int, (str, str, str)): `_text_index` of the text,
+                word level index of the target, `_split_punct` of the target
+        """
+        
+        text, idxs, cell, position = self.__text_cell()
+        
+        if cell[0] is None:
+            cell[0] = _text_index(self.text)
+        
+        text_index = cell[0]
+        
+        if position is None or idxs != self.idxs:
+            n = len(text_index[1]) - 1
+            idx = bisect_left(text_index[2], self.idxs[0], 0, n)
+            punct = _split_punct(_span(text_index, idx, idx + 1)) if idx < n else None
+            position = (idx, punct)
+            self.__kwic_index = (text, self.idxs, cell, position)
+        
+        return (text_index,) + position
     
     def kwic(self, left, right, level='word'):
         """This function makes ``kwic`` format for an item for further usage and csv output.
@@ -137,6 +182,9 @@ class Target:
         """
 
         # ISSUE: 'one , two, three >> kwic(1, 1, word) >> (',', 'two', ',three')
+        # see also `kwic_table` for many targets at once
+        # word level: the token index is built on the first call and again
+        # when `text` or `idxs` change, other calls (any `left`, `right`) only slice the text
         
         if level not in {'word', 'char'}:
             raise ValueError('got invalid `level` "%s"' % level)
@@ -144,16 +192,16 @@ class Target:
         level = 'char' if ' ' not in self.text else level
         
         if level == 'word':
-            tokens = self.text.split()
-            idx = self.__get_kwic_wlvl_target_idx()
-
-            if idx >= len(tokens):
-                return (' '.join(tokens), '', '')
-
-            return self.__handle_punct(
-                ' '.join(tokens[max(0, idx-left):idx]),
-                tokens[idx],
-                ' '.join(tokens[idx+1:idx+right+1])
+            text_index, idx, punct = self.__get_kwic_index()
+            n = len(text_index[1]) - 1
+            
+            if idx >= n:
+                return (text_index[0], '', '')
+            
+            return _join_punct(
+                _span(text_index, max(0, idx-left), idx),
+                punct,
+                _span(text_index, idx+1, min(n, idx+right+1))
             )
 
         else:
@@ -162,3 +210,128 @@ class Target:
                 self.text[self.idxs[0]:self.idxs[1]],
                 self.text[self.idxs[1]:self.idxs[1]+right]
             )
+
+
+def _split_punct(c):
+    """
+    handle punctuation outside the target
+    ('one;', 'two;', 'three!') >> ('one;', 'two', ';three!') 
+    
+    return: (str, str, str): punctuation moved to the left context,
+            target, punctuation moved to the right one
+    """
+    
+    if NON_WORD.search(c) is None:
+        return ('', c, '')
+    
+    l_punct = LEADING_NON_WORD.match(c).group()
+    r_punct = TRAILING_NON_WORD.search(c).group()
+    c = c[len(l_punct):]
+    c = c[:len(c) - len(TRAILING_NON_WORD.search(c).group())]
+    
+    return (l_punct, c, r_punct)
+
+
+def _join_punct(l, punct, r):
+    """
+    ``kwic`` from contexts and `punct` of `_split_punct`
+    """
+    
+    l_punct, c, r_punct = punct
+    
+    if r_punct:
+        r = r_punct + ' ' + r if r else r_punct
+    
+    return (l + l_punct, c, r)
+
+
+def _text_index(text, compact=True):
+    """
+    return: (str, array, array): tokens of `text` joined by single spaces
+            (`text` itself if it is already so), start offsets of the tokens
+            in it, followed by ``len(joined) + 1``, and start offsets of the tokens
+            in `text` (the same array if `joined` is `text`): the word level index
+            of a target is the number of tokens starting before it.
+            Offsets are arrays if `compact` (index kept by a target),
+            lists otherwise (faster to build)
+    """
+    
+    offsets = partial(array, 'l') if compact else list
+    tokens = text.split()
+    joined = ' '.join(tokens)
+    starts = offsets(map(add, accumulate(chain((0,), map(len, tokens))), count()))
+    
+    if joined == text:
+        return text, starts, starts
+    
+    return joined, starts, offsets(m.start() for m in TOKEN.finditer(text))
+
+
+def _span(text_index, a, b):
+    """
+    tokens from `a` to `b` of indexed text joined by spaces
+    """
+    
+    if a >= b:
+        return ''
+    
+    joined, starts = text_index[0], text_index[1]
+    
+    return joined[starts[a]:starts[b] - 1]
+
+
+def kwic_table(targets, left, right, level='word'):
+    """``kwic`` of all `targets` in one pass: a text is tokenized once
+    for all consecutive targets found in it. The word level index of a target
+    is found without splitting the text before it: by counting the spaces
+    before it in a text of single spaced tokens, by binary search in the token
+    offsets of `_text_index` otherwise. Token indexes of the targets
+    are not kept, so memory does not grow with the number of targets.
+    
+    return: List[(str, str, str)]: as ``[t.kwic(left, right, level) for t in targets]``
+    """
+    
+    return kwic_spans(((t.text, t.idxs) for t in targets), left, right, level)
+
+
+def kwic_spans(spans, left, right, level='word'):
+    """`kwic_table` of (text, (l, r)) pairs instead of <Target> objects
+    
+    return: List[(str, str, str)]
+    """
+    
+    if level not in {'word', 'char'}:
+        raise ValueError('got invalid `level` "%s"' % level)
+    
+    table = []
+    text = tokens = None
+    
+    for t, (l, r) in spans:
+        if level == 'char' or ' ' not in t:
+            table.append((t[max(0, l-left):l], t[l:r], t[r:r+right]))
+            continue
+        
+        if t is not text and t != text:
+            text = t
+            tokens = text.split()
+            # token offsets in `text`, None if it is single spaced
+            starts = None if ' '.join(tokens) == text else _text_index(text, compact=False)[2]
+        
+        if starts is not None:
+            idx = bisect_left(starts, l)
+        
+        else:
+            # a token starts at 0 and after each space
+            idx = text.count(' ', 0, l - 1) + 1 if l > 0 else 0
+        
+        if idx >= len(tokens):
+            table.append((' '.join(tokens), '', ''))
+            continue
+        
+        table.append(_join_punct(
+            ' '.join(tokens[max(0, idx-left):idx]),
+            _split_punct(tokens[idx]),
+            ' '.join(tokens[idx+1:idx+right+1])
+        ))
+    
+    return table
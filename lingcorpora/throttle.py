@@ -0,0 +1,243 @@
+# python3
+# coding=<UTF-8>
+
+import time
+from threading import Condition, Lock
+from urllib.parse import urlsplit
+
+
+class HostLimiter:
+    """Limits of requests to one host: a token bucket (`rate` requests
+    per second, bursts of `burst`) and an AIMD concurrency limit.
+
+    The concurrency limit grows by ``increase / limit`` with every successful
+    request answered within `latency_target` (about ``increase`` per round of
+    requests), stays the same for slow answers and is multiplied by `decrease`
+    on errors, 429 and 5xx responses (once per round: requests sent before
+    the last decrease do not decrease it again).
+
+    Parameters
+    ----------
+    rate: float, default None
+        requests per second. If None, not limited.
+    burst: int, default 1
+        number of requests which may be sent at once after a pause.
+    max_concurrency: int, default 8
+        maximum number of requests in flight.
+    min_concurrency: int, default 1
+        minimum number of requests in flight.
+    initial_concurrency: int, default None
+        starting number of requests in flight. If None, `min_concurrency`.
+    latency_target: float, default 2.0
+        seconds: the concurrency grows while answers come faster.
+        If None, it grows with every successful request.
+    increase: float, default 1.0
+        additive increase.
+    decrease: float, default 0.5
+        multiplicative decrease.
+    """
+
+    def __init__(self,
+                 rate=None,
+                 burst=1,
+                 max_concurrency=8,
+                 min_concurrency=1,
+                 initial_concurrency=None,
+                 latency_target=2.0,
+                 increase=1.0,
+                 decrease=0.5
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_target = latency_target
+        self.increase = increase
+        self.decrease = decrease
+
+        self.limit = float(initial_concurrency if initial_concurrency is not None else min_concurrency)
+        self.in_flight = 0
+
+        self.__condition = Condition()
+        self.__last_decrease = 0.0
+        self.__paused_until = 0.0
+
+        self.__bucket = Lock()
+        self.__tokens = float(burst)
+        self.__refilled = time.monotonic()
+
+    def __str__(self):
+        return 'HostLimiter(rate=%s, limit=%.2f, in_flight=%s)' % \
+                (self.rate, self.limit, self.in_flight)
+
+    __repr__ = __str__
+
+    def __take_token(self):
+        """
+        wait for a token of the bucket
+        """
+
+        while True:
+            with self.__bucket:
+                now = time.monotonic()
+                self.__tokens = min(self.burst, self.__tokens + (now - self.__refilled) * self.rate)
+                self.__refilled = now
+
+                if self.__tokens >= 1:
+                    self.__tokens -= 1
+                    return
+
+                wait = (1 - self.__tokens) / self.rate
+
+            time.sleep(wait)
+
+    def acquire(self):
+        """
+        wait until a request may be sent
+
+        return: float: time the request is sent at, pass it to `release`
+        """
+
+        with self.__condition:
+            while self.in_flight >= int(self.limit):
+                self.__condition.wait()
+
+            self.in_flight += 1
+            pause = self.__paused_until - time.monotonic()
+
+        if pause > 0:
+            time.sleep(pause)
+
+        if self.rate:
+            self.__take_token()
+
+        return time.monotonic()
+
+    def release(self, started, ok=True):
+        """
+        register the end of a request sent at `started`, `ok` if it succeeded
+        """
+
+        now = time.monotonic()
+
+        with self.__condition:
+            self.in_flight -= 1
+
+            if not ok:
+                if started >= self.__last_decrease:
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease)
+                    self.__last_decrease = now
+
+            elif self.latency_target is None or now - started <= self.latency_target:
+                self.limit = min(self.max_concurrency, self.limit + self.increase / self.limit)
+
+            self.__condition.notify_all()
+
+    def pause(self, seconds):
+        """
+        send no requests for `seconds` (``Retry-After`` of the server)
+        """
+
+        with self.__condition:
+            self.__paused_until = max(self.__paused_until, time.monotonic() + seconds)
+
+
+class _Slot:
+    """
+    one request to a host, see `Throttle.slot`
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.status = None
+        self.retry_after = None
+
+    def __enter__(self):
+        self.started = self.limiter.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ok = exc_type is None and \
+             (self.status is None or (self.status != 429 and self.status < 500))
+
+        if self.retry_after is not None and not ok:
+            try:
+                self.limiter.pause(float(self.retry_after))
+            except ValueError:
+                pass
+
+        self.limiter.release(self.started, ok)
+
+
+class Throttle:
+    """Per-host rate limiter and adaptive concurrency controller
+    for a <Transport>: every host gets its own <HostLimiter>.
+
+    Corpora declare limits of their servers in a module-level
+    ``RATE_LIMITS`` dict (``{host: HostLimiter parameters}``), they are
+    applied when the corpus is created with ``Corpus(throttle=...)``,
+    unless the host was configured already.
+
+    Parameters
+    ----------
+    limits: dict, default None
+        ``{host: dict}`` of `HostLimiter` parameters for particular hosts.
+    **defaults:
+        `HostLimiter` parameters for other hosts.
+
+    Example
+    -------
+    .. code-block:: python
+
+        >>> throttle = lingcorpora.Throttle(max_concurrency=16, limits={'maslinsky.spb.ru': {'rate': 1}})
+        >>> corp = lingcorpora.Corpus('bam', throttle=throttle, max_workers=16)
+    """
+
+    def __init__(self, limits=None, **defaults):
+        self.defaults = defaults
+        self.__limits = dict(limits or {})
+        self.__hosts = {}
+        self.__lock = Lock()
+
+    def __str__(self):
+        return 'Throttle(hosts=%s)' % sorted(self.__hosts)
+
+    __repr__ = __str__
+
+    def configure(self, host, override=True, **params):
+        """
+        set `HostLimiter` parameters of `host`. If not `override`,
+        a host which has parameters already is left as it is
+        """
+
+        with self.__lock:
+            if not override and host in self.__limits:
+                return
+
+            self.__limits[host] = params
+            self.__hosts.pop(host, None)
+
+    def host(self, host):
+        """
+        return: <HostLimiter> of `host`
+        """
+
+        with self.__lock:
+            if host not in self.__hosts:
+                self.__hosts[host] = HostLimiter(**self.__limits.get(host, self.defaults))
+
+            return self.__hosts[host]
+
+    def slot(self, url):
+        """Context manager around one request to `url`: waits for the host
+        limits on enter, registers the result on exit. Set ``status`` and
+        ``retry_after`` of the slot to the response ones.
+
+        .. code-block:: python
+
+            with throttle.slot(url) as slot:
+                response = session.get(url)
+                slot.status = response.status_code
+        """
+
+        return _Slot(self.host(urlsplit(url).hostname))
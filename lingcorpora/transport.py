@@ -0,0 +1,262 @@
+# python3
+# coding=<UTF-8>
+
+import copy
+import time
+import random
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from threading import Lock
+
+from requests import Session, Response
+from requests.exceptions import ConnectionError, Timeout, ChunkedEncodingError
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+# responses worth repeating the request for
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_EXCEPTIONS = (ConnectionError, Timeout, ChunkedEncodingError)
+
+
+def backoff_delay(attempt, backoff, max_backoff, retry_after=None):
+    """
+    return: float: seconds to wait before retry number `attempt` (from 0):
+            uniform from 0 to ``backoff * 2 ** attempt`` ("full jitter"),
+            at least ``Retry-After`` of the server, at most `max_backoff`
+    """
+
+    delay = random.uniform(0, backoff * 2 ** attempt)
+
+    if retry_after is not None:
+        try:
+            delay = max(delay, float(retry_after))
+
+        except ValueError:
+            pass
+
+    return min(delay, max_backoff)
+
+
+class Transport:
+    """HTTP layer shared by all corpora. Keeps a ``requests.Session``
+    with keep-alive connection pools per host, so page requests
+    reuse connections instead of opening a new one each time.
+
+    Parameters
+    ----------
+    pool_connections: int, default 10
+        number of hosts to keep connection pools for.
+    pool_maxsize: int, default 10
+        number of connections kept alive per host.
+    timeout: float or tuple, default (10, 60)
+        connect and read timeouts in seconds.
+    headers: dict, default None
+        headers sent with every request.
+    cache: ResponseCache, default None
+        cache of responses. If given, GET and POST responses with status 200
+        are stored and later served from it.
+    throttle: Throttle, default None
+        per-host rate limits and adaptive concurrency of requests.
+        If None, requests are sent as soon as they are made.
+    retries: int, default 2
+        number of times a request is repeated after a connection error,
+        a timeout or a 429 or 5xx response. The last error is raised
+        (the last response is returned) when they are exhausted.
+    backoff: float, default 0.5
+        seconds: retry number ``i`` (from 0) waits a random time up to
+        ``backoff * 2 ** i``, or the ``Retry-After`` of the response.
+    max_backoff: float, default 30
+        longest wait before a retry in seconds.
+
+    Cookies are not stored in the shared session: requests to one host made
+    for different queries must not share server-side state. A parser that needs
+    a server session passes its own cookie jar as ``cookies``, the jar is then
+    updated with cookies set by the responses (redirects included).
+    Such requests depend on the server session and are never cached.
+    Neither are requests made with ``cache=False``: those which start
+    a server session (a search which returns a session id) must reach
+    the server every time, a replayed id may have expired.
+
+    Example
+    -------
+    .. code-block:: python
+
+        >>> transport = lingcorpora.Transport(pool_maxsize=32, timeout=30)
+        >>> corp = lingcorpora.Corpus('bam', transport=transport, max_workers=32)
+    """
+
+    def __init__(self,
+                 pool_connections=10,
+                 pool_maxsize=10,
+                 timeout=(10, 60),
+                 headers=None,
+                 cache=None,
+                 throttle=None,
+                 retries=2,
+                 backoff=0.5,
+                 max_backoff=30
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.cache = cache
+        self.namespace = None
+        self.throttle = throttle
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.session = Session()
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        if headers is not None:
+            self.session.headers.update(headers)
+
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def __str__(self):
+        return 'Transport(pool_connections=%s, pool_maxsize=%s, timeout=%s)' % \
+                (self.pool_connections, self.pool_maxsize, self.timeout)
+
+    __repr__ = __str__
+
+    def request(self, method, url, **kwargs):
+        """Make a request, arguments as in ``requests.request``
+        and ``cache``: bool, default True: False if the response
+        must not be read from or stored in the cache.
+
+        return: requests.Response
+        """
+
+        cacheable = kwargs.pop('cache', True)
+        cookies = kwargs.get('cookies')
+        key = None
+
+        if (self.cache is not None and cacheable and cookies is None
+                and method.upper() in {'GET', 'POST'}):
+            key = self.cache.key(method, url, kwargs.get('params'), kwargs.get('data'))
+            cached = self.cache.get(key, self.namespace)
+
+            if cached is not None:
+                return make_response(**cached)
+
+        kwargs.setdefault('timeout', self.timeout)
+        attempt = 0
+
+        while True:
+            try:
+                response = self.__send(method, url, **kwargs)
+
+            except RETRY_EXCEPTIONS:
+                if attempt >= self.retries:
+                    raise
+
+                retry_after = None
+
+            else:
+                if attempt >= self.retries or response.status_code not in RETRY_STATUSES:
+                    break
+
+                retry_after = response.headers.get('Retry-After')
+                # a streamed response holds its connection until it is closed
+                response.close()
+
+            time.sleep(backoff_delay(attempt, self.backoff, self.max_backoff, retry_after))
+            attempt += 1
+
+        if isinstance(cookies, CookieJar):
+            for r in response.history + [response]:
+                for cookie in r.cookies:
+                    cookies.set_cookie(cookie)
+
+        if key is not None and response.status_code == 200:
+            self.cache.set(key, response, self.namespace)
+
+        return response
+
+    def __send(self, method, url, **kwargs):
+        """
+        one attempt of a request, within the limits of `throttle`
+        """
+
+        if self.throttle is None:
+            return self.session.request(method, url, **kwargs)
+
+        with self.throttle.slot(url) as slot:
+            response = self.session.request(method, url, **kwargs)
+            slot.status = response.status_code
+            slot.retry_after = response.headers.get('Retry-After')
+
+        return response
+
+    def get(self, url, params=None, **kwargs):
+        return self.request('GET', url, params=params, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def with_cache(self, cache, namespace=None):
+        """
+        return: <Transport> sharing connection pools with this one,
+                which caches responses in `cache` under `namespace` (corpus code)
+        """
+
+        transport = copy.copy(self)
+        transport.cache = cache
+        transport.namespace = namespace
+
+        return transport
+
+    def with_throttle(self, throttle):
+        """
+        return: <Transport> sharing connection pools with this one,
+                whose requests are limited by `throttle`
+        """
+
+        transport = copy.copy(self)
+        transport.throttle = throttle
+
+        return transport
+
+    def close(self):
+        self.session.close()
+
+
+def make_response(url, status_code, content, encoding=None, headers=None):
+    """
+    return: <requests.Response> built from stored data
+    """
+
+    response = Response()
+    response.url = url
+    response.status_code = status_code
+    response.encoding = encoding
+    response.headers = CaseInsensitiveDict(headers or {})
+    response._content = content
+    # the body is read, so ``iter_content`` yields it from memory
+    response._content_consumed = True
+
+    return response
+
+
+_default_transport = None
+_default_lock = Lock()
+
+
+def default_transport():
+    """
+    return: <Transport> shared by all corpora which were not given their own one
+    """
+
+    global _default_transport
+
+    with _default_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+
+        return _default_transport
@@ -21,8 +21,13 @@ setup(
     author_email='katgerasimenko@gmail.com',
     license='MIT',
     packages=['lingcorpora', 'lingcorpora.corpora'],
-    python_requires='>=3.5',
+    python_requires='>=3.6',
     zip_safe=False,
     keywords=['corpora', 'api', 'language'],
-    install_requires=['bs4', 'requests', 'lxml', 'tqdm']
+    install_requires=[
+        'bs4', 'requests', 'lxml', 'tqdm',
+        # entry points of corpus plugins
+        'importlib_metadata; python_version < "3.8"'
+    ],
+    extras_require={'async': ['aiohttp']}
 )
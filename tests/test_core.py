@@ -0,0 +1,1621 @@
+import sys
+import os
+import subprocess
+import time
+import json
+import asyncio
+import types
+import sqlite3
+import tempfile
+import unittest
+import threading
+
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from lxml import etree
+from requests.cookies import RequestsCookieJar
+from requests.exceptions import ConnectionError, HTTPError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+from lingcorpora.corpus import Corpus, functions
+from lingcorpora.params_container import Container
+from lingcorpora.target import Target, kwic_table
+from lingcorpora.pagination import PagedParser, prefetch
+from lingcorpora.exceptions import EmptyPageException, NotRecordedError
+from lingcorpora.transport import Transport, make_response
+from lingcorpora.throttle import Throttle, HostLimiter
+from lingcorpora.cache import ResponseCache
+from lingcorpora.jobs import CrawlJob
+from lingcorpora.multi import MultiCorpus
+from lingcorpora.replay import Archive, RecordTransport, ReplayTransport, AsyncReplayTransport
+from lingcorpora.sinks import CSVSink, JSONLSink
+from lingcorpora.result import Result
+from lingcorpora.columnar import ColumnarResult
+from lingcorpora import aio, patterns, selectors
+from lingcorpora.functions import MODULES
+from lingcorpora.registry import Registry
+from lingcorpora.iterparse import iter_elements
+from lingcorpora.corpora import (
+    bam_corpus, emk_corpus, zho_corpus, hin_corpus, deu_corpus,
+    dan_corpus, kat_corpus, est_corpus, udm_corpus,
+    rus_corpus, rus_parallel_corpus
+)
+
+__doc__ = 'offline unittest routine for the core objects (no network access needed)'
+
+
+class PageParser(Container):
+    """
+    fake parser: yields `n_results` copies of the query,
+    finds nothing for queries starting with '_'
+    """
+
+    calls = 0
+
+    def extract(self):
+        PageParser.calls += 1
+
+        if self.query.startswith('_'):
+            return
+
+        for i in range(self.n_results):
+            time.sleep(0.001)
+            text = '%s %s .' % (i, self.query)
+            yield Target(text, (len(str(i)) + 1, len(text) - 2), 'doc %s' % i, [])
+
+
+fake_corpus = types.ModuleType('fake_corpus')
+fake_corpus.__doc__ = 'Fake corpus'
+fake_corpus.PageParser = PageParser
+
+
+class FakePagedParser(PagedParser):
+    """
+    fake paged parser: pages of 10 targets, `total` hits
+    """
+
+    total = 45
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fetched = []
+
+    def _page_keys(self):
+        page = 0
+        while True:
+            yield page
+            page += 1
+
+    def _page_request(self, page):
+        return 'GET', 'http://localhost/%s' % page, {}
+
+    def _fetch_page(self, page):
+        time.sleep(0.01)
+        self.fetched.append(page)
+        return range(page * 10, min(self.total, page * 10 + 10))
+
+    def _parse_page(self, page, response):
+        if not response:
+            raise EmptyPageException
+
+        for i in response:
+            yield Target(str(i), (0, len(str(i))), '', [])
+
+
+class TestTarget(unittest.TestCase):
+
+    def test_compact(self):
+        first = Target('one two three', (4, 7), ''.join(['doc', ' 1']), [], lang='r' + 'us')
+        second = Target('two', (0, 3), ''.join(['doc', ' 1']), [], lang='r' + 'us')
+
+        self.assertFalse(hasattr(first, '__dict__'))
+        self.assertIsNot(first.meta, second.meta)
+
+        # equal strings of the targets of a result are shared by them
+        result = Result('rus', {'query': 'two'})
+        result.add(first)
+        result.add(second)
+
+        self.assertIs(first.meta, second.meta)
+        self.assertIs(first.lang, second.lang)
+        self.assertEqual(str(first), 'Target(two, doc 1)')
+        self.assertEqual(first.kwic(1, 1), ('one', 'two', 'three'))
+
+    def test_kwic_table(self):
+        text = 'one; two; «three»! four five'
+        targets = [
+            Target(text, (text.index(w), text.index(w) + len(w)), '', [])
+            for w in ('one', 'two', 'three', 'five')
+        ] + [Target('no_spaces', (3, 9), '', [])]
+        spaced = ' one  two,\n«three»!  four '
+        targets += [
+            Target(spaced, (spaced.index(w), spaced.index(w) + len(w)), '', [])
+            for w in ('one', 'two', 'three', 'four')
+        ]
+
+        for level in ('word', 'char'):
+            self.assertEqual(
+                kwic_table(targets, 1, 1, level),
+                [t.kwic(1, 1, level) for t in targets]
+            )
+
+        self.assertEqual(kwic_table(targets, 1, 1)[1], ('one;', 'two', '; «three»!'))
+
+    def test_word_pattern(self):
+        self.assertIs(patterns.word('a.b'), patterns.word('a.b'))
+        self.assertIsNone(patterns.word('a.b').search('axb a.bc'))
+        self.assertEqual(patterns.word('a.b').search('axb a.b c').span(), (4, 7))
+
+    def test_kwic_index(self):
+        target = Target('one  two, «three»!\nfour', (10, 16), '', [])
+        expected = {
+            (0, 0): ('«', 'three', '»!'),
+            (1, 1): ('two,«', 'three', '»! four'),
+            (5, 5): ('one two,«', 'three', '»! four')
+        }
+
+        for (left, right), kwic in sorted(expected.items()) * 2:
+            self.assertEqual(target.kwic(left, right), kwic)
+
+        self.assertEqual(target.kwic(3, 3, 'char'), ('o, ', '«three', '»!\n'))
+
+    def test_kwic_index_mutation(self):
+        target = Target('one two three four', (4, 7), '', [])
+
+        self.assertEqual(target.kwic(1, 1), ('one', 'two', 'three'))
+
+        target.idxs = (8, 13)
+        self.assertEqual(target.kwic(1, 1), ('two', 'three', 'four'))
+
+        target.text = 'a b three c'
+        target.idxs = (4, 9)
+        self.assertEqual(target.kwic(1, 1), ('b', 'three', 'c'))
+
+    def test_kwic_index_shared(self):
+        result = Result('rus', {'query': 'two'})
+        text = 'one two three two four'
+
+        for l in (4, 14):
+            result.add(Target(text, (l, l + 3), '', []))
+
+        first, second = result
+        self.assertEqual(second.kwic(1, 1), ('three', 'two', 'four'))
+
+        # the text is indexed once for the hits in it
+        with mock.patch('lingcorpora.target._text_index', side_effect=AssertionError):
+            self.assertEqual(first.kwic(1, 1), ('one', 'two', 'three'))
+
+        second.text = 'a two b'
+        second.idxs = (2, 5)
+        self.assertEqual(second.kwic(1, 1), ('a', 'two', 'b'))
+        self.assertEqual(first.kwic(1, 1), ('one', 'two', 'three'))
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class FixtureResponse:
+    """
+    saved result page in place of `requests.Response`
+    """
+
+    status_code = 200
+
+    def __init__(self, filename):
+        with open(os.path.join(FIXTURES, filename), 'rb') as f:
+            self.content = f.read()
+
+        self.text = self.content.decode('utf-8')
+        self.read = 0
+        self.closed = False
+
+    def iter_content(self, chunk_size=1):
+        # the page as a streamed body: `read` bytes are downloaded so far
+        for start in range(0, len(self.content), chunk_size):
+            self.read = min(start + chunk_size, len(self.content))
+            yield self.content[start:self.read]
+
+    def close(self):
+        self.closed = True
+
+
+class TestParserBackends(unittest.TestCase):
+
+    # the pages are hand-written in the markup of the corpora, not captured
+    # from the servers; `est_whitespace.html` adds what real pages have:
+    # line breaks and runs of spaces, entities, inline tags next to a hit,
+    # a hit at the end of its line, text after the last result
+    # fixture, corpus module, search parameters, page key
+    pages = [
+        ('bam_kwic.html', bam_corpus, {'get_analysis': True}, 1),
+        ('bam_sen.html', bam_corpus, {'kwic': False, 'get_analysis': True}, 1),
+        ('emk_kwic.html', emk_corpus, {}, 1),
+        ('zho.html', zho_corpus, {}, 0),
+        ('hin.html', hin_corpus, {}, 0),
+        ('deu.html', deu_corpus, {}, 0),
+        ('dan.html', dan_corpus, {}, 1),
+        ('kat.html', kat_corpus, {}, 0),
+        ('est.html', est_corpus, {}, 0),
+        ('est_whitespace.html', est_corpus, {}, 0),
+        ('arkhangelskiy.html', udm_corpus, {'get_analysis': True}, 1),
+    ]
+
+    def parse(self, filename, module, params, key, backend):
+        parser = module.PageParser('q', n_results=1000, parser_backend=backend, **params)
+        targets = [
+            (t.text, t.idxs, t.meta, t.analysis)
+            for t in parser._parse_page(key, FixtureResponse(filename))
+        ]
+
+        return targets, parser.n_results
+
+    def test_parity(self):
+        for filename, module, params, key in self.pages:
+            with self.subTest(fixture=filename):
+                soup = self.parse(filename, module, params, key, 'bs4')
+                tree = self.parse(filename, module, params, key, 'lxml')
+
+                self.assertTrue(soup[0])
+                self.assertEqual(soup, tree)
+
+    def test_zho_without_total(self):
+        response = FixtureResponse('zho.html')
+        response.text = response.text.replace('class="totalright"', 'class="other"')
+        parser = zho_corpus.PageParser('q', n_results=100)
+
+        # the rows are parsed, the number of hits is unknown: not clamped to 0
+        self.assertEqual(len(list(parser._parse_page(0, response))), 50)
+        self.assertEqual(parser.n_results, 100)
+        self.assertIsNone(parser._parse_count(0, response))
+
+    def test_est_whitespace(self):
+        for backend in ('bs4', 'lxml'):
+            targets, _ = self.parse('est_whitespace.html', est_corpus, {}, 0, backend)
+            texts = [text for text, _, _, _ in targets]
+
+            self.assertEqual(len(targets), 7)
+            self.assertEqual(
+                set(text[l:r] for text, (l, r), _, _ in targets), {'keel'}
+            )
+            self.assertEqual(texts[0], 'Käesoleva  takistuseks keel jälgivad   päev.')
+            self.assertEqual(texts[2], 'ehk\xa0Soome\tEestis keel pole kes,\n  iga keel päev.')
+            self.assertEqual(texts[4], 'suuremaks Käesoleva keel puhul takistuseks.')
+            # the hit ends its line, after a tag
+            self.assertEqual(texts[6], 'pealkiri Soome keel ')
+
+    def test_count(self):
+        for filename, module, params, key in self.pages:
+            if module is hin_corpus or module is deu_corpus or module is est_corpus:
+                continue
+
+            with self.subTest(fixture=filename):
+                parser = module.PageParser('q', n_results=10 ** 9, **params)
+                list(parser._parse_page(key, FixtureResponse(filename)))
+                total = 1234 if module is udm_corpus else parser.n_results
+
+                for backend in ('bs4', 'lxml'):
+                    parser = module.PageParser('q', parser_backend=backend, **params)
+                    self.assertEqual(parser._parse_count(key, FixtureResponse(filename)), total)
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            bam_corpus.PageParser('q', parser_backend='html5lib')
+
+    def test_string(self):
+        html = '<p><b>one</b></p><p><b>one</b> two</p><p></p><p><!--note--></p>'
+
+        for backend in selectors.BACKENDS.values():
+            paragraphs = backend.select(backend.document(html), selectors.Selector('p', '//p'))
+            self.assertEqual(
+                [backend.string(p) for p in paragraphs],
+                ['one', None, None, 'note']
+            )
+
+
+class TestIterparse(unittest.TestCase):
+
+    path = '/page/searchresult/body/result/document'
+
+    def test_iter_elements(self):
+        content = FixtureResponse('rus.xml').content
+        titles = [
+            doc.attrib['title']
+            for doc in etree.fromstring(content).xpath(self.path)
+        ]
+        seen = []
+
+        for doc in iter_elements(content, self.path, chunk_size=1000):
+            seen.append(doc.attrib['title'])
+            # documents processed before are dropped from the tree
+            self.assertIsNone(doc.getprevious())
+
+        self.assertEqual(seen, titles)
+        self.assertEqual(list(iter_elements(b'<page><document/></page>', self.path)), [])
+
+    def test_rus(self):
+        parser = rus_corpus.PageParser('q', get_analysis=True)
+        targets = list(parser._parse_page(0, FixtureResponse('rus.xml')))
+
+        self.assertEqual(len(targets), 146)
+        self.assertEqual(targets[0].text[slice(*targets[0].idxs)], 'одеяло')
+        self.assertEqual(targets[0].analysis[0]['lex'], ['одеяло'])
+
+        with self.assertRaises(EmptyPageException):
+            next(parser._parse_page(1, make_response('', 200, b'<page/>')))
+
+    def test_rus_streamed(self):
+        parser = rus_corpus.PageParser('q')
+        response = FixtureResponse('rus.xml')
+        targets = parser._parse_page(0, response)
+
+        next(targets)
+        # the first result is parsed before the page is downloaded
+        self.assertLess(response.read, len(response.content))
+
+        targets.close()
+        self.assertTrue(response.closed)
+        self.assertEqual(parser._page_request(0)[2], {'stream': True})
+        self.assertEqual(
+            rus_corpus.PageParser('q', prefetch=2)._page_request(0)[2],
+            {'stream': False}
+        )
+
+    def test_rus_parallel(self):
+        parser = rus_parallel_corpus.PageParser('q', query_language='rus')
+        targets = list(parser._parse_page(0, FixtureResponse('rus_parallel.xml')))
+
+        self.assertEqual(len(targets), 119)
+        self.assertEqual(targets[0].lang, 'en')
+        self.assertTrue(targets[0].transl)
+
+
+class TestPagination(unittest.TestCase):
+
+    def test_prefetch_order(self):
+        pages = list(prefetch(lambda k: k * 2, range(20), depth=4))
+
+        self.assertEqual(pages, [(k, k * 2) for k in range(20)])
+
+    def test_prefetch_errors_propagate(self):
+        def fetch(k):
+            if k == 3:
+                raise ValueError(k)
+            return k
+
+        with self.assertRaises(ValueError):
+            list(prefetch(fetch, range(10), depth=2))
+
+    def test_extract(self):
+        for depth in (0, 3):
+            parser = FakePagedParser('q', n_results=25, prefetch=depth)
+            self.assertEqual([t.text for t in parser.extract()], [str(i) for i in range(25)])
+
+            parser = FakePagedParser('q', n_results=100, prefetch=depth)
+            self.assertEqual(len(list(parser.extract())), 45)
+
+    def test_extract_bounded_lookahead(self):
+        parser = FakePagedParser('q', n_results=5, prefetch=2)
+        list(parser.extract())
+
+        self.assertLessEqual(len(parser.fetched), 3)
+
+    def test_prefetch_depth_function(self):
+        depths = iter([0, 0, 3])
+        fetched = []
+
+        def fetch(k):
+            fetched.append(k)
+            return k
+
+        pages = prefetch(fetch, range(10), depth=lambda: next(depths, 3))
+
+        # no pages ahead until the depth grows
+        self.assertEqual([next(pages), next(pages), next(pages)], [(0, 0), (1, 1), (2, 2)])
+        self.assertEqual(fetched, [0, 1, 2])
+        self.assertEqual(next(pages), (3, 3))
+
+        time.sleep(0.05)
+        self.assertEqual(sorted(fetched), list(range(6)))
+        self.assertEqual([k for k, _ in pages], list(range(4, 10)))
+
+    def test_arkhangelskiy_pages_at_once(self):
+        lock = threading.Lock()
+        log = []
+
+        class Parser(udm_corpus.PageParser):
+            in_flight = 0
+
+            def _fetch_page(self, page):
+                with lock:
+                    Parser.in_flight += 1
+                    log.append((page, Parser.in_flight))
+
+                time.sleep(0.02)
+
+                with lock:
+                    Parser.in_flight -= 1
+
+                return FixtureResponse('arkhangelskiy.html')
+
+        # 1 234 hits, 100 per page, 50 on the saved one
+        for prefetch in (0, 4):
+            del log[:]
+            targets = list(Parser('q', n_results=500, prefetch=prefetch).extract())
+
+            self.assertEqual(len(targets), 250)
+            self.assertEqual(sorted(page for page, _ in log), list(range(6)))
+            # the sid request and the first page alone, the next pages at once
+            self.assertEqual(log[:2], [(0, 1), (1, 1)])
+            self.assertGreater(max(n for _, n in log), 1)
+
+    def test_arkhangelskiy_not_a_result_page(self):
+        fetched = []
+
+        class Parser(udm_corpus.PageParser):
+            def _fetch_page(self, page):
+                fetched.append(page)
+                return FixtureResponse('est.html')
+
+        # no number of hits, no #contexts_div: nothing after the first page
+        self.assertEqual(list(Parser('q', n_results=500, prefetch=4).extract()), [])
+        self.assertEqual(fetched, [0, 1])
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """
+    `http.server.ThreadingHTTPServer` of Python 3.7+
+    """
+
+    daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    """
+    local server: sets cookie `sid`, echoes path and received cookies;
+    answers 503 to the next `failures[path]` requests of a path
+    """
+
+    protocol_version = 'HTTP/1.1'
+    failures = {}
+
+    def do_GET(self):
+        if self.failures.get(self.path):
+            self.failures[self.path] -= 1
+            self.send_response(503)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = ('%s|%s' % (self.path, self.headers.get('Cookie', ''))).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'sid=%s; Path=/' % self.client_address[1])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LocalServerTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        cls.url = 'http://127.0.0.1:%s' % cls.server.server_port
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+
+class TestTransport(LocalServerTestCase):
+
+    def test_keep_alive(self):
+        transport = Transport()
+        ports = {transport.get(self.url + '/%s' % i).cookies['sid'] for i in range(5)}
+
+        self.assertEqual(len(ports), 1)
+
+    def test_cookies_not_shared(self):
+        transport = Transport()
+        jar = RequestsCookieJar()
+
+        self.assertEqual(transport.get(self.url + '/a', cookies=jar).text, '/a|')
+        self.assertIn('sid', jar)
+        self.assertEqual(len(transport.session.cookies), 0)
+        self.assertEqual(transport.get(self.url + '/b').text, '/b|')
+        self.assertEqual(transport.get(self.url + '/c', cookies=jar).text, '/c|sid=%s' % jar['sid'])
+
+
+    def test_retries(self):
+        transport = Transport(retries=2, backoff=0.01)
+        Handler.failures['/retry'] = 2
+
+        self.assertEqual(transport.get(self.url + '/retry').status_code, 200)
+
+        Handler.failures['/retry'] = 3
+
+        self.assertEqual(transport.get(self.url + '/retry').status_code, 503)
+        self.assertEqual(Transport(retries=0).get(self.url + '/retry').status_code, 200)
+
+        with self.assertRaises(ConnectionError):
+            Transport(retries=1, backoff=0.01).get('http://127.0.0.1:1/')
+
+
+class LocalPagedParser(PagedParser):
+    """
+    paged parser over the local server: 3 pages, one target per page
+    """
+
+    def _page_keys(self):
+        return iter(range(3))
+
+    def _page_request(self, page):
+        return 'GET', self.url, {'params': {'q': self.query, 'page': page}}
+
+    def _parse_page(self, page, response):
+        yield Target(response.text, (0, 1), str(page), [])
+
+
+@unittest.skipIf(aio.aiohttp is None, 'aiohttp is not installed')
+class TestAsync(LocalServerTestCase):
+
+    def run_async(self, coro):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coro)
+        finally:
+            loop.close()
+
+    def test_transport_cookies(self):
+        async def go():
+            transport = aio.AsyncTransport()
+            jar = RequestsCookieJar()
+            try:
+                first = await transport.get(self.url + '/a', cookies=jar)
+                second = await transport.get(self.url + '/b', params={'q': 'ы'}, cookies=jar)
+                third = await transport.get(self.url + '/c')
+            finally:
+                await transport.close()
+            return jar, first, second, third
+
+        jar, first, second, third = self.run_async(go())
+
+        self.assertEqual(first.text, '/a|')
+        self.assertEqual(second.text, '/b?q=%%D1%%8B|sid=%s' % jar['sid'])
+        self.assertEqual(third.text, '/c|')
+
+    def test_transport_retries(self):
+        async def go():
+            transport = aio.AsyncTransport(retries=2, backoff=0.01)
+            try:
+                Handler.failures['/retry'] = 2
+                first = await transport.get(self.url + '/retry', timeout=(5, 5), cache=False)
+                Handler.failures['/retry'] = 3
+                second = await transport.get(self.url + '/retry', timeout=5)
+
+                with self.assertRaises(TypeError):
+                    await transport.get(self.url + '/retry', verify=False)
+
+            finally:
+                Handler.failures.pop('/retry', None)
+                await transport.close()
+            return first, second
+
+        first, second = self.run_async(go())
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 503)
+
+    def test_error_page(self):
+        parser = LocalPagedParser('a', n_results=3)
+        parser.url = self.url + '/p'
+
+        async def go():
+            transport = aio.AsyncTransport(retries=0)
+            try:
+                return [t.text async for t in aio.extract(parser, transport)]
+            finally:
+                await transport.close()
+
+        Handler.failures['/p?q=a&page=0'] = 1
+
+        try:
+            with self.assertRaises(HTTPError):
+                self.run_async(go())
+        finally:
+            Handler.failures.pop('/p?q=a&page=0', None)
+
+    def test_search(self):
+        fake_async = types.ModuleType('fake_async')
+        fake_async.PageParser = type('PageParser', (LocalPagedParser,), {'url': self.url + '/p'})
+        functions['fake_async'] = fake_async
+
+        async def go():
+            async with aio.AsyncCorpus('fake_async', max_concurrency=2) as corp:
+                return await corp.search(['a', 'b', 'c'], n_results=2, prefetch=2)
+
+        try:
+            results = self.run_async(go())
+        finally:
+            functions.pop('fake_async', None)
+
+        self.assertEqual([r.query for r in results], ['a', 'b', 'c'])
+        self.assertEqual(
+            [t.text for t in results[1]],
+            ['/p?q=b&page=0|', '/p?q=b&page=1|']
+        )
+
+    def test_search_interrupted(self):
+        fake_async = types.ModuleType('fake_async')
+        fake_async.PageParser = type('PageParser', (LocalPagedParser,), {'url': self.url + '/p'})
+        functions['fake_async'] = fake_async
+        Handler.failures['/p?q=b&page=1'] = 1
+
+        async def go():
+            transport = aio.AsyncTransport(retries=0)
+            async with aio.AsyncCorpus('fake_async', transport=transport) as corp:
+                results = await corp.search(['a', 'b', 'c'], n_results=3)
+                return corp, results
+
+        try:
+            with self.assertWarns(UserWarning):
+                corp, results = self.run_async(go())
+        finally:
+            functions.pop('fake_async', None)
+            Handler.failures.pop('/p?q=b&page=1', None)
+
+        self.assertEqual([r.query for r in results], ['a', 'c'])
+        self.assertEqual([(r.query, r.n) for r in corp.failed], [('b', 1)])
+
+    def test_retry_nothing_found(self):
+        def parse_page(parser, page, response):
+            raise EmptyPageException
+
+        fake_async = types.ModuleType('fake_async')
+        fake_async.PageParser = type(
+            'PageParser', (LocalPagedParser,), {'url': self.url + '/p', '_parse_page': parse_page}
+        )
+        functions['fake_async'] = fake_async
+
+        async def go():
+            async with aio.AsyncCorpus('fake_async') as corp:
+                await corp.search(['a', 'b'])
+                retrieved = await asyncio.wait_for(corp.retry_failed(), 5)
+                return corp, retrieved
+
+        try:
+            with self.assertWarns(UserWarning):
+                corp, retrieved = self.run_async(go())
+        finally:
+            functions.pop('fake_async', None)
+
+        self.assertEqual(retrieved, [])
+        self.assertEqual([r.query for r in corp.failed], ['a', 'b'])
+
+
+class TestResponseCache(LocalServerTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_key_ignores_params_order(self):
+        self.assertEqual(
+            ResponseCache.key('get', 'http://a/b', {'x': 1, 'y': 'ы'}),
+            ResponseCache.key('GET', 'http://a/b', {'y': 'ы', 'x': 1})
+        )
+        self.assertNotEqual(
+            ResponseCache.key('GET', 'http://a/b', {'x': 1}),
+            ResponseCache.key('GET', 'http://a/b', {'x': 2})
+        )
+
+    def test_cached_response(self):
+        cache = ResponseCache(self.path)
+        transport = Transport().with_cache(cache, namespace='fake')
+
+        first = transport.get(self.url + '/page', params={'q': 'ы'})
+        second = transport.get(self.url + '/page', params={'q': 'ы'})
+
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(first.text, second.text)
+        self.assertEqual(second.url, first.url)
+
+        jar = RequestsCookieJar()
+        transport.get(self.url + '/page', params={'q': 'ы'}, cookies=jar)
+        self.assertEqual(cache.hits, 1)
+
+    def test_uncacheable_session_request(self):
+        cache = ResponseCache(self.path)
+        transport = Transport().with_cache(cache, namespace='udm')
+        parser = udm_corpus.PageParser('q', n_results=10, transport=transport)
+
+        with open(os.path.join(FIXTURES, 'arkhangelskiy.html'), 'rb') as f:
+            page = f.read()
+
+        sent = []
+
+        def request(method, url, **kwargs):
+            sent.append(kwargs['params'].get('page', 0))
+            return make_response(url, 200, page, 'utf-8')
+
+        with mock.patch.object(transport.session, 'request', side_effect=request):
+            for key in (0, 1, 0, 1):
+                parser._fetch_page(key)
+
+        # the sid request (key 0) always reaches the server, pages are cached
+        self.assertEqual(sent, [0, 1, 0])
+        self.assertEqual(cache.hits, 1)
+
+        method, url, kwargs = parser._page_request(0)
+        self.assertIsNone(cache.get(cache.key(method, url, kwargs['params']), 'udm'))
+
+    def test_ttl(self):
+        cache = ResponseCache(self.path, ttls={'fake': 0})
+        transport = Transport().with_cache(cache, namespace='fake')
+
+        transport.get(self.url + '/page')
+        time.sleep(0.01)
+        transport.get(self.url + '/page')
+
+        self.assertEqual(cache.hits, 0)
+
+    def test_eviction(self):
+        cache = ResponseCache(self.path)
+        transport = Transport().with_cache(cache)
+
+        for i in range(10):
+            transport.get(self.url + '/%s' % i)
+
+        cache.max_bytes = cache.size // 2
+        transport.get(self.url + '/0')
+        transport.get(self.url + '/last')
+
+        self.assertLessEqual(cache.size, cache.max_bytes)
+        self.assertIsNotNone(cache.get(ResponseCache.key('GET', self.url + '/0')))
+        self.assertIsNone(cache.get(ResponseCache.key('GET', self.url + '/1')))
+
+
+class TestReplay(LocalServerTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'archive.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def record(self):
+        transport = RecordTransport(self.path)
+        jar = RequestsCookieJar()
+        responses = [
+            transport.get(self.url + '/a', params={'q': 'ы'}, cookies=jar),
+            # same url, other server session
+            transport.get(self.url + '/a', params={'q': 'ы'}, cookies=jar)
+        ]
+        transport.archive.close()
+        transport.close()
+
+        return [r.text for r in responses]
+
+    def test_replay(self):
+        recorded = self.record()
+        transport = ReplayTransport(self.path)
+        jar = RequestsCookieJar()
+        replayed = [
+            transport.get(self.url + '/a', params={'q': 'ы'}, cookies=jar).text
+            for _ in range(2)
+        ]
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(len(transport.archive), 2)
+
+        with self.assertRaises(NotRecordedError):
+            transport.get(self.url + '/b')
+
+        self.assertEqual(ReplayTransport(self.path, strict=False).get(self.url + '/b').status_code, 404)
+
+    def test_corpus(self):
+        fake_replay = types.ModuleType('fake_replay')
+        fake_replay.PageParser = type('PageParser', (LocalPagedParser,), {'url': self.url + '/p'})
+        functions['fake_replay'] = fake_replay
+        queries = ['a', 'b', 'c']
+        latency = 0.05
+
+        try:
+            online = Corpus('fake_replay', verbose=False, transport=RecordTransport(self.path))
+            recorded = [[t.text for t in r] for r in online.search(queries)]
+
+            transport = ReplayTransport(self.path, latency=latency)
+            offline = Corpus('fake_replay', verbose=False, transport=transport, max_workers=3)
+
+            start = time.perf_counter()
+            replayed = [[t.text for t in r] for r in offline.search(queries, prefetch=2)]
+            elapsed = time.perf_counter() - start
+
+        finally:
+            functions.pop('fake_replay', None)
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(transport.requests, 9)
+        # 3 queries at once, 3 pages of each at once
+        self.assertLess(elapsed, 9 * latency)
+
+    def test_async(self):
+        self.record()
+        transport = AsyncReplayTransport(self.path, latency=0.01)
+        jar = RequestsCookieJar()
+        loop = asyncio.new_event_loop()
+
+        try:
+            first = loop.run_until_complete(transport.get(self.url + '/a', params={'q': 'ы'}, cookies=jar))
+            second = loop.run_until_complete(transport.get(self.url + '/a', params={'q': 'ы'}, cookies=jar))
+
+            with self.assertRaises(NotRecordedError):
+                loop.run_until_complete(transport.get(self.url + '/c'))
+
+        finally:
+            loop.close()
+
+        self.assertEqual(second.text, '/a?q=%%D1%%8B|sid=%s' % jar['sid'])
+        self.assertNotEqual(first.text, second.text)
+
+
+class TestThrottle(LocalServerTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'archive.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_aimd(self):
+        limiter = HostLimiter(max_concurrency=4, latency_target=None)
+
+        for _ in range(20):
+            limiter.release(limiter.acquire())
+
+        self.assertEqual(limiter.limit, 4)
+
+        # requests sent before a decrease do not decrease the limit again
+        started = [limiter.acquire() for _ in range(4)]
+
+        for s in started:
+            limiter.release(s, ok=False)
+
+        self.assertEqual(limiter.limit, 2)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_slot_status(self):
+        throttle = Throttle(initial_concurrency=4)
+
+        with throttle.slot(self.url + '/a') as slot:
+            slot.status = 503
+
+        with throttle.slot(self.url + '/b') as slot:
+            slot.status = 429
+            slot.retry_after = '0.2'
+
+        self.assertEqual(throttle.host('127.0.0.1').limit, 1)
+
+        start = time.perf_counter()
+
+        with throttle.slot(self.url + '/c'):
+            self.assertGreater(time.perf_counter() - start, 0.1)
+
+    def test_rate(self):
+        throttle = Throttle(rate=20, max_concurrency=8, initial_concurrency=8)
+        transport = Transport(throttle=throttle)
+        start = time.perf_counter()
+
+        for i in range(5):
+            transport.get(self.url + '/%s' % i)
+
+        # one token at once, the next ones 1/20 s apart
+        self.assertGreater(time.perf_counter() - start, 0.19)
+        self.assertIsNone(transport.with_cache(None).with_throttle(None).throttle)
+
+    def test_corpus(self):
+        fake_throttle = types.ModuleType('fake_throttle')
+        fake_throttle.PageParser = type('PageParser', (LocalPagedParser,), {'url': self.url + '/p'})
+        fake_throttle.RATE_LIMITS = {'127.0.0.1': {'max_concurrency': 1}}
+        functions['fake_throttle'] = fake_throttle
+        queries = ['a', 'b', 'c']
+        latency = 0.05
+
+        try:
+            Corpus('fake_throttle', verbose=False, transport=RecordTransport(self.path)).search(queries)
+            transport = ReplayTransport(self.path, latency=latency)
+
+            throttle = Throttle(limits={'127.0.0.1': {'max_concurrency': 3, 'initial_concurrency': 3}})
+            corp = Corpus('fake_throttle', verbose=False, transport=transport, max_workers=3, throttle=throttle)
+            start = time.perf_counter()
+            corp.search(queries, prefetch=2)
+            configured = time.perf_counter() - start
+
+            corp = Corpus('fake_throttle', verbose=False, transport=transport, max_workers=3, throttle=True)
+            start = time.perf_counter()
+            corp.search(queries, prefetch=2)
+            limited = time.perf_counter() - start
+
+        finally:
+            functions.pop('fake_throttle', None)
+
+        # the limits of the module do not override ones of the throttle
+        self.assertLess(configured, 9 * latency)
+        # one request at once
+        self.assertGreaterEqual(limited, 9 * latency)
+
+
+class FlakyPagedParser(FakePagedParser):
+    """
+    fake paged parser: the first download of page 2 fails
+    """
+
+    failed = False
+
+    def _fetch_page(self, page):
+        if page == 2 and not FlakyPagedParser.failed:
+            FlakyPagedParser.failed = True
+            raise ConnectionError('page 2')
+
+        return super()._fetch_page(page)
+
+
+class LoggedPagedParser(FlakyPagedParser):
+    """
+    flaky paged parser logging (query, page) of every download
+    """
+
+    log = []
+
+    def _fetch_page(self, page):
+        response = super()._fetch_page(page)
+        LoggedPagedParser.log.append((self.query, page))
+        return response
+
+
+class TestCrawlJob(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'job.sqlite')
+        fake_job = types.ModuleType('fake_job')
+        fake_job.PageParser = LoggedPagedParser
+        functions['fake_job'] = fake_job
+        functions['fake'] = fake_corpus
+        FlakyPagedParser.failed = False
+        LoggedPagedParser.log = []
+
+    def tearDown(self):
+        functions.pop('fake_job', None)
+        functions.pop('fake', None)
+        self.tmp.cleanup()
+
+    def test_resume(self):
+        job = CrawlJob(self.path, Corpus('fake_job', verbose=False), n_results=40, prefetch=2)
+
+        self.assertEqual(job.add(['a', 'b']), 2)
+        self.assertEqual(job.add(['b', 'c']), 1)
+        self.assertEqual(job.run(), {'pending': 0, 'done': 2, 'empty': 0, 'failed': 1})
+        self.assertEqual(job.result('a').n, 20)
+        job.close()
+
+        # a new process: pages stored before the failure are not requested
+        time.sleep(0.1)  # prefetching threads of the first run are done
+        LoggedPagedParser.log = []
+        job = CrawlJob(self.path, Corpus('fake_job', verbose=False, max_workers=2))
+
+        self.assertEqual(job.run(), {'pending': 0, 'done': 3, 'empty': 0, 'failed': 0})
+        # (page 4 is prefetched)
+        self.assertEqual(sorted(LoggedPagedParser.log)[:2], [('a', 2), ('a', 3)])
+        self.assertEqual({q for q, _ in LoggedPagedParser.log}, {'a'})
+        self.assertEqual(
+            [[t.text for t in r] for r in job.results()],
+            [[str(i) for i in range(40)]] * 3
+        )
+        n_fetched = len(LoggedPagedParser.log)
+
+        self.assertEqual(job.run(), {'pending': 0, 'done': 3, 'empty': 0, 'failed': 0})
+        self.assertEqual(len(LoggedPagedParser.log), n_fetched)
+
+        with self.assertRaises(ValueError):
+            CrawlJob(self.path, Corpus('fake', verbose=False))
+
+    def test_parse_error(self):
+        class BrokenPagedParser(FakePagedParser):
+            def _parse_page(self, page, response):
+                if self.query == 'b' and page == 1:
+                    raise ValueError('no results table')
+
+                return super()._parse_page(page, response)
+
+        functions['fake_job'].PageParser = BrokenPagedParser
+        job = CrawlJob(self.path, Corpus('fake_job', verbose=False), n_results=30)
+        job.add(['a', 'b', 'c'])
+
+        self.assertEqual(job.run(), {'pending': 0, 'done': 2, 'empty': 0, 'failed': 1})
+        self.assertEqual([r.n for r in job.results()], [30, 30])
+        # the page stored before the error is kept
+        self.assertEqual(job.result('b').n, 10)
+        job.close()
+
+        with sqlite3.connect(self.path) as db:
+            self.assertEqual(
+                db.execute('SELECT query, error FROM queries WHERE status = ?', ('failed',)).fetchall(),
+                [('b', 'ValueError: no results table')]
+            )
+
+    def test_not_paged(self):
+        job = CrawlJob(self.path, Corpus('fake', verbose=False, storage='columnar'), n_results=3)
+        job.add(['a', '_b'])
+
+        self.assertEqual(job.run(), {'pending': 0, 'done': 1, 'empty': 1, 'failed': 0})
+        self.assertEqual(job.result('a').columns()['text'], ['0 a .', '1 a .', '2 a .'])
+        self.assertEqual(job.result('a')[0].idxs, (2, 3))
+        self.assertIsNone(job.result('c'))
+
+    def test_export(self):
+        job = CrawlJob(self.path, Corpus('fake', verbose=False), n_results=3)
+        job.add('a')
+        job.run()
+        filename = os.path.join(self.tmp.name, 'a.csv')
+        job.results()[0].export_csv(filename)
+
+        with open(filename, encoding='utf-8-sig') as f:
+            self.assertEqual(f.read().splitlines()[:2], ['index;left;center;right', '1;0;a;.'])
+
+
+class TestFunctions(unittest.TestCase):
+
+    def test_lazy_import(self):
+        code = (
+            'import sys, lingcorpora\n'
+            'from lingcorpora.functions import functions\n'
+            'print(sorted(functions.loaded()), "bs4" in sys.modules)\n'
+            'lingcorpora.Corpus("bam")\n'
+            'print(sorted(functions.loaded()), "bs4" in sys.modules)\n'
+        )
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+        output = subprocess.check_output(
+            [sys.executable, '-c', code], env=dict(os.environ, PYTHONPATH=root)
+        ).decode('utf-8')
+
+        self.assertEqual(output.split('\n')[:2], ["[] False", "['bam'] True"])
+
+    def test_mapping(self):
+        self.assertIn('rus', functions)
+        self.assertEqual(len(functions), len(set(functions)))
+        self.assertEqual(functions['zho_eng'].__name__, 'lingcorpora.corpora.zho_eng_corpus')
+
+        functions['fake'] = fake_corpus
+
+        try:
+            self.assertIs(functions['fake'], fake_corpus)
+
+        finally:
+            functions.pop('fake')
+
+        self.assertNotIn('fake', functions)
+        self.assertIsNone(functions.pop('fake', None))
+
+        with self.assertRaises(KeyError):
+            functions['fake']
+
+
+PLUGIN = """
+from lingcorpora.pagination import PagedParser
+from lingcorpora.target import Target
+
+RATE_LIMITS = {'plugin.example': {'rate': 1}}
+META = {'host': 'plugin.example', 'page_size': 1, 'params': ['n_results']}
+
+
+class PageParser(PagedParser):
+    def _page_keys(self):
+        yield 0
+
+    def _fetch_page(self, key):
+        return self.query
+
+    def _parse_page(self, key, response):
+        yield Target(response, (0, len(response)), '', [])
+"""
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_meta(self):
+        registry = Registry(MODULES, 'lingcorpora.corpora')
+
+        for code in MODULES:
+            meta = registry.meta(code)
+            self.assertEqual(
+                sorted(meta), ['count', 'host', 'page_size', 'params', 'rate_limits'], code
+            )
+            self.assertIn('n_results', meta['params'], code)
+
+        self.assertEqual(registry.meta('ady')['rate_limits']['web-corpora.net']['max_concurrency'], 6)
+        self.assertEqual(registry.loaded(), [])
+
+        # 'count' is true for the corpora whose parser reads the number of hits
+        for code in MODULES:
+            parser = registry[code].PageParser
+            counts = issubclass(parser, PagedParser) and \
+                parser._parse_count is not PagedParser._parse_count
+            self.assertIs(registry.meta(code)['count'], counts, code)
+
+    def test_plugin_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'xyz_corpus.py'), 'w', encoding='utf-8') as f:
+                f.write(PLUGIN)
+
+            registry = Registry(MODULES, 'lingcorpora.corpora', directories=[directory])
+
+            self.assertIn('xyz', registry)
+            self.assertIn('rus', registry)
+            self.assertEqual(
+                registry.meta('xyz'),
+                {'host': 'plugin.example', 'page_size': 1, 'params': ['n_results'],
+                 'rate_limits': {'plugin.example': {'rate': 1}}}
+            )
+            self.assertNotIn('lingcorpora_plugin_xyz', sys.modules)
+
+            functions['xyz'] = registry['xyz']
+
+            try:
+                corp = Corpus('xyz', verbose=False, throttle=True)
+                self.assertEqual(corp.search('a')[0][0].text, 'a')
+                self.assertEqual(corp.throttle.host('plugin.example').rate, 1)
+
+            finally:
+                functions.pop('xyz', None)
+                sys.modules.pop('lingcorpora_plugin_xyz', None)
+
+    def test_entry_points_on_miss(self):
+        scans = []
+
+        def entry_points(group):
+            scans.append(group)
+            return [('xyz', 'lingcorpora.corpora.bam_corpus'), ('rus', 'lingcorpora.corpora.bam_corpus')]
+
+        with mock.patch('lingcorpora.registry._entry_points', entry_points):
+            registry = Registry(MODULES, 'lingcorpora.corpora', group='lingcorpora.corpora', directories=[])
+
+            # built-in corpora are looked up without scanning installed packages
+            self.assertIn('rus', registry)
+            self.assertEqual(registry.path('rus'), rus_corpus.__file__)
+            self.assertEqual(scans, [])
+
+            self.assertIs(registry['xyz'], bam_corpus)
+            self.assertNotIn('nope', registry)
+            self.assertEqual(len(scans), 1)
+
+            # once scanned, an entry point replaces a built-in corpus
+            self.assertEqual(registry.sources()['rus'], 'lingcorpora.corpora.bam_corpus')
+            self.assertIs(registry['rus'], bam_corpus)
+            self.assertEqual(len(scans), 1)
+
+    def test_plugin_overrides_builtin(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'rus_corpus.py'), 'w', encoding='utf-8') as f:
+                f.write(PLUGIN)
+
+            try:
+                # the first lookup finds the plugin, iteration is not needed
+                registry = Registry(MODULES, 'lingcorpora.corpora', directories=[directory])
+                plugin = registry['rus']
+
+                self.assertEqual(plugin.__name__, 'lingcorpora_plugin_rus')
+                self.assertEqual(registry.meta('rus')['host'], 'plugin.example')
+
+                # modules imported are kept by a new discovery
+                other = os.path.join(directory, 'other')
+                os.mkdir(other)
+
+                for code in ('rus', 'bam'):
+                    with open(os.path.join(other, '%s_corpus.py' % code), 'w', encoding='utf-8') as f:
+                        f.write(PLUGIN)
+
+                registry.directories = [other]
+                registry.discover()
+
+                self.assertIs(registry['rus'], plugin)
+                self.assertEqual(registry.path('bam'), os.path.join(other, 'bam_corpus.py'))
+
+            finally:
+                sys.modules.pop('lingcorpora_plugin_rus', None)
+
+
+class SlowPageParser(PageParser):
+    """
+    fake parser: yields its targets after `delay` seconds
+    """
+
+    delay = 0.2
+
+    def extract(self):
+        time.sleep(self.delay)
+        yield from super().extract()
+
+
+class CountedPagedParser(FakePagedParser):
+    """
+    fake paged parser: the number of hits is on the first page
+    """
+
+    counted = []
+
+    def _parse_count(self, page, response):
+        CountedPagedParser.counted.append(self.query)
+        return self.total if self.query != '_missing' else 0
+
+
+class TestMultiCorpus(unittest.TestCase):
+
+    languages = ['fake_a', 'fake_b', 'fake_c']
+
+    def setUp(self):
+        for language in self.languages:
+            module = types.ModuleType(language)
+            module.PageParser = SlowPageParser
+            module.RATE_LIMITS = {'localhost': {'max_concurrency': 2}}
+            functions[language] = module
+
+    def tearDown(self):
+        for language in self.languages:
+            functions.pop(language, None)
+
+    def test_fan_out(self):
+        multi = MultiCorpus(self.languages, verbose=False)
+        start = time.perf_counter()
+        results = multi.search('a', n_results=3)
+
+        # as long as the slowest corpus, not the sum
+        self.assertLess(time.perf_counter() - start, 2 * SlowPageParser.delay)
+        self.assertEqual(list(results), self.languages)
+        self.assertEqual([r[0].n for r in results.values()], [3, 3, 3])
+        self.assertEqual(multi.results['fake_b'], results['fake_b'])
+
+        # the limits of the host are shared
+        self.assertIs(multi['fake_a'].throttle, multi['fake_c'].throttle)
+        self.assertEqual(multi.throttle.host('localhost').max_concurrency, 2)
+
+    def test_query_map(self):
+        multi = MultiCorpus(self.languages, verbose=False, max_workers=2)
+
+        with self.assertWarns(UserWarning):
+            results = multi.search({'fake_c': ['x', '_missing'], 'fake_a': 'y'}, n_results=2)
+
+        self.assertEqual(list(results), ['fake_a', 'fake_c'])
+        self.assertEqual([r.query for r in results['fake_c']], ['x'])
+        self.assertEqual([r.query for r in multi.failed['fake_c']], ['_missing'])
+
+        with self.assertRaises(KeyError):
+            multi.search({'fake_d': 'x'})
+
+    def test_errors(self):
+        broken = types.ModuleType('fake_broken')
+        broken.PageParser = type('PageParser', (PageParser,), {'extract': lambda self: iter([1 / 0])})
+        functions['fake_broken'] = broken
+
+        try:
+            multi = MultiCorpus(['fake_a', 'fake_broken'], verbose=False)
+
+            with self.assertWarns(UserWarning):
+                results = multi.search('a', n_results=1)
+
+        finally:
+            functions.pop('fake_broken', None)
+
+        self.assertEqual(results['fake_broken'], [])
+        self.assertEqual(len(results['fake_a']), 1)
+        self.assertIsInstance(multi.errors['fake_broken'], ZeroDivisionError)
+
+
+class TestCorpus(unittest.TestCase):
+
+    def setUp(self):
+        functions['fake'] = fake_corpus
+
+    def tearDown(self):
+        functions.pop('fake', None)
+
+    def test_search_sequential(self):
+        corp = Corpus('fake', verbose=False)
+        results = corp.search(['a', 'b'], n_results=3)
+
+        self.assertEqual([r.query for r in results], ['a', 'b'])
+        self.assertEqual([len(r.results) for r in results], [3, 3])
+
+    def test_resume(self):
+        fake_flaky = types.ModuleType('fake_flaky')
+        fake_flaky.PageParser = FlakyPagedParser
+        functions['fake_flaky'] = fake_flaky
+
+        try:
+            for prefetch_depth, max_workers in ((0, None), (2, None), (0, 2)):
+                FlakyPagedParser.failed = False
+                corp = Corpus('fake_flaky', verbose=False, max_workers=max_workers)
+
+                with self.assertWarns(UserWarning):
+                    results = corp.search(['a', 'b'], n_results=40, prefetch=prefetch_depth)
+
+                self.assertEqual(len(results), 1)
+                self.assertEqual(len(corp.failed), 1)
+                interrupted = corp.failed[0]
+                self.assertEqual(interrupted.n, 20)
+
+                resumed = corp.retry_failed()
+
+                self.assertIs(resumed[0], interrupted)
+                self.assertEqual([t.text for t in interrupted], [str(i) for i in range(40)])
+                self.assertEqual(len(corp.failed), 0)
+                self.assertEqual(len(corp.results), 2)
+
+        finally:
+            functions.pop('fake_flaky', None)
+
+    def test_checkpoint(self):
+        parser = FlakyPagedParser('a', n_results=40)
+        FlakyPagedParser.failed = False
+        targets = []
+
+        with self.assertRaises(ConnectionError):
+            for target in parser.extract():
+                targets.append(target)
+
+        self.assertEqual(parser.checkpoint, (2, 20))
+
+        targets.extend(parser.extract())
+
+        self.assertEqual(len(targets), 40)
+        self.assertEqual(parser.fetched, [0, 1, 2, 3])
+        self.assertEqual(parser.checkpoint, (None, 40))
+
+    def test_search_concurrent_keeps_order(self):
+        queries = ['q%s' % i for i in range(20)] + ['_missing']
+        corp = Corpus('fake', verbose=False, max_workers=8)
+        results = corp.search(queries, n_results=5)
+
+        self.assertEqual([r.query for r in results], queries[:-1])
+        self.assertEqual(corp.results, results)
+        self.assertEqual([r.query for r in corp.failed], ['_missing'])
+
+        for r in results:
+            self.assertEqual(str(r[0]), 'Target(%s, doc 0)' % r.query)
+
+    def test_count(self):
+        fake_counted = types.ModuleType('fake_counted')
+        fake_counted.PageParser = CountedPagedParser
+        functions['fake_counted'] = fake_counted
+        CountedPagedParser.counted = []
+
+        try:
+            corp = Corpus('fake_counted', verbose=False, max_workers=4)
+            queries = ['q%s' % i for i in range(10)] + ['_missing']
+
+            self.assertEqual(corp.count(queries), [45] * 10 + [0])
+            self.assertEqual(corp.count('q1', n_results=5), [45])
+            self.assertEqual(sorted(CountedPagedParser.counted), sorted(queries))
+            self.assertEqual(corp.results, [])
+
+            corp.clear_memo()
+            corp.count('q1', subcorpus='other')
+            corp.count('q1')
+
+            self.assertEqual(len(CountedPagedParser.counted), 13)
+
+        finally:
+            functions.pop('fake_counted', None)
+
+        with self.assertRaisesRegex(ValueError, 'supported by: .*bam'):
+            Corpus('fake', verbose=False).count('q')
+
+    def test_stream(self):
+        corp = Corpus('fake', verbose=False, memo_size=0)
+        calls = PageParser.calls
+        targets = corp.stream('a', n_results=5)
+
+        self.assertEqual(PageParser.calls, calls)
+        self.assertEqual([t.meta for t in targets], ['doc %s' % i for i in range(5)])
+        self.assertEqual(corp.results, [])
+
+        self.assertEqual(len(list(corp.stream('b', n_results=3, keep=True))), 3)
+        self.assertEqual([(r.query, r.n) for r in corp.results], [('b', 3)])
+
+        with self.assertWarns(UserWarning):
+            list(corp.stream('_missing'))
+        self.assertEqual([r.query for r in corp.failed], ['_missing'])
+
+        with self.assertRaises(TypeError):
+            next(corp.stream(['a', 'b']))
+
+    def test_sinks(self):
+        corp = Corpus('fake', verbose=False, max_workers=4)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'out.csv')
+
+            with CSVSink(path, batch_size=2) as sink:
+                results = corp.search(['a', 'b'], n_results=3, sink=sink)
+                self.assertEqual(sink.n, 6)
+
+            results[0].export_csv(os.path.join(tmp, 'a.csv'))
+
+            with open(path, encoding='utf-8-sig') as f:
+                rows = f.read().splitlines()
+            with open(os.path.join(tmp, 'a.csv'), encoding='utf-8-sig') as f:
+                self.assertEqual(f.read().splitlines(), rows[:4])
+
+            self.assertEqual(rows[0], 'index;left;center;right')
+            self.assertEqual(rows[6], '6;2;b;.')
+
+            # the header of a file without rows is not repeated
+            path = os.path.join(tmp, 'header.csv')
+            CSVSink(path).close()
+
+            with CSVSink(path, resume=True) as sink:
+                corp.search('a', n_results=1, sink=sink)
+
+            with open(path, encoding='utf-8-sig') as f:
+                self.assertEqual(f.read().splitlines(), ['index;left;center;right', '1;0;a;.'])
+
+            # a record cut inside a quoted multi-line field is dropped whole
+            path = os.path.join(tmp, 'lines.csv')
+
+            with CSVSink(path, kwic=False) as sink:
+                sink.write(Target('one\ntwo', (0, 3), '', []))
+
+            for tail in ('2;"thr', '2;"three\n', '2;"three\nfour"'):
+                with open(path, 'a', encoding='utf-8', newline='') as f:
+                    f.write(tail)
+
+                with CSVSink(path, kwic=False, resume=True) as sink:
+                    self.assertEqual(sink.n, 1)
+
+            with CSVSink(path, kwic=False, resume=True) as sink:
+                # the first target is written already
+                sink.write(Target('one\ntwo', (0, 3), '', []))
+                sink.write(Target('three\nfour', (0, 5), '', []))
+
+            with open(path, encoding='utf-8-sig', newline='') as f:
+                self.assertEqual(f.read(), 'index;text\n1;"one\ntwo"\n2;"three\nfour"\n')
+
+            path = os.path.join(tmp, 'out.jsonl')
+
+            with JSONLSink(path, kwic=False) as sink:
+                for target in corp.stream('c', n_results=6, sink=sink):
+                    if target.meta == 'doc 3':
+                        break
+
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write('{"index": 5, "te')
+
+            with JSONLSink(path, kwic=False, resume=True) as sink:
+                self.assertEqual(sink.n, 4)
+                list(corp.stream('c', n_results=6, sink=sink))
+
+            with open(path, encoding='utf-8') as f:
+                self.assertEqual(
+                    [json.loads(line)['meta'] for line in f],
+                    ['doc %s' % i for i in range(6)]
+                )
+
+    def test_columnar(self):
+        listed = Corpus('fake', verbose=False).search('a', n_results=12)[0]
+        corp = Corpus('fake', verbose=False, storage='columnar')
+        columnar = corp.search('a', n_results=12)[0]
+
+        self.assertIsInstance(columnar, ColumnarResult)
+        self.assertEqual(len(columnar), 12)
+        self.assertEqual([str(t) for t in columnar], [str(t) for t in listed])
+        self.assertEqual(columnar[3].kwic(1, 1), listed[3].kwic(1, 1))
+
+        view = columnar[2:10:3]
+        self.assertEqual([t.meta for t in view], ['doc 2', 'doc 5', 'doc 8'])
+        self.assertEqual(view[-1].text, '8 a .')
+        self.assertEqual(view[1:].columns()['target'], ['a', 'a'])
+        self.assertEqual(columnar.columns(kwic=True)['left'][:2], ['0', '1'])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            listed.export_csv(os.path.join(tmp, 'list.csv'))
+            columnar.export_csv(os.path.join(tmp, 'columnar.csv'))
+
+            with open(os.path.join(tmp, 'list.csv'), 'rb') as f, \
+                    open(os.path.join(tmp, 'columnar.csv'), 'rb') as g:
+                self.assertEqual(f.read(), g.read())
+
+        calls = PageParser.calls
+        self.assertEqual(len(corp.search('a', n_results=5)[0]), 5)
+        self.assertEqual(PageParser.calls, calls)
+
+        with self.assertRaises(ValueError):
+            Corpus('fake', storage='dict')
+
+    def test_columnar_buffers(self):
+        params = {'query': 'одеяло', 'kwic': True, 'n_left': 2, 'n_right': 2}
+        listed = Result('rus', params)
+        columnar = ColumnarResult('rus', params)
+
+        for i in range(7):
+            # the first two hits are in one sentence
+            text = 'для  внучки %s лоскутное одеяло,  зная «что»' % max(i, 1)
+            target = Target(
+                text, (text.index('одеяло'), text.index('одеяло') + 6), 'doc %s' % (i // 3),
+                [[{'lex': 'одеяло'}]] if i == 2 else None if i == 4 else [],
+                transl='blanket %s' % i if i % 2 else None, lang='rus'
+            )
+            listed.add(target)
+            columnar.add(target)
+
+        view = columnar[1::2]
+        self.assertEqual([str(t) for t in view], [str(t) for t in listed[1::2]])
+        self.assertEqual([t.analysis for t in columnar], [t.analysis for t in listed])
+        self.assertEqual(view.columns()['target'], ['одеяло'] * 3)
+        self.assertEqual(view.columns()['transl'], ['blanket 1', 'blanket 3', 'blanket 5'])
+        self.assertEqual(columnar.columns()['transl'][:2], [None, 'blanket 1'])
+        self.assertEqual(columnar.kwic_table(level='char'), listed.kwic_table(level='char'))
+        self.assertEqual(columnar.columns(kwic=True)['left'], [t[0] for t in listed.kwic_table()])
+
+        # data and offsets are the arrow layout: UTF-8 bytes, byte offsets
+        data, offsets, valid = columnar._ColumnarResult__columns.transl.frozen()
+        self.assertEqual(data, ''.join('blanket %s' % i for i in (1, 3, 5)).encode('utf-8'))
+        self.assertEqual(len(offsets), 8 * 8)
+        self.assertEqual(list(valid), [0, 1, 0, 1, 0, 1, 0])
+
+        texts = columnar._ColumnarResult__columns.texts
+        self.assertEqual(list(texts.codes), [0, 0, 1, 2, 3, 4, 5])
+        self.assertEqual(len(texts.values), 6)
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch('lingcorpora.columnar._Columns.target', side_effect=AssertionError):
+            for kwic in (True, False):
+                listed.params['kwic'] = columnar.params['kwic'] = kwic
+                expected = Result('rus', dict(listed.params, query='одеяло'))
+
+                for target in listed[1::2]:
+                    expected.add(target)
+
+                expected.export_csv(os.path.join(tmp, 'list.csv'))
+                columnar[1::2].export_csv(os.path.join(tmp, 'columnar.csv'))
+
+                with open(os.path.join(tmp, 'list.csv'), 'rb') as f, \
+                        open(os.path.join(tmp, 'columnar.csv'), 'rb') as g:
+                    self.assertEqual(f.read(), g.read())
+
+    def test_memo(self):
+        corp = Corpus('fake', verbose=False)
+        corp.search('a', n_results=10)
+        calls = PageParser.calls
+
+        narrowed = corp.search('a', n_results=4)[0]
+        self.assertEqual(PageParser.calls, calls)
+        self.assertEqual(len(narrowed.results), 4)
+        self.assertEqual(narrowed.params['n_results'], 4)
+
+        corp.search('a', n_results=4, kwic=False)
+        corp.search('a', n_results=20)
+        self.assertEqual(PageParser.calls, calls + 2)
+
+        corp.search('_missing', n_results=4)
+        corp.search('_missing', n_results=4)
+        self.assertEqual(PageParser.calls, calls + 4)
+
+        corp = Corpus('fake', verbose=False, memo_size=0)
+        corp.search('a', n_results=10)
+        corp.search('a', n_results=10)
+        self.assertEqual(PageParser.calls, calls + 6)
+
+
+if __name__ == '__main__':
+    unittest.main()